@@ -3,87 +3,313 @@ from google.cloud import firestore
 import concurrent.futures # <--- LA CLAVE PARA LA VELOCIDAD
 from tqdm import tqdm # Barra de progreso
 import sys
+import argparse
+import glob
+import os
 
-# Importamos TUS módulos procesadores
-from processors import (
-  form_100,
-  form_110,
-  form_170,
-  form_400,
-  form_500
+# Processors: extract_<n> de cada formulario (los de shared/versions.py)
+from processors import get_extractor
+from shared.sinks import SqliteSink
+from shared.loader import add_error_listener, add_listener, load_form, set_item_prefetcher
+from shared.deadletter import DESCARGA, EXTRACCION, LOCAL_PATH, DeadLetterStore
+from shared.rollups import RollupUpdater
+from shared.fingerprint import FingerprintClient, SqliteFingerprints
+from shared.manifest import (
+  filter_entries,
+  in_shard,
+  iter_cuce_groups,
+  iter_dir_names,
+  iter_entries,
+  iter_gcs_names,
+  iter_list_file,
+  latest_revisions,
+  parse_shard,
+  parse_source,
+  shard_of
 )
+from shared.ledger import Ledger, ledger_path, merge_report
+from shared.prefetch import ItemPrefetcher, prefetch_cuces
+from shared.schedule import group_by_cuce, run_groups
+from shared.versions import PARSER_VERSIONS
+from shared.throttle import AdaptiveLimiter, RetryableStatus, RETRY_STATUS, ThrottledClient, call_with_retries
 
 # Configuración
 ARCHIVO_LISTA = "guias/400_1.txt"
 BASE_URL = "https://storage.googleapis.com/sicoescan/forms/"
-NUM_HILOS = 20
+# Con un directorio como origen (--origen ./forms) los HTML se leen de disco
+DIRECTORIO_LOCAL = None
+# Hilos disponibles; la concurrencia real de cada etapa la ajustan los AdaptiveLimiter
+NUM_HILOS = 64
+# Destino: None = Firestore; una ruta (ej. "guias/backfill.sqlite") = SQLite local
+SQLITE_PATH = None
+# Exportación Parquet de items (None = desactivada), ej. "guias/export/items"
+EXPORT_DIR = None
+# Mantener los documentos resumen (shared/rollups.py) durante el backfill
+ROLLUPS = True
+# Huellas de lo ya escrito (None = desactivado): re-ejecutar el backfill no vuelve a escribir lo idéntico
+HUELLAS_PATH = None
+# Índices de items de los CUCEs que en esta pasada solo traen 500/600, leídos por lotes antes de procesarlos
+PREFETCH_ITEMS = True
+# Grupos (CUCEs) que se miran por adelantado para armar los lotes
+PREFETCH_VENTANA = 120
 
-# Inicializar Firestore (Firestore Client es thread-safe, podemos usar una instancia global)
-try:
-  db = firestore.Client()
-except Exception:
-  from google.oauth2 import service_account
-  cred = service_account.Credentials.from_service_account_file('./firebase-credentials.json')
-  db = firestore.Client(credentials=cred)
+if SQLITE_PATH:
+  # Carga masiva local (sin latencia por documento); SqliteSink también es thread-safe
+  db = SqliteSink(SQLITE_PATH)
+else:
+  # Inicializar Firestore (Firestore Client es thread-safe, podemos usar una instancia global)
+  try:
+    db = firestore.Client()
+  except Exception:
+    from google.oauth2 import service_account
+    cred = service_account.Credentials.from_service_account_file('./firebase-credentials.json')
+    db = firestore.Client(credentials=cred)
+
+exporter = None
+if EXPORT_DIR:
+  from shared.export import ParquetExporter
+  exporter = ParquetExporter(EXPORT_DIR)
+  add_listener(exporter.add)
+
+if ROLLUPS:
+  add_listener(RollupUpdater(db))
+
+# Fallas en un SqliteSink local (guias/dead_letters.sqlite); se reprocesan con replay.py
+dead_letters = DeadLetterStore(SqliteSink(LOCAL_PATH))
+add_listener(dead_letters.on_loaded)
+add_error_listener(dead_letters.on_load_error)
+
+# Descargas y escrituras con concurrencia adaptativa (AIMD) y reintentos con jitter
+descargas = AdaptiveLimiter("descargas", initial=8, maximum=NUM_HILOS, latency_target=5.0)
+escrituras = AdaptiveLimiter("escrituras", initial=8, maximum=NUM_HILOS)
+
+huellas = None
+base_db = db
+db = ThrottledClient(db, escrituras)
+# El prefetch solo lee: va con throttling pero sin las huellas (y conserva get_all)
+lecturas_db = db
+if HUELLAS_PATH:
+  huellas = SqliteFingerprints(HUELLAS_PATH)
+  db = FingerprintClient(db, store=huellas)
+
+prefetcher = None
+if PREFETCH_ITEMS:
+  prefetcher = ItemPrefetcher(lecturas_db)
+  set_item_prefetcher(prefetcher)
+
+def descargar(url):
+  response = requests.get(url, timeout=10)
+  if response.status_code in RETRY_STATUS:
+    raise RetryableStatus(response.status_code, url)
+  return response
 
 def procesar_un_archivo(linea_cruda):
   file_name = linea_cruda.strip()
   if not file_name: return "VACIO"
 
+  # Cualquier formulario con processor (shared/versions.py); el resto ni se descarga
+  name_upper = file_name.upper()
+  form = next((f for f in PARSER_VERSIONS if f in name_upper), None)
+  if form is None:
+    return "SKIP_UNKNOWN"
+
   url = f"{BASE_URL}{file_name}"
 
   try:
-    response = requests.get(url, timeout=10)
-    
-    if response.status_code != 200:
-      return f"ERROR_DOWNLOAD_{response.status_code}"
-      
-    response.encoding = "utf-8"
-    html_content = response.text
-    name_upper = file_name.upper()
-
-    if "FORM100" in name_upper:
-      form_100.process_100(html_content, file_name, db)
-    elif "FORM110" in name_upper:
-      form_110.process_110(html_content, file_name, db)
-    elif "FORM170" in name_upper:
-      form_170.process_170(html_content, file_name, db)
-    elif "FORM400" in name_upper:
-      form_400.process_400(html_content, file_name, db)
-    elif "FORM500" in name_upper:
-      form_500.process_500(html_content, file_name, db)
+    if DIRECTORIO_LOCAL:
+      with open(os.path.join(DIRECTORIO_LOCAL, file_name), "r", encoding="utf-8") as f:
+        html_content = f.read()
     else:
-      return "SKIP_UNKNOWN"
+      response = call_with_retries(lambda: descargar(url), descargas)
 
-    return "OK"
+      if response.status_code != 200:
+        resultado = f"ERROR_DOWNLOAD_{response.status_code}"
+        dead_letters.record(file_name, DESCARGA, resultado, form=form)
+        return resultado
 
+      response.encoding = "utf-8"
+      html_content = response.text
   except Exception as e:
-    with open("guias/backfill_errors.txt", "a") as f:
-      f.write(f"{file_name} - {str(e)}\n")
-    return f"ERROR_EXCEPTION"
+    dead_letters.record(file_name, DESCARGA, e, form=form)
+    return "ERROR_DOWNLOAD"
+
+  try:
+    records = get_extractor(form)(html_content, file_name)
+  except Exception as e:
+    dead_letters.record(file_name, EXTRACCION, e, form=form)
+    return "ERROR_EXCEPTION"
+
+  # La falla de carga ya quedó en dead letters (listener del loader); cuenta como error
+  # para que no entre al ledger como hecho y las etapas siguientes del CUCE esperen
+  return "OK" if load_form(db, records) else "ERROR_LOAD"
+
+def cargar_grupos(origen, filtros):
+  """
+  Grupos de entries por CUCE desde una lista de guias/, un directorio o un
+  listado de GCS (gs://bucket/prefijo/). Retorna (grupos, omitidos): con una
+  lista los grupos ya están armados; con GCS/directorio es un generador y los
+  primeros CUCEs se procesan mientras sigue el listado.
+  """
+  global BASE_URL, DIRECTORIO_LOCAL
+  kind, where, prefix = parse_source(origen)
+  omitidos = []
+  if kind == "lista":
+    entries = latest_revisions(filter_entries(iter_entries(iter_list_file(where), skipped=omitidos), **filtros))
+    return list(group_by_cuce(entries).values()), omitidos
 
-def run_backfill_rapido():
+  if kind == "gcs":
+    BASE_URL = f"https://storage.googleapis.com/{where}/{prefix}"
+    names = iter_gcs_names(where, prefix)
+  else:
+    DIRECTORIO_LOCAL = where
+    names = iter_dir_names(where)
+  return iter_cuce_groups(filter_entries(iter_entries(names, skipped=omitidos), **filtros)), omitidos
+
+def run_backfill_rapido(origen=ARCHIVO_LISTA, shard=None, filtros=None):
+  """
+  origen: lista (guias/*.txt), directorio local o gs://bucket/prefijo/.
+  shard: (i, N) para procesar solo los CUCEs de este worker (ver --shard).
+  filtros: kwargs de shared.manifest.filter_entries (forms, desde, hasta, revisions).
+  """
   print(f"🚀 Iniciando procesamiento PARALELO con {NUM_HILOS} hilos.")
   
+  # Se lee el origen en streaming y se deja solo la última revisión de cada (CUCE, form)
   try:
-    with open(ARCHIVO_LISTA, "r", encoding="utf-8") as f:
-      lines = f.readlines()
+    grupos, omitidos = cargar_grupos(origen, filtros or {})
   except FileNotFoundError:
-    print(f"❌ No se encontró el archivo {ARCHIVO_LISTA}")
+    print(f"❌ No se encontró el archivo {origen}")
     return
 
-  files_to_process = [line for line in lines if line.strip()]
-  total_files = len(files_to_process)
-  
-  with concurrent.futures.ThreadPoolExecutor(max_workers=NUM_HILOS) as executor:
-    results = list(tqdm(executor.map(procesar_un_archivo, files_to_process), total=total_files, unit="form"))
+  # Avance de este shard: lo que ya terminó OK no se vuelve a procesar
+  ledger = Ledger(ledger_path(*shard) if shard else ledger_path())
+  if ledger.done:
+    print(f"⏭️ {len(ledger.done)} archivos ya procesados según {ledger.path}")
+
+  def pendientes(grupos):
+    for group in grupos:
+      if shard and not in_shard(group[0], *shard):
+        continue
+      group = [e for e in group if e.name not in ledger.done]
+      if group:
+        yield group
+
+  def omitidos_pendientes():
+    for name in omitidos:
+      if shard and shard_of(name, shard[1]) != shard[0]:
+        continue
+      if name not in ledger.done:
+        yield name
+
+  def con_prefetch(grupos):
+    # Se encolan los índices de la ventana siguiente mientras se procesa la actual.
+    # Solo CUCEs con 500/600 sin etapas que escriban items en esta pasada
+    # (esas lo invalidarían antes de usarlo; ver shared/prefetch.py)
+    ventana = []
+    for group in grupos:
+      ventana.append(group)
+      if len(ventana) >= PREFETCH_VENTANA:
+        prefetcher.schedule(prefetch_cuces(ventana))
+        yield from ventana
+        ventana = []
+    prefetcher.schedule(prefetch_cuces(ventana))
+    yield from ventana
+
+  def procesar_y_registrar(name):
+    result = procesar_un_archivo(name)
+    ledger.record(name, result)
+    return result
+
+  total_files = None
+  if isinstance(grupos, list):
+    # Con una lista se conoce el total de antemano (barra con porcentaje)
+    grupos = list(pendientes(grupos))
+    omitidos = list(omitidos_pendientes())
+    total_files = sum(len(g) for g in grupos) + len(omitidos)
+    if shard:
+      print(f"🧩 Shard {shard[0]}/{shard[1]}: {total_files} archivos pendientes")
+  else:
+    grupos = pendientes(grupos)
+  if prefetcher:
+    grupos = con_prefetch(grupos)
+
+  results = []
+
+  with tqdm(total=total_files, unit="form") as barra:
+    # Cada CUCE en orden de ciclo de vida (shared/schedule.py: 100..150 -> 170..220 -> 300/400 -> 500/600), CUCEs en paralelo
+    for _, result in run_groups(grupos, procesar_y_registrar, max_workers=NUM_HILOS):
+      results.append(result)
+      barra.update(1)
+
+    # Nombres sin el formato CUCE_FORM_rev: no se puede ordenar, van como antes
+    # (con GCS/directorio recién se conocen al terminar el listado)
+    if total_files is None:
+      omitidos = list(omitidos_pendientes())
+    with concurrent.futures.ThreadPoolExecutor(max_workers=NUM_HILOS) as executor:
+      for result in executor.map(procesar_y_registrar, omitidos):
+        results.append(result)
+        barra.update(1)
+
+  ledger.close()
+  dead_letters.db.close()
+  print(f"⚙️ {descargas.stats()}")
+  print(f"⚙️ {escrituras.stats()}")
+  if prefetcher:
+    prefetcher.close()
+    print(f"⚙️ {prefetcher.stats()}")
+  if huellas:
+    huellas.close()
+    print(f"✍️ Escrituras: {db.written} | idénticas (omitidas): {db.skipped}")
+  if SQLITE_PATH:
+    base_db.close()
+  if exporter:
+    exporter.close()
 
   ok_count = results.count("OK")
-  errores = total_files - ok_count
+  errores = len(results) - ok_count
   
   print(f"\n✅ Proceso completado.")
   print(f"Total procesados con éxito: {ok_count}")
   print(f"Total fallos/skips: {errores}")
+  if results.count("SKIP_DEPENDENCIA"):
+    print(f"⏸️ Pendientes por falla de una etapa anterior del mismo CUCE: {results.count('SKIP_DEPENDENCIA')}")
+
+def imprimir_reporte(patron):
+  paths = sorted(glob.glob(patron))
+  if not paths:
+    print(f"❌ No hay ledgers que coincidan con {patron}")
+    return
+  reporte = merge_report(paths)
+  print(f"📊 {len(paths)} ledgers | {reporte['archivos']} archivos")
+  for resultado, cantidad in reporte["resultados"].items():
+    print(f"   {resultado}: {cantidad}")
+  if reporte["duplicados"]:
+    print(f"⚠️ {len(reporte['duplicados'])} archivos procesados en más de un shard")
+  if reporte["pendientes"]:
+    with open("guias/pendientes.txt", "w", encoding="utf-8") as f:
+      for name in reporte["pendientes"]:
+        f.write(f"{name}\n")
+    print(f"📝 {len(reporte['pendientes'])} pendientes en guias/pendientes.txt")
 
 if __name__ == "__main__":
-  run_backfill_rapido()
\ No newline at end of file
+  parser = argparse.ArgumentParser(description="Backfill de formularios desde una lista de guias/")
+  parser.add_argument("--origen", "--lista", default=ARCHIVO_LISTA,
+                      help="Lista de archivos (uno por línea), directorio local o gs://bucket/prefijo/")
+  parser.add_argument("--forms", default=None, help="Solo estos formularios (ej. FORM100,FORM110)")
+  parser.add_argument("--desde", type=int, default=None, help="Año mínimo (según el prefijo del CUCE)")
+  parser.add_argument("--hasta", type=int, default=None, help="Año máximo (según el prefijo del CUCE)")
+  parser.add_argument("--revisiones", default=None, help="Solo estas revisiones (ej. 1,2)")
+  parser.add_argument("--shard", default=None, help="i/N: procesar solo los CUCEs de este worker (ej. 0/4)")
+  parser.add_argument("--reporte", nargs="?", const="guias/ledger*.jsonl", default=None,
+                      help="Combinar los ledgers de los shards en un reporte (patrón glob)")
+  args = parser.parse_args()
+
+  if args.reporte:
+    imprimir_reporte(args.reporte)
+  else:
+    filtros = {
+      "forms": args.forms.split(",") if args.forms else None,
+      "desde": args.desde,
+      "hasta": args.hasta,
+      "revisions": {int(r) for r in args.revisiones.split(",")} if args.revisiones else None,
+    }
+    run_backfill_rapido(args.origen, parse_shard(args.shard) if args.shard else None, filtros)
\ No newline at end of file
@@ -0,0 +1,118 @@
+import copy
+
+from google.api_core.exceptions import NotFound
+
+from shared.sinks import apply_value
+
+# ==========================================
+# Firestore en memoria (solo para benchmarks locales)
+# ==========================================
+# Implementa el subconjunto del cliente que usan shared/firestore.py y los
+# processors: collection/document/get/set/update/delete y where(...).stream().
+# Cuenta lecturas y escrituras para poder comparar processors por costo.
+
+class FakeSnapshot:
+  def __init__(self, doc_id, data):
+    self.id = doc_id
+    self._data = data
+
+  @property
+  def exists(self):
+    return self._data is not None
+
+  def to_dict(self):
+    return copy.deepcopy(self._data) if self._data is not None else None
+
+  def get(self, field):
+    # Como DocumentSnapshot.get: None si el documento no existe, KeyError si falta el campo
+    if self._data is None:
+      return None
+    value = self._data
+    for part in field.split("."):
+      if not isinstance(value, dict) or part not in value:
+        raise KeyError(field)
+      value = value[part]
+    return copy.deepcopy(value)
+
+class FakeDocument:
+  def __init__(self, db, collection, doc_id):
+    self._db = db
+    self._collection = collection
+    self.id = doc_id
+
+  def _store(self):
+    return self._db.data.setdefault(self._collection, {})
+
+  def get(self, transaction=None):
+    self._db.reads += 1
+    return FakeSnapshot(self.id, self._store().get(self.id))
+
+  def set(self, data, merge=False):
+    self._db.writes += 1
+    store = self._store()
+    current = store.get(self.id) if merge else None
+    doc = dict(current) if current else {}
+    for key, value in data.items():
+      doc[key] = apply_value(doc.get(key), value)
+    store[self.id] = doc
+
+  def update(self, data):
+    store = self._store()
+    if self.id not in store:
+      raise NotFound(f"No document to update: {self._collection}/{self.id}")
+    self._db.writes += 1
+    doc = store[self.id]
+    for key, value in data.items():
+      doc[key] = apply_value(doc.get(key), value)
+
+  def delete(self):
+    self._db.writes += 1
+    self._store().pop(self.id, None)
+
+class FakeQuery:
+  def __init__(self, db, collection, filters):
+    self._db = db
+    self._collection = collection
+    self._filters = filters
+
+  def where(self, field_path=None, op_string=None, value=None, filter=None):
+    if filter is not None:
+      field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+    return FakeQuery(self._db, self._collection, self._filters + [(field_path, op_string, value)])
+
+  def _matches(self, data):
+    for field, op, value in self._filters:
+      current = data
+      for part in field.split("."):
+        current = current.get(part) if isinstance(current, dict) else None
+      if op == "==" and current != value: return False
+      if op == "in" and current not in value: return False
+      if op == "array_contains" and value not in (current or ()): return False
+    return True
+
+  def stream(self):
+    store = self._db.data.get(self._collection, {})
+    for doc_id, data in list(store.items()):
+      if self._matches(data):
+        self._db.reads += 1
+        yield FakeSnapshot(doc_id, copy.deepcopy(data))
+
+class FakeCollection(FakeQuery):
+  def __init__(self, db, name):
+    super().__init__(db, name, [])
+
+  def document(self, doc_id):
+    return FakeDocument(self._db, self._collection, doc_id)
+
+class FakeFirestore:
+  def __init__(self):
+    self.data = {}
+    self.reads = 0
+    self.writes = 0
+
+  def collection(self, name):
+    return FakeCollection(self, name)
+
+  def seed(self, collection, docs):
+    """Carga documentos {id: data} sin contar escrituras."""
+    self.data.setdefault(collection, {}).update(copy.deepcopy(docs))
@@ -0,0 +1,367 @@
+import random
+from html import escape
+
+# ==========================================
+# Generador de formularios SICOES sintéticos
+# ==========================================
+# Produce HTML con la misma forma que esperan los processors (etiquetas,
+# clases y cabeceras) para medir cómo escalan con el tamaño del formulario.
+
+FORM_TYPES = (
+  "FORM100", "FORM110", "FORM120", "FORM150", "FORM170", "FORM180", "FORM190",
+  "FORM200", "FORM220", "FORM300", "FORM400", "FORM500", "FORM600"
+)
+
+_PRODUCTOS = [
+  "Papel bond tamaño carta", "Tóner para impresora láser", "Cemento portland",
+  "Cañería de PVC", "Servicio de alimentación", "Uniformes de educación física",
+  "Medicamento: paracetamol 500 mg", "Computadora de escritorio",
+  "Mantenimiento de vehículos", "Material de escritorio", "Señalización vial",
+  "Refacción de aulas", "Insumos de limpieza", "Guantes de látex",
+  "Camión compactador", "Construcción de puente peatonal"
+]
+_ADJETIVOS = ["", "ecológico", "reforzado", "de alta resistencia", "tipo A", "según especificación técnica", "año 2024"]
+_MEDIDAS = ["Pieza", "Caja", "Global", "Kilogramo", "Litro", "Servicio", "Metro cúbico"]
+_EMPRESAS = ["Comercial Andina S.R.L.", "Importadora Illimani", "Constructora Ñandutí", "Distribuidora Potosí", "Servicios Múltiples Chuquisaca"]
+_ENTIDADES = ["GOBIERNO AUTÓNOMO MUNICIPAL DE ACHACACHI", "MINISTERIO DE EDUCACIÓN", "CAJA NACIONAL DE SALUD", "UNIVERSIDAD MAYOR DE SAN ANDRÉS"]
+_MODALIDADES = ["Apoyo Nacional a la Producción y Empleo", "Licitación Pública", "Contratación Menor"]
+
+def _page(body):
+  # Incluimos ruido que los processors no leen (scripts, estilos, comentarios, inputs ocultos)
+  return (
+    "<html><head><title>SICOES - Formulario</title>"
+    "<script type=\"text/javascript\">function imprimir(){ if (a < b) { window.print(); } }</script>"
+    "<style>.FormularioDato { font-size: 10px; } td > b { color: #333; }</style>"
+    "</head><body>"
+    "<!-- Generado por el sistema SICOES <table> -->"
+    "<input type=\"hidden\" name=\"token\" value=\"abc123\">"
+    "<table width=\"100%\"><tr><td><img src=\"logo.gif\"> Sistema de Contrataciones Estatales</td></tr></table>"
+    f"{body}"
+    "<script>var pie = '<td>no leer</td>';</script>"
+    "</body></html>"
+  )
+
+def _fmt_num(value, european=False):
+  s = f"{value:,.2f}"
+  if european:
+    s = s.replace(",", "#").replace(".", ",").replace("#", ".")
+  return s
+
+def _fecha(rnd):
+  return f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/{rnd.randint(2020, 2025)}"
+
+def random_cuce(rnd):
+  return f"{rnd.randint(20, 25)}-{rnd.randint(1, 1999):04d}-00-{rnd.randint(1000000, 1999999)}-1-1"
+
+def _descripciones(rnd, n_items, duplicates, nested):
+  descs = []
+  for i in range(n_items):
+    if descs and rnd.random() < duplicates:
+      # Descripción repetida (de un grupo chico) -> estresa las colisiones de slug
+      descs.append(descs[rnd.randrange(min(len(descs), 3))])
+      continue
+    base = f"{rnd.choice(_PRODUCTOS)} {rnd.choice(_ADJETIVOS)}".strip()
+    variant = rnd.random()
+    if variant < 0.2:
+      desc = f"<b>{escape(base)}</b><br/>Lote {i + 1} &amp; accesorios"
+    elif variant < 0.3 and nested:
+      desc = f"{escape(base)} <table><tr><td>Detalle anidado</td><td>{i}</td></tr></table>"
+    else:
+      desc = f"{escape(base)} - ítem {i + 1}"
+    descs.append(desc)
+  return descs
+
+def _tr(*cells, attrs=""):
+  return "<tr>" + "".join(f"<td{attrs}>{c}</td>" for c in cells) + "</tr>"
+
+def _labels(pairs):
+  return "".join(
+    f"<tr><td class=\"FormularioEtiqueta\">{escape(k)}</td><td class=\"FormularioDato\">{escape(v)}</td></tr>"
+    for k, v in pairs
+  )
+
+# ==========================================
+# Secciones comunes
+# ==========================================
+
+def _entidad_100(rnd):
+  cod = str(rnd.randint(1, 9999))
+  return (
+    "<table>"
+    "<tr><td class=\"FormularioSubtitulo\">1. IDENTIFICACIÓN DE LA ENTIDAD</td></tr>"
+    + _tr("Código", "Nombre", "Fax", "Teléfono")
+    + _tr(cod, escape(rnd.choice(_ENTIDADES)), "2-2222222", "2-2111111")
+    + "</table>"
+  )
+
+def _convocatoria_100(rnd, cuce):
+  return (
+    "<table>"
+    f"<tr><td class=\"FormularioEtiqueta\">CUCE</td><td class=\"FormularioCUCE\">{cuce}</td></tr>"
+    + _labels([
+      ("Fecha de publicación (en el SICOES)", _fecha(rnd)),
+      ("Objeto de la Contratación", "Adquisición de bienes para la gestión"),
+      ("Subasta", "No"),
+      ("Concesión Administrativa", "No"),
+      ("Tipo de convocatoria", "Convocatoria Pública Nacional"),
+      ("Forma de adjudicación", "Por Ítems"),
+      ("Normativa utilizada", "D.S. 0181"),
+      ("Tipo de contratación", "Bienes"),
+      ("Método de selección y adjudicación", "Precio Evaluado Más Bajo"),
+      ("Garantías solicitadas", "Seriedad de Propuesta"),
+      ("Moneda considerada para el proceso", "Bolivianos"),
+      ("Elaboración del DBC", "Entidad"),
+      ("Bienes o servicios recurrentes con cargo a la siguiente gestión:", "No"),
+    ])
+    + "<tr><td>Modalidad</td></tr>"
+    + f"<tr><td>{escape(rnd.choice(_MODALIDADES))}</td></tr>"
+    + "<tr><td class=\"FormularioSubtitulo\">CRONOGRAMA DE PROCESO</td></tr>"
+    + "<tr><td><table>"
+    + _tr("Presentación de propuestas", _fecha(rnd))
+    + _tr("Adjudicación", _fecha(rnd))
+    + _tr("Formalización de contrato", _fecha(rnd))
+    + _tr("Entrega de bienes", _fecha(rnd))
+    + "</table></td></tr>"
+    + "</table>"
+  )
+
+# ==========================================
+# Formularios
+# ==========================================
+
+def _form_100(rnd, cuce, descs, european, form_type):
+  headers = ["Código del Catálogo", "Descripción del bien o servicio", "Unidad de Medida",
+             "Cantidad", "Precio referencial unitario", "Precio referencial total"]
+  if form_type == "FORM110":
+    headers[4:6] = ["Precio Unitario del Proveedor Preseleccionado", "Precio Total del Proveedor Preseleccionado"]
+  rows, total = [], 0.0
+  for desc in descs:
+    cant = rnd.randint(1, 500)
+    unit = round(rnd.uniform(1, 20000), 2)
+    total += cant * unit
+    rows.append(_tr(str(rnd.randint(10000000, 99999999)), desc, escape(rnd.choice(_MEDIDAS)),
+                    str(cant), _fmt_num(unit, european), _fmt_num(cant * unit, european)))
+  items = (
+    "<table>"
+    + "<tr><td class=\"FormularioSubtitulo\" colspan=\"6\">ITEMS</td></tr>"
+    + _tr(*headers)
+    + "".join(rows)
+    + f"<tr><td colspan=\"5\">TOTAL</td><td>{_fmt_num(total, european)}</td></tr>"
+    + "</table>"
+  )
+  return _entidad_100(rnd) + _convocatoria_100(rnd, cuce) + items
+
+def _form_120(rnd, cuce, descs, european, form_type):
+  return (
+    "<table>"
+    f"<tr><td class=\"FormularioEtiqueta\">CUCE</td><td class=\"FormularioCUCE\">{cuce}</td></tr>"
+    + _labels([("Objeto de la Contratación", "Adquisición de bienes para la gestión")])
+    + "</table>"
+  )
+
+def _form_150(rnd, cuce, descs, european, form_type):
+  headers = ["Nro.", "Código del Catálogo", "Descripción del bien o servicio", "Unidad de Medida",
+             "Cantidad", "Precio referencial unitario", "Precio referencial total"]
+  rows, total = [], 0.0
+  for i, desc in enumerate(descs):
+    cant = rnd.randint(1, 500)
+    unit = round(rnd.uniform(1, 20000), 2)
+    total += cant * unit
+    rows.append(_tr(str(i + 1), str(rnd.randint(10000000, 99999999)), desc, escape(rnd.choice(_MEDIDAS)),
+                    str(cant), _fmt_num(unit, european), _fmt_num(cant * unit, european)))
+  items = (
+    "<table>"
+    + "<tr><td class=\"FormularioSubtitulo\" colspan=\"7\">DETALLE DE LOS BIENES</td></tr>"
+    + _tr(*headers)
+    + "".join(rows)
+    + f"<tr><td colspan=\"6\">TOTAL</td><td>{_fmt_num(total, european)}</td></tr>"
+    + "</table>"
+  )
+  return _entidad_100(rnd) + _convocatoria_100(rnd, cuce) + items
+
+def _form_170(rnd, cuce, descs, european, form_type, preferencia=False):
+  titulo = {
+    "FORM180": "DETALLE DE ITEMS - DESIST",
+  }.get(form_type, "DETALLE DE ITEMS ADJUDICADOS")
+  base_headers = ["Código Catalogo", "Descripción", "Unidad de Medida", "Cantidad adjudicada",
+                  "Precio unitario referencial", "Precio unitario adjudicado", "Total adjudicado",
+                  "Proponente Adjudicado"]
+  sub_headers = ["Buenas Prácticas de Manufactura (BPM)", "Buenas Prácticas de Almacenamiento (BPA)",
+                 "Bienes Producidos en el pais", "Tipo de Proponente (MyPE, OECA, APP)"]
+  if preferencia:
+    # Cabecera de dos filas: "Márgenes de Preferencia" agrupa las sub-columnas
+    header_rows = (
+      "<tr>" + "".join(f"<td rowspan=\"2\">{h}</td>" for h in base_headers)
+      + f"<td colspan=\"{len(sub_headers)}\">Márgenes de Preferencia</td></tr>"
+      + _tr(*sub_headers)
+    )
+    width = len(base_headers) + len(sub_headers)
+  else:
+    header_rows = _tr(*base_headers)
+    width = len(base_headers)
+
+  adjudicados, desiertos = [], []
+  for desc in descs:
+    if rnd.random() < 0.85:
+      cant = rnd.randint(1, 500)
+      unit = round(rnd.uniform(1, 20000), 2)
+      cells = [str(rnd.randint(10000000, 99999999)), desc, escape(rnd.choice(_MEDIDAS)), str(cant),
+               _fmt_num(unit * 1.1, european), _fmt_num(unit, european), _fmt_num(cant * unit, european),
+               escape(rnd.choice(_EMPRESAS))]
+      if preferencia:
+        cells += ["Si", "No", "Si", "MyPE"]
+      adjudicados.append(_tr(*cells))
+    else:
+      desiertos.append(_tr(str(rnd.randint(10000000, 99999999)), desc,
+                           _fmt_num(rnd.uniform(100, 50000), european), "No se presentaron propuestas"))
+
+  return (
+    "<table><tr><td class=\"FormularioEtiqueta\">"
+    "<strong class=\"FormularioEtiquetaCUCE\">CUCE:</strong> "
+    f"<strong class=\"FormularioEtiquetaCUCE\">{cuce}</strong></td></tr></table>"
+    "<table>"
+    f"<tr><td colspan=\"{width}\">{titulo}</td></tr>"
+    + header_rows + "".join(adjudicados)
+    + "</table>"
+    "<table>"
+    "<tr><td colspan=\"4\">DETALLE DE ITEMS DESIERTOS</td></tr>"
+    + _tr("Código Catalogo", "Descripción", "Precio referencial total", "Causal de declaratoria desierta")
+    + "".join(desiertos)
+    + "</table>"
+  )
+
+def _form_400(rnd, cuce, descs, european, form_type):
+  headers = ["Código del Catálogo (UNSPSC)", "Descripción del bien, obra, servicio general o de consultoría",
+             "Unidad de medida", "Cantidad / Cantidad estimada si es variable", "Precio unitario",
+             "Monto total (p.unit. x cantidad) / Total estimado cuando la cantidad es variable", "Origen del item"]
+  rows, total = [], 0.0
+  for desc in descs:
+    cant = rnd.randint(1, 500)
+    unit = round(rnd.uniform(1, 20000), 2)
+    total += cant * unit
+    rows.append(_tr(str(rnd.randint(10000000, 99999999)), desc, escape(rnd.choice(_MEDIDAS)), str(cant),
+                    _fmt_num(unit, european), _fmt_num(cant * unit, european), "Nacional"))
+  return (
+    "<table><tr><td><font>DATOS DE LA ENTIDAD</font></td></tr>"
+    + _tr("Código", "-", "Sub", "Nombre", "Fax")
+    + _tr(str(rnd.randint(1, 999)), "-", str(rnd.randint(1, 99)), escape(rnd.choice(_ENTIDADES)), "2-2222222")
+    + "</table>"
+    "<table>"
+    + _tr("Código Proceso", cuce)
+    + _tr("Fecha de envío del formulario", f"{_fecha(rnd)} 10:31")
+    + _tr("Objeto de contratación")
+    + _tr("Modalidad de contratación")
+    + _tr("Adquisición de bienes para la gestión")
+    + _tr(escape(rnd.choice(_MODALIDADES)))
+    + "</table>"
+    "<table>"
+    + _tr("Tipo", "Gestión", "Decreto", "Normativa")
+    + _tr("Bienes", "2024", "0181", "D.S. 0181")
+    + _tr("Tipo de contratación")
+    + _tr("Bienes", "Bienes")
+    + "</table>"
+    "<table>"
+    + _tr("Nro", "Proponente", "NIT", "Fecha de firma de contrato (día/mes/año)", "Monto", "Plazo", "Fecha de recepción")
+    + _tr("1", escape(rnd.choice(_EMPRESAS)), "1234567", _fecha(rnd), _fmt_num(total, european), "30", _fecha(rnd))
+    + "</table>"
+    "<table><tr><td><b>Moneda del contrato</b></td><td>Bolivianos</td></tr></table>"
+    "<table>"
+    + _tr(*headers) + "".join(rows)
+    + f"<tr><td colspan=\"6\">TOTAL</td><td>{_fmt_num(total, european)}</td></tr>"
+    + "</table>"
+  )
+
+def _form_500(rnd, cuce, descs, european, form_type):
+  if form_type == "FORM600":
+    titulo = "DETALLE DE BIENES"
+    headers = ["Código del Catálogo (UNSPSC)", "Objeto de Gasto (Partida)", "Nro. de contrato",
+               "Nombre o razón social de la empresa contratada",
+               "Descripción del bien, obra o servicio objeto del contrato", "Estado de la recepción",
+               "Cantidad Contratada", "Cantidad resuelta", "Precio Unitario según contrato", "Monto según contrato"]
+  else:
+    titulo = "RECEPCIÓN DE BIENES"
+    headers = ["Nro. de contrato", "Fecha de firma de contrato", "Nombre o razón social de la empresa contratada",
+               "Descripción del bien, obra o servicio objeto del contrato", "Estado de la recepción",
+               "Cantidad Solicitada", "Cantidad Recepcionada/No Recepcionada",
+               "Fecha  de recepción según contrato (día/mes/año)",
+               "Fecha de recepción definitiva /  de emisión del informe de conformidad  (día/mes/año)",
+               "Monto real ejecutado"]
+  rows = []
+  for desc in descs:
+    cant = rnd.randint(1, 500)
+    unit = round(rnd.uniform(1, 20000), 2)
+    empresa = escape(rnd.choice(_EMPRESAS))
+    if form_type == "FORM600":
+      cells = [str(rnd.randint(10000000, 99999999)), "39800", f"C-{rnd.randint(1, 999)}", empresa, desc,
+               "Recepcionado", str(cant), "0", _fmt_num(unit, european), _fmt_num(cant * unit, european)]
+    else:
+      cells = [f"C-{rnd.randint(1, 999)}", _fecha(rnd), empresa, desc, "Recibido", str(cant), str(cant),
+               _fecha(rnd), _fecha(rnd), _fmt_num(cant * unit, european)]
+    rows.append(_tr(*cells))
+  return (
+    "<table>" + _tr("CUCE", cuce) + "</table>"
+    "<table>"
+    f"<tr><td colspan=\"{len(headers)}\"><font>{titulo}</font></td></tr>"
+    + _tr(*headers) + "".join(rows)
+    + "</table>"
+  )
+
+_BUILDERS = {
+  "FORM100": _form_100,
+  "FORM110": _form_100,
+  "FORM120": _form_120,
+  "FORM150": _form_150,
+  "FORM170": _form_170,
+  "FORM180": _form_170,
+  "FORM190": _form_400,
+  "FORM200": _form_170,
+  "FORM220": _form_170,
+  "FORM300": _form_400,
+  "FORM400": _form_400,
+  "FORM500": _form_500,
+  "FORM600": _form_500,
+}
+
+def generate_form(form_type, n_items=10, seed=0, cuce=None, preferencia=False,
+    duplicates=0.05, nested=True, european=False, descripciones=None):
+  """
+  Genera el HTML de un formulario sintético del tipo dado con n_items filas.
+  `descripciones` permite reutilizar descripciones existentes (ej. para el matching de 500/600).
+  """
+  form_type = form_type.upper()
+  if form_type not in _BUILDERS:
+    raise ValueError(f"Tipo de formulario no soportado: {form_type}")
+  rnd = random.Random(f"{form_type}-{n_items}-{seed}")
+  cuce = cuce or random_cuce(rnd)
+  descs = list(descripciones) if descripciones is not None else _descripciones(rnd, n_items, duplicates, nested)
+  builder = _BUILDERS[form_type]
+  if builder is _form_170:
+    body = builder(rnd, cuce, descs, european, form_type, preferencia=preferencia)
+  else:
+    body = builder(rnd, cuce, descs, european, form_type)
+  return _page(body)
+
+def generate_case(form_type, n_items=10, seed=0, existing_items=None, **kwargs):
+  """
+  Genera un caso completo: (file_name, html, items_existentes).
+  Para 500/600 los items existentes comparten descripción con la mayoría de filas
+  del formulario; `existing_items` controla cuántos hay en la BD (por defecto n_items).
+  """
+  form_type = form_type.upper()
+  rnd = random.Random(f"case-{form_type}-{n_items}-{seed}")
+  cuce = kwargs.pop("cuce", None) or random_cuce(rnd)
+  file_name = f"{cuce}_{form_type}_1.html"
+
+  existing = {}
+  if form_type in ("FORM500", "FORM600", "FORM170", "FORM180", "FORM190", "FORM200", "FORM220"):
+    n_existing = n_items if existing_items is None else existing_items
+    descs = _descripciones(rnd, max(n_existing, n_items), kwargs.get("duplicates", 0.05), kwargs.get("nested", True))
+    for i, desc in enumerate(descs[:n_existing]):
+      existing[f"{cuce}_existente_{i}"] = {"cuce": cuce, "descripcion": desc, "estado": "Publicado"}
+    # ~90% de las filas coinciden con un item existente, el resto son nuevas
+    form_descs = [d if rnd.random() < 0.9 else f"{d} (nuevo)" for d in descs[:n_items]]
+    html = generate_form(form_type, n_items, seed=seed, cuce=cuce, descripciones=form_descs, **kwargs)
+  else:
+    html = generate_form(form_type, n_items, seed=seed, cuce=cuce, **kwargs)
+
+  return file_name, html, existing
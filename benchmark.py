@@ -0,0 +1,134 @@
+import argparse
+import contextlib
+import importlib
+import io
+import math
+import time
+
+from bench.fake_db import FakeFirestore
+from bench.synthetic import FORM_TYPES, generate_case
+from shared.sinks import SqliteSink
+
+# ==========================================
+# Benchmark de processors con formularios sintéticos
+# ==========================================
+# Uso: python benchmark.py --forms FORM100,FORM500 --sizes 10,100,1000,5000
+# Mide tiempo por formulario y por item, y estima el exponente de escalado
+# (pendiente log-log) para detectar comportamiento cuadrático.
+
+DEFAULT_SIZES = "10,100,1000"
+ARCHIVO_SALIDA = "bench_output.txt"
+SINKS = ("memory", "sqlite")
+
+def make_db(sink, existing=None):
+  """memory: FakeFirestore; sqlite: SqliteSink en memoria (mide también el costo de escritura)."""
+  db = SqliteSink(":memory:") if sink == "sqlite" else FakeFirestore()
+  if existing:
+    if sink == "sqlite":
+      for doc_id, data in existing.items():
+        db.collection("items").document(doc_id).set(data)
+      db.reads = db.writes = 0
+    else:
+      db.seed("items", existing)
+  return db
+
+def get_processor(form_type):
+  code = form_type.upper().replace("FORM", "")
+  module = importlib.import_module(f"processors.form_{code}")
+  fn = getattr(module, f"process_{code}", None)
+  if fn is None:
+    # Algunos módulos definen el processor con otro nombre (copias de otro form)
+    candidates = [name for name in dir(module) if name.startswith("process_")]
+    if candidates:
+      fn = getattr(module, candidates[0])
+  return fn
+
+def run_once(form_type, n_items, seed=0, sink="memory", **kwargs):
+  processor = get_processor(form_type)
+  file_name, html, existing = generate_case(form_type, n_items, seed=seed, **kwargs)
+
+  db = make_db(sink, existing)
+
+  # Los processors imprimen mucho; lo descartamos para no medir la consola
+  with contextlib.redirect_stdout(io.StringIO()):
+    start = time.perf_counter()
+    processor(html, file_name, db)
+    elapsed = time.perf_counter() - start
+
+  return {
+    "form": form_type,
+    "items": n_items,
+    "bytes": len(html.encode("utf-8")),
+    "seconds": elapsed,
+    "reads": db.reads,
+    "writes": db.writes,
+  }
+
+def scaling_exponent(results):
+  """Pendiente log-log entre el tamaño más chico y el más grande (1 = lineal, 2 = cuadrático)."""
+  points = [(r["items"], r["seconds"]) for r in results if r["items"] > 0 and r["seconds"] > 0]
+  if len(points) < 2:
+    return None
+  (n0, t0), (n1, t1) = points[0], points[-1]
+  if n1 == n0:
+    return None
+  return math.log(t1 / t0) / math.log(n1 / n0)
+
+def run_benchmark(forms, sizes, repeat=1, seed=0, sink="memory", **kwargs):
+  report = []
+  for form_type in forms:
+    results = []
+    for n_items in sizes:
+      best = None
+      for r in range(repeat):
+        result = run_once(form_type, n_items, seed=seed + r, sink=sink, **kwargs)
+        if best is None or result["seconds"] < best["seconds"]:
+          best = result
+      results.append(best)
+    report.append((form_type, results, scaling_exponent(results)))
+  return report
+
+def format_report(report):
+  lines = [f"{'form':<8} {'items':>7} {'KB':>9} {'ms':>10} {'ms/item':>9} {'reads':>7} {'writes':>7}"]
+  for form_type, results, exponent in report:
+    for r in results:
+      per_item = (r["seconds"] * 1000 / r["items"]) if r["items"] else 0
+      lines.append(
+        f"{form_type:<8} {r['items']:>7} {r['bytes'] / 1024:>9.1f} {r['seconds'] * 1000:>10.1f} "
+        f"{per_item:>9.3f} {r['reads']:>7} {r['writes']:>7}"
+      )
+    if exponent is not None:
+      flag = "  ⚠️ posible comportamiento cuadrático" if exponent > 1.5 else ""
+      lines.append(f"{form_type:<8} escalado ~ n^{exponent:.2f}{flag}")
+  return "\n".join(lines)
+
+def main():
+  parser = argparse.ArgumentParser(description="Benchmark de processors con formularios sintéticos")
+  parser.add_argument("--forms", default=",".join(FORM_TYPES), help="Tipos separados por coma (ej. FORM100,FORM500)")
+  parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Cantidad de items por formulario, separados por coma")
+  parser.add_argument("--repeat", type=int, default=1, help="Repeticiones por tamaño (se toma la mejor)")
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--duplicates", type=float, default=0.05, help="Fracción de descripciones repetidas")
+  parser.add_argument("--preferencia", action="store_true", help="Cabecera de dos filas 'Preferencia' en 170-220")
+  parser.add_argument("--european", action="store_true", help="Números con formato 1.234,56")
+  parser.add_argument("--sink", choices=SINKS, default="memory", help="Destino de escritura")
+  parser.add_argument("--output", default=ARCHIVO_SALIDA)
+  args = parser.parse_args()
+
+  forms = [f.strip().upper() for f in args.forms.split(",") if f.strip()]
+  sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+  print(f"🚀 Benchmark: {len(forms)} formularios x {len(sizes)} tamaños")
+  report = run_benchmark(
+    forms, sizes, repeat=args.repeat, seed=args.seed, sink=args.sink,
+    duplicates=args.duplicates, preferencia=args.preferencia, european=args.european
+  )
+  text = format_report(report)
+  print(text)
+
+  with open(args.output, "w", encoding="utf-8") as f:
+    f.write(text + "\n")
+  print(f"\n✅ Resultados guardados en {args.output}")
+
+if __name__ == "__main__":
+  main()
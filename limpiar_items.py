@@ -0,0 +1,92 @@
+import argparse
+
+from google.cloud import firestore
+from tqdm import tqdm
+
+from shared.firestore import get_items_by_cuce
+from shared.ids import is_current_id
+from shared.item_keys import ItemKeys, match_key
+from shared.sinks import SqliteSink
+
+# ==========================================
+# Limpieza de items con ids del esquema anterior (una sola vez)
+# ==========================================
+# Los ids de items salen ahora solo de la identidad de la fila (shared/ids.py):
+# los repetidos son slug-1, slug-2 (antes slug_1, slug_2 según el orden) y las
+# filas con código de catálogo llevan su hash. Un backfill con el código
+# actual escribe los items con los ids nuevos pero no borra los viejos, que
+# quedan huérfanos: aparecen dos veces en búsquedas y exportaciones, y sus
+# entradas en item_claves compiten con las nuevas en el matching de 500/600.
+#
+# Orden:
+#   1. Backfill completo con el código actual (todos los formularios).
+#   2. python limpiar_items.py             # lista lo que se borraría
+#   3. python limpiar_items.py --borrar
+# Un item viejo solo se borra si su CUCE ya tiene un item con id actual y la
+# misma descripción (su reemplazo). Los que no tienen reemplazo se listan
+# aparte: ese CUCE todavía no se reprocesó. Después de borrar se reescribe
+# item_claves/{cuce} sin las entradas de los items borrados.
+
+def plan_cleanup(docs):
+  """
+  {cuce: (ids viejos con reemplazo, ids viejos sin reemplazo)}, solo de los
+  CUCEs que tienen ids viejos. `docs`: snapshots de la colección items.
+  """
+  by_cuce = {}
+  for doc in docs:
+    data = doc.to_dict() or {}
+    cuce = data.get("cuce")
+    if not cuce or not doc.id.startswith(f"{cuce}_"):
+      continue
+    ident = doc.id[len(cuce) + 1:]
+    by_cuce.setdefault(cuce, []).append((doc.id, is_current_id(ident, data), match_key(data.get("descripcion"))))
+
+  plan = {}
+  for cuce, items in by_cuce.items():
+    current = {clave for _, ok, clave in items if ok}
+    stale = [doc_id for doc_id, ok, clave in items if not ok and clave in current]
+    unmatched = [doc_id for doc_id, ok, clave in items if not ok and clave not in current]
+    if stale or unmatched:
+      plan[cuce] = (sorted(stale), sorted(unmatched))
+  return plan
+
+def limpiar_cuce(db, cuce, doc_ids):
+  """Borra los items y reescribe el índice del CUCE con los que quedan."""
+  for doc_id in doc_ids:
+    db.collection("items").document(doc_id).delete()
+  ItemKeys.from_docs(cuce, get_items_by_cuce(db, cuce)).save(db, replace=True)
+
+def main():
+  parser = argparse.ArgumentParser(description="Borra los items con ids del esquema anterior (después del backfill completo)")
+  parser.add_argument("--sqlite", default=None, help="Usar un SqliteSink en vez de Firestore")
+  parser.add_argument("--borrar", action="store_true", help="Borrar (por defecto solo se listan)")
+  args = parser.parse_args()
+
+  db = SqliteSink(args.sqlite) if args.sqlite else firestore.Client()
+  print("🔎 Leyendo items...")
+  plan = plan_cleanup(db.collection("items").stream())
+
+  sin_reemplazo = 0
+  for cuce, (stale, unmatched) in sorted(plan.items()):
+    for doc_id in stale:
+      print(f"🗑️ {doc_id}")
+    for doc_id in unmatched:
+      print(f"⚠️ {doc_id} (sin reemplazo: falta reprocesar {cuce})")
+    sin_reemplazo += len(unmatched)
+
+  borrar = {cuce: stale for cuce, (stale, _) in plan.items() if stale}
+  total = sum(len(stale) for stale in borrar.values())
+  print(f"\n📋 {total} items viejos con reemplazo en {len(borrar)} CUCEs | {sin_reemplazo} sin reemplazo")
+
+  if args.borrar and borrar:
+    for cuce, stale in tqdm(borrar.items(), unit="cuce"):
+      limpiar_cuce(db, cuce, stale)
+    print(f"✅ {total} items borrados")
+  elif borrar:
+    print("ℹ️ Solo listado; usar --borrar para borrarlos")
+
+  if args.sqlite:
+    db.close()
+
+if __name__ == "__main__":
+  main()
@@ -1,3 +1,5 @@
+import os
+
 import functions_framework
 from google.cloud import storage
 from google.cloud import firestore
@@ -17,10 +19,47 @@ from processors import (
   form_500,
   form_600
 )
+from shared.stream import DownloadError, drop_sections, iter_blob_chunks, read_blob_text
+from shared.loader import add_error_listener, add_listener, set_item_workers
+from shared.deadletter import DESCARGA, EXTRACCION, DeadLetterStore
+from shared.rollups import RollupUpdater
+from shared.fingerprint import FingerprintClient
+from shared.manifest import newer_revision_exists, parse_file_name
 
 storage_client = storage.Client()
 db = firestore.Client()
 
+# Exportación Parquet opcional (ej. EXPORT_URI=gs://bucket/exports/items).
+# Sin flush por evento: cada partición se escribe al juntar EXPORT_ROWS filas o
+# cuando lleva EXPORT_MAX_AGE segundos en el buffer (ver shared/export.py)
+EXPORT_URI = os.environ.get("EXPORT_URI")
+if EXPORT_URI:
+    from shared.export import ParquetExporter
+    exporter = ParquetExporter(
+        EXPORT_URI,
+        rows_per_file=int(os.environ.get("EXPORT_ROWS", "5000")),
+        max_age=float(os.environ.get("EXPORT_MAX_AGE", "600"))
+    )
+    add_listener(exporter.add)
+
+# Resúmenes incrementales en "resumenes" (ROLLUPS=0 para desactivar)
+if os.environ.get("ROLLUPS", "1") != "0":
+    add_listener(RollupUpdater(db))
+
+# Fallas (descarga, extracción, carga) en la colección dead_letters; replay.py las reprocesa
+dead_letters = DeadLetterStore(db)
+add_listener(dead_letters.on_loaded)
+add_error_listener(dead_letters.on_load_error)
+
+# Omitir escrituras idénticas a la última (eventos reenviados, re-ejecuciones).
+# FINGERPRINTS=1: la huella se guarda también en los documentos de datos (sobrevive a
+# cold starts; con el cache frío cuesta una lectura antes de cada escritura)
+if os.environ.get("FINGERPRINTS") == "1":
+    db = FingerprintClient(db, doc_field=True)
+
+# Items de un formulario escritos en paralelo sobre el mismo cliente (ITEM_WORKERS=1 = en serie)
+set_item_workers(int(os.environ.get("ITEM_WORKERS", "8")))
+
 @functions_framework.cloud_event
 def router_process(cloud_event):
     data = cloud_event.data
@@ -35,15 +74,43 @@ def router_process(cloud_event):
 
     bucket = storage_client.bucket(bucket_name)
     blob = bucket.blob(file_name)
+
+    # Si ya se subió una revisión posterior, esta quedó obsoleta (la nueva la reemplaza)
+    entry = parse_file_name(file_name)
+    if entry:
+        try:
+            if newer_revision_exists(bucket, entry):
+                print(f"⏩ Revisión obsoleta (existe la {entry.revision + 1}): {file_name}")
+                return
+        except Exception as e:
+            print(f"⚠️ No se pudo verificar revisiones de {file_name}: {e}")
+
+    # 2. Enrutamiento (Router)
+    name_upper = file_name.split("_")[-2].upper()
+
+    # El 120 solo necesita el CUCE: se le pasan los chunks y deja de leer el blob al encontrarlo
     try:
-        content = blob.download_as_text(encoding="utf-8")
+        if name_upper == "FORM120":
+            content = drop_sections(iter_blob_chunks(blob))
+        else:
+            content = read_blob_text(blob)
     except Exception as e:
         print(f"Error descargando: {e}")
+        dead_letters.record(file_name, DESCARGA, e, form=name_upper)
         return
 
-    # 2. Enrutamiento (Router)
-    name_upper = file_name.split("_")[-2].upper()
+    try:
+        enrutar(name_upper, content, file_name)
+    except DownloadError as e:
+        # FORM120 lee el blob recién durante la extracción
+        print(f"Error descargando: {e}")
+        dead_letters.record(file_name, DESCARGA, e, form=name_upper)
+        return
+    except Exception as e:
+        dead_letters.record(file_name, EXTRACCION, e, form=name_upper)
+        raise
 
+def enrutar(name_upper, content, file_name):
     match name_upper:
         case "FORM100":
             form_100.process_100(content, file_name, db)
@@ -0,0 +1,7 @@
+import importlib
+
+def get_extractor(form):
+  """extract_<n> del processor de un formulario ("FORM190" -> form_190.extract_190)."""
+  code = form.upper().replace("FORM", "")
+  module = importlib.import_module(f"processors.form_{code}")
+  return getattr(module, f"extract_{code}")
@@ -1,26 +1,40 @@
-from bs4 import BeautifulSoup
 import re
 from shared.utils import (
     clean_text,
     extract_cronograma,
-    extract_modalidad,
-    generate_slug,
-    parse_float
+    extract_modalidad
 )
-from shared.firestore import (
-    insert_convocatoria,
-    insert_entidad,
-    insert_item
-)
-
-def process_110(html_content, file_name, db):
+from shared.tables import compile_header_map, extract_records
+from shared.firestore import coerce_items
+from shared.prune import parse_form
+from shared.ids import item_ids
+from shared.records import FormRecords, ENTIDAD_INSERT_MISSING
+from shared.loader import load_form
+
+ITEMS_TITLE = re.compile(r'Código del? Catálogo')
+
+ITEMS_HEADERS = compile_header_map({
+  "Código del Catálogo": "catalogo_cod",
+  "Descripción del bien o servicio": "descripcion",
+  "Unidad de Medida": "medida",
+  "Cantidad": "cantidad_solicitada",
+  "Precio referencial unitario": "precio_referencial",
+  "Precio referencial total": "precio_referencial_total",
+  "Precio Unitario del Proveedor Preseleccionado": "precio_referencial",
+  "Precio Total del Proveedor Preseleccionado": "precio_referencial_total"
+})
+
+def extract_110(html_content, file_name):
   print(f"--- Procesando Formulario 110: {file_name} ---")
   
+  result = FormRecords("FORM110", file_name)
+
   try:
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = parse_form(html_content, "FORM110")
   except Exception as e:
     print(f"Error parseando HTML en {file_name}: {e}")
-    return
+    result.add_error(e)
+    return result
 
   entidad_data = {}
   convocatoria_data = {}
@@ -42,23 +56,19 @@ def process_110(html_content, file_name, db):
         "departamento": None 
       }
 
+      # El departamento lo completa el loader si la entidad ya existe
       if entidad_data.get("cod"):
-        entidad_ref = db.collection("entidades").document(entidad_data["cod"])
-        entidad_snapshot = entidad_ref.get()
-
-      if entidad_snapshot.exists:
-        entidad_data["departamento"] = entidad_snapshot.to_dict().get("departamento")
-      else:
-        insert_entidad(
-          db, 
+        result.add_entidad(
           entidad_data["cod"], 
           entidad_data["nombre"], 
           fax=entidad_data["fax"], 
-          telefono=entidad_data["telefono"]
+          telefono=entidad_data["telefono"],
+          mode=ENTIDAD_INSERT_MISSING
         )
 
   except Exception as e:
     print(f"Error extrayendo entidad en {file_name}: {e}")
+    result.add_error(e)
 
   # ==========================================
   # 2. CONVOCATORIA
@@ -69,7 +79,7 @@ def process_110(html_content, file_name, db):
       convocatoria_data['cuce'] = clean_text(convocatoria_cuce.get_text())
     else:
       print(f"Advertencia: No se encontró CUCE en {file_name}")
-      return
+      return result
 
     mapping = {
       'Fecha de publicación (en el SICOES)': 'fecha_publicacion',
@@ -105,59 +115,29 @@ def process_110(html_content, file_name, db):
     # ==========================================
     # 3. ITEMS Y TOTAL
     # ==========================================
-    items_table = soup.find("td", string=re.compile(r'Código del? Catálogo'))
+    items_title = soup.find("td", string=ITEMS_TITLE)
     
-    if items_table:
-      items_table = items_table.find_parent("tr").find_parent("table")
-      
-      items_cols_size = len(soup.find("td", string=re.compile(r'Código del? Catálogo')).find_parent("tr").find_all('td'))
-      [table.decompose() for table in items_table.find_all('table')]
-      [row.decompose() for row in items_table.find_all("tr") if len(row.find_all('td')) != items_cols_size]
-      
-      rows = items_table.find_all("tr")
-      if len(rows) > 1:
-        headers = [h.get_text(strip=True) for h in rows[0].find_all("td")]
-        
-        map_headers = {
-          "Código del Catálogo": "catalogo_cod",
-          "Descripción del bien o servicio": "descripcion",
-          "Unidad de Medida": "medida",
-          "Cantidad": "cantidad_solicitada",
-          "Precio referencial unitario": "precio_referencial",
-          "Precio referencial total": "precio_referencial_total",
-          "Precio Unitario del Proveedor Preseleccionado": "precio_referencial",
-          "Precio Total del Proveedor Preseleccionado": "precio_referencial_total"
-        }
-        headers = [map_headers.get(h, h.lower().replace(" ", "_")) for h in headers]
-
-        for row in rows[1:]:
-          cols = row.find_all("td", recursive=False)
-          
-          if not cols or len(cols) < 2 or cols[0].get_text().startswith("#"): continue
-
-          item = {}
-
-          for i in range(len(cols)):
-            if i < len(headers):
-              key = headers[i]
-              # Mantenemos HTML en descripción
-              if key == 'descripcion':
-                item[key] = cols[i].decode_contents().strip()
-              else:
-                item[key] = clean_text(cols[i].get_text().strip())
-          items_data.append(item)
+    if items_title:
+      header_tr = items_title.find_parent("tr")
+      records = extract_records(
+        header_tr.find_parent("table"), ITEMS_HEADERS,
+        header_row=header_tr, same_width=True, skip_prefix="#"
+      )
+      items_data = records.as_dicts()
+
+    # Cantidades, precios y fechas se parsean por columna (una pasada por tabla)
+    items_data = coerce_items(items_data)
 
     total = 0.0
     for item in items_data:
-      total += parse_float(item.get('precio_referencial_total')) or 0.0
+      total += item.get('precio_referencial_total') or 0.0
     convocatoria_data['total_referencial'] = total
 
     # ==========================================
     # 4. GUARDADO FINAL (CON CAMPOS EXTRA Y SLUGS)
     # ==========================================
        
-    insert_convocatoria(
-      db,
+    result.add_convocatoria(
       cuce=convocatoria_data.get('cuce'),
 
       entidad_cod=entidad_data.get('cod'),
@@ -188,22 +168,11 @@ def process_110(html_content, file_name, db):
       forms=file_name.split("FORM")[-1].replace(".html", "")
     )
 
-    # Set para controlar duplicados dentro de la misma convocatoria
-    used_slugs = set()
-
-    for i, item in enumerate(items_data):
-      raw_desc = item.get('descripcion', f'item_{i}')
-      slug_base = generate_slug(raw_desc)
-      slug_final = slug_base
-      counter = 1
-      while slug_final in used_slugs:
-        slug_final = f"{slug_base}_{counter}"
-        counter += 1
-      
-      used_slugs.add(slug_final)
+    # IDs deterministas: catálogo + descripción + ocurrencia
+    slugs = item_ids(items_data)
 
-      insert_item(
-        db,
+    for item, slug_final in zip(items_data, slugs):
+      result.add_item(
         cuce=convocatoria_data.get('cuce'),
         item_identifier=slug_final,
 
@@ -228,4 +197,10 @@ def process_110(html_content, file_name, db):
     print(f"✅ Formulario 110 procesado: {convocatoria_data.get('cuce')}")
 
   except Exception as e:
-    print(f"❌ Error fatal procesando {file_name}: {e}")
\ No newline at end of file
+    print(f"❌ Error fatal procesando {file_name}: {e}")
+    result.add_error(e)
+
+  return result
+
+def process_110(html_content, file_name, db):
+  return load_form(db, extract_110(html_content, file_name))
@@ -1,32 +1,59 @@
-from bs4 import BeautifulSoup
 import re
 from shared.utils import clean_text, parse_float, generate_slug
-from shared.firestore import insert_entidad, insert_convocatoria, insert_item
+from shared.scan import ScanField, scan_fields
+from shared.prune import parse_form
+from shared.records import FormRecords
+from shared.loader import load_form
+from shared.stream import DownloadError
 
-def process_120(html_content, file_name, db):
+# El 120 solo necesita el CUCE: se escanea sin construir el árbol
+SCAN_FIELDS = {"cuce": ScanField("td", "FormularioCUCE")}
+
+def find_cuce(html_content):
+    """CUCE por escaneo; si la forma del HTML no es la esperada, vuelve al árbol completo."""
+    scan = scan_fields(html_content, SCAN_FIELDS)
+    if scan.complete:
+        return scan.fields["cuce"]
+
+    soup = parse_form(scan.text, "FORM120")
+    convocatoria_cuce = soup.find('td', class_='FormularioCUCE')
+    if convocatoria_cuce:
+        return clean_text(convocatoria_cuce.get_text())
+    return None
+
+def extract_120(html_content, file_name):
     print(f"--- Procesando Formulario 120: {file_name} ---")
-    
+
+    result = FormRecords("FORM120", file_name)
+
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        cuce = find_cuce(html_content)
+    except DownloadError:
+        # El contenido llega por chunks: una falla de descarga no es un error de parseo
+        raise
     except Exception as e:
         print(f"Error parseando HTML en {file_name}: {e}")
-        return
+        result.add_error(e)
+        return result
 
     try:
-        convocatoria_cuce = soup.find('td', class_='FormularioCUCE')
-        if convocatoria_cuce:
-            cuce = clean_text(convocatoria_cuce.get_text())
-            insert_convocatoria(
-                db,
+        if cuce:
+            result.add_convocatoria(
                 cuce=cuce,
                 estado="Publicado",
                 forms="FORM120"
             )
         else:
             print(f"Advertencia: No se encontró CUCE en {file_name}")
-            return
+            return result
 
         print(f"✅ Formulario 120 procesado: {cuce}")
 
     except Exception as e:
-        print(f"❌ Error fatal procesando {file_name}: {e}")
\ No newline at end of file
+        print(f"❌ Error fatal procesando {file_name}: {e}")
+        result.add_error(e)
+
+    return result
+
+def process_120(html_content, file_name, db):
+    return load_form(db, extract_120(html_content, file_name))
@@ -1,16 +1,36 @@
-from bs4 import BeautifulSoup
 import re
-from shared.utils import clean_text, parse_float, generate_slug
-from shared.firestore import insert_entidad, insert_convocatoria, insert_item
-
-def process_110(html_content, file_name, db):
-    print(f"--- Procesando Formulario 110: {file_name} ---")
+from shared.utils import clean_text, parse_float
+from shared.tables import compile_header_map, extract_records, row_cells, table_rows
+from shared.firestore import coerce_items
+from shared.prune import parse_form
+from shared.ids import item_ids
+from shared.records import FormRecords, ENTIDAD_UPSERT
+from shared.loader import load_form
+
+ITEM_NUMBER_RE = re.compile(r"[0-9]+")
+
+ITEMS_HEADERS = compile_header_map({
+    "Código del Catálogo": "cod_catalogo",
+    "Descripción del bien o servicio": "descripcion",
+    "Unidad de Medida": "medida",
+    "Cantidad": "cantidad_solicitada",
+    "Precio referencial unitario": "precio_referencial",
+    "Precio referencial total": "precio_referencial_total",
+    "Precio Unitario del Proveedor Preseleccionado": "precio_referencial",
+    "Precio Total del Proveedor Preseleccionado": "precio_referencial_total"
+})
+
+def extract_150(html_content, file_name):
+    print(f"--- Procesando Formulario 150: {file_name} ---")
     
+    result = FormRecords("FORM150", file_name)
+
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = parse_form(html_content, "FORM150")
     except Exception as e:
         print(f"Error parseando HTML en {file_name}: {e}")
-        return
+        result.add_error(e)
+        return result
 
     # Estructuras temporales
     entidad_data = {}
@@ -33,23 +53,18 @@ def process_110(html_content, file_name, db):
                 "departamento": None 
             }
 
-            # --- CONSULTA DE DEPARTAMENTO ---
+            # --- DEPARTAMENTO: lo completa el loader si la entidad ya existe ---
             if entidad_data.get("cod"):
-                entidad_ref = db.collection("entidades").document(entidad_data["cod"])
-                entidad_snap = entidad_ref.get()
-                
-                if entidad_snap.exists:
-                    entidad_data["departamento"] = entidad_snap.get("departamento")
-
-                insert_entidad(
-                    db, 
+                result.add_entidad(
                     entidad_data["cod"], 
                     entidad_data["nombre"], 
                     entidad_data["fax"], 
-                    entidad_data["telefono"]
+                    entidad_data["telefono"],
+                    mode=ENTIDAD_UPSERT
                 )
     except Exception as e:
         print(f"Error extrayendo entidad en {file_name}: {e}")
+        result.add_error(e)
 
     # ==========================================
     # 2. CONVOCATORIA (Datos Generales)
@@ -60,7 +75,7 @@ def process_110(html_content, file_name, db):
             convocatoria_data['cuce'] = clean_text(convocatoria_cuce.get_text())
         else:
             print(f"Advertencia: No se encontró CUCE en {file_name}")
-            return
+            return result
 
         mapping = {
             'Fecha de publicación (en el SICOES)': 'fecha_publicacion',
@@ -116,69 +131,26 @@ def process_110(html_content, file_name, db):
         if items_section:
             items_table = items_section.find_parent("tr").find_parent("table")
             
-            [item.decompose() for item in items_table.find_all('table')]
-            
             try:
-                total_raw = items_table.find_all("td")[-1].get_text()
+                total_raw = row_cells(table_rows(items_table)[-1])[-1].get_text()
                 convocatoria_data['total'] = parse_float(total_raw)
             except:
                 convocatoria_data['total'] = None
 
-            rows = items_table.find_all("tr")
-            
-            if len(rows) > 1:
-                headers = [h.get_text(strip=True) for h in rows[1].find_all("td")]
-                
-                map_headers = {
-                    "Código del Catálogo": "cod_catalogo",
-                    "Descripción del bien o servicio": "descripcion",
-                    "Unidad de Medida": "medida",
-                    "Cantidad": "cantidad_solicitada",
-                    "Precio referencial unitario": "precio_referencial",
-                    "Precio referencial total": "precio_referencial_total",
-                    "Precio Unitario del Proveedor Preseleccionado": "precio_referencial",
-                    "Precio Total del Proveedor Preseleccionado": "precio_referencial_total"
-                }
-                headers = [map_headers.get(h, h.lower().replace(" ", "_")) for h in headers]
-
-                # Iteramos desde la 2da hasta la penúltima (donde suele estar el total)
-                for row in rows[2:-1]:
-                    cols = row.find_all("td", recursive=False)
-                    
-                    if not cols or len(cols) < 2 or not re.fullmatch(r"[0-9]+", cols[0].get_text(strip=True)):
-                        continue
-                    
-                    item = {}
-                    
-                    # Limpiamos tag <b> para que la descripción quede limpia
-                    # (Esto ayuda a que el slug salga mejor después)
-                    b = row.find("b")
-                    if b: 
-                        # Extraemos el texto del <b> y lo reemplazamos en el árbol
-                        b.replace_with(b.get_text())
-
-                    for i in range(len(cols)):
-                        if i < len(headers):
-                            key = headers[i]
-                            # Usamos decode_contents para mantener estructura si la hubiera, 
-                            # aunque ya limpiamos el <b> arriba
-                            val = cols[i].decode_contents().strip()
-                            
-                            if key in ['cantidad_solicitada', 'precio_referencial', 'precio_referencial_total']:
-                                item[key] = parse_float(cols[i].get_text())
-                            else:
-                                item[key] = clean_text(cols[i].get_text())
-                    
-                    items_data.append(item)
+            # Cabecera en la 2da fila; iteramos hasta la penúltima (donde suele estar el total)
+            records = extract_records(
+                items_table, ITEMS_HEADERS, header_row=1, stop=1, html_fields=(),
+                row_filter=lambda cols: ITEM_NUMBER_RE.fullmatch(cols[0].get_text(strip=True))
+            )
+            items_data = coerce_items(records.as_dicts())
 
         # ==========================================
         # 4. GUARDADO FINAL (CON CAMPOS EXTRA Y SLUGS)
         # ==========================================
         
-        insert_convocatoria(
-            db,
+        result.add_convocatoria(
             cuce=convocatoria_data.get('cuce'),
-            cod_entidad=entidad_data.get('cod'),
+            entidad_cod=entidad_data.get('cod'),
             entidad_nombre=entidad_data.get('nombre'),
             entidad_departamento=entidad_data.get('departamento'),
             fecha_publicacion=convocatoria_data.get('fecha_publicacion'),
@@ -195,18 +167,18 @@ def process_110(html_content, file_name, db):
             moneda=convocatoria_data.get('moneda'),
             elaboracion_dbc=convocatoria_data.get('elaboracion_dbc'),
             recurrente_sgte_gestion=convocatoria_data.get('recurrente_sgte_gestion'),
-            total=convocatoria_data.get('total'),
+            total_referencial=convocatoria_data.get('total'),
             fecha_presentacion=convocatoria_data.get('fecha_presentacion'),
             fecha_formalizacion=convocatoria_data.get('fecha_formalizacion'),
             fecha_entrega=convocatoria_data.get('fecha_entrega'),
             estado="Publicado",
-            forms="FORM110"
+            forms="FORM150"
         )
 
-        # Set para controlar duplicados dentro de la misma convocatoria
-        used_slugs = set()
+        # IDs deterministas: catálogo + descripción + ocurrencia
+        slugs = item_ids(items_data)
 
-        for i, item in enumerate(items_data):
+        for item, slug_final in zip(items_data, slugs):
             # A. Inyección de datos de entidad y modalidad
             item['entidad_cod'] = entidad_data.get('cod')
             item['entidad_nombre'] = entidad_data.get('nombre')
@@ -215,23 +187,16 @@ def process_110(html_content, file_name, db):
             item['estado'] = "Publicado"
             item['tipo_convocatoria'] = convocatoria_data.get('tipo_convocatoria')
 
-            # B. Generación de Slug (ID legible)
-            raw_desc = item.get('descripcion', f'item_{i}')
-            slug_base = generate_slug(raw_desc)
-            
-            # C. Manejo de duplicados
-            slug_final = slug_base
-            counter = 1
-            while slug_final in used_slugs:
-                slug_final = f"{slug_base}_{counter}"
-                counter += 1
-            
-            used_slugs.add(slug_final)
-
-            # D. Insertar pasando el item completo y el slug
-            insert_item(db, item, convocatoria_data.get('cuce'), slug_final)
+            # B. Insertar pasando el item completo y el slug
+            result.add_item(convocatoria_data.get('cuce'), slug_final, item)
 
-        print(f"✅ Formulario 110 procesado: {convocatoria_data.get('cuce')}")
+        print(f"✅ Formulario 150 procesado: {convocatoria_data.get('cuce')}")
 
     except Exception as e:
-        print(f"❌ Error fatal procesando {file_name}: {e}")
\ No newline at end of file
+        print(f"❌ Error fatal procesando {file_name}: {e}")
+        result.add_error(e)
+
+    return result
+
+def process_150(html_content, file_name, db):
+    return load_form(db, extract_150(html_content, file_name))
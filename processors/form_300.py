@@ -1,30 +1,41 @@
-from bs4 import BeautifulSoup
 import re
-import unicodedata
-from shared.utils import clean_text, parse_float, generate_slug
-from shared.firestore import insert_entidad, insert_convocatoria, insert_item
-
-# --- Función Helper para crear IDs limpios ---
-def generate_slug(text):
-    if not text: return "item"
-    # 1. Quitar HTML tags (si quedaron)
-    text = BeautifulSoup(text, "html.parser").get_text(separator=" ")
-    # 2. Normalizar unicode (quitar acentos)
-    text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('utf-8')
-    # 3. Quitar caracteres especiales
-    text = re.sub(r'[^\w\s-]', '', text).lower()
-    # 4. Reemplazar espacios
-    text = re.sub(r'[-\s]+', '_', text).strip('-_')
-    return text[:60]
-
-def process_400(html_content, file_name, db):
-    print(f"--- Procesando Formulario 400: {file_name} ---")
+from shared.utils import clean_text, parse_float
+from shared.tables import compile_header_map, extract_records
+from shared.firestore import coerce_items
+from shared.prune import parse_form
+from shared.ids import item_ids
+from shared.records import FormRecords, ENTIDAD_UPSERT
+from shared.loader import load_form
+
+ITEMS_TITLE = re.compile(r'Código del? (Catálogo|Catalogo)', re.IGNORECASE)
+
+# Mapeo directo a nombres estándar de la BD
+ITEMS_HEADERS = compile_header_map({
+    "Código del Catálogo": "cod_catalogo",
+    "Código del Catálogo (UNSPSC)": "cod_catalogo",
+    "Descripción del bien o servicio": "descripcion",
+    "Descripción del bien, obra, servicio general o de consultoría": "descripcion",
+    "Unidad de Medida": "unidad",
+    "Cantidad": "cantidad",
+    "Cantidad / Cantidad estimada si es variable": "cantidad",
+    "Precio unitario": "precio_unitario",
+    "Precio referencial unitario": "precio_unitario",
+    "Precio referencial total": "precio_total",
+    "Monto total (p.unit. x cantidad) / Total estimado cuando la cantidad es variable": "precio_total",
+    "Origen del item": "origen"
+})
+
+def extract_300(html_content, file_name):
+    print(f"--- Procesando Formulario 300: {file_name} ---")
     
+    result = FormRecords("FORM300", file_name)
+
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = parse_form(html_content, "FORM300")
     except Exception as e:
         print(f"Error parseando HTML en {file_name}: {e}")
-        return
+        result.add_error(e)
+        return result
 
     # Estructuras temporales
     entidad_data = {}
@@ -51,24 +62,18 @@ def process_400(html_content, file_name, db):
                 "departamento": None
             }
 
-            # --- CONSULTAR DEPARTAMENTO ---
+            # --- DEPARTAMENTO: lo completa el loader si la entidad ya existe ---
             if entidad_data.get("cod"):
-                entidad_ref = db.collection("entidades").document(entidad_data["cod"])
-                entidad_snap = entidad_ref.get()
-                
-                if entidad_snap.exists:
-                    existing_data = entidad_snap.to_dict()
-                    entidad_data["departamento"] = existing_data.get("departamento")
-
-                insert_entidad(
-                    db, 
+                result.add_entidad(
                     entidad_data["cod"], 
                     entidad_data["nombre"], 
                     entidad_data["fax"], 
-                    entidad_data["telefono"]
+                    entidad_data["telefono"],
+                    mode=ENTIDAD_UPSERT
                 )
     except Exception as e:
         print(f"Error extrayendo entidad en {file_name}: {e}")
+        result.add_error(e)
 
     # ==========================================
     # 2. CONVOCATORIA
@@ -80,7 +85,7 @@ def process_400(html_content, file_name, db):
             convocatoria_data['cuce'] = clean_text(convocatoria_cuce.find_next_sibling('td').get_text())
         else:
             print(f"Advertencia: No se encontró CUCE en {file_name}")
-            return
+            return result
 
         # Recuperar filas base para Modalidad y Objeto
         try:
@@ -89,6 +94,7 @@ def process_400(html_content, file_name, db):
             convocatoria_data['objeto'] = clean_text(convocatoria_rows[4].find_all('td')[0].get_text(strip=True))
         except Exception as e:
             print(f"Error extrayendo filas fijas (modalidad/objeto): {e}")
+            result.add_error(e)
 
         # Normativa
         try:
@@ -111,6 +117,7 @@ def process_400(html_content, file_name, db):
                     convocatoria_data['fecha_entrega'] = clean_text(cols[6].get_text(strip=True))
         except Exception as e:
             print(f"Error extrayendo fechas/total: {e}")
+            result.add_error(e)
 
         # Otros campos
         try:
@@ -133,70 +140,28 @@ def process_400(html_content, file_name, db):
             
         except Exception as e:
              print(f"Error extrayendo campos varios: {e}")
+             result.add_error(e)
 
         # ==========================================
         # 3. ITEMS (Con decode_contents para HTML)
         # ==========================================
-        items_section = soup.find("td", string=re.compile(r'Código del? (Catálogo|Catalogo)', re.IGNORECASE))
+        items_section = soup.find("td", string=ITEMS_TITLE)
         
         if items_section:
-            items_table = items_section.find_parent("tr").find_parent("table")
-            
-            # Limpieza específica del Form 400 (tablas anidadas)
-            items_cols_size = len(items_section.find_parent("tr").find_all('td'))
-            [table.decompose() for table in items_table.find_all('table')]
-            [row.decompose() for row in items_table.find_all("tr") if len(row.find_all('td')) != items_cols_size]
-            
-            rows = items_table.find_all("tr")
-            
-            if len(rows) > 0:
-                headers = [h.get_text(strip=True) for h in rows[0].find_all("td")]
-                
-                # Mapeo directo a nombres estándar de la BD
-                map_headers = {
-                    "Código del Catálogo": "cod_catalogo",
-                    "Código del Catálogo (UNSPSC)": "cod_catalogo",
-                    "Descripción del bien o servicio": "descripcion",
-                    "Descripción del bien, obra, servicio general o de consultoría": "descripcion",
-                    "Unidad de Medida": "unidad",          
-                    "Unidad de medida": "unidad",          
-                    "Cantidad": "cantidad",                
-                    "Cantidad / Cantidad estimada si es variable": "cantidad", 
-                    "Precio unitario": "precio_unitario",       
-                    "Precio referencial unitario": "precio_unitario", 
-                    "Precio referencial total": "precio_total",      
-                    "Monto total (p.unit. x cantidad) / Total estimado cuando la cantidad es variable": "precio_total",
-                    "Origen del item": "origen"
-                }
-                headers = [map_headers.get(h, h.lower().replace(" ", "_")) for h in headers]
-
-                for row in rows[1:]:
-                    cols = row.find_all("td")
-                    if not cols or len(cols) < 2: continue
-                    
-                    item = {}
-                    
-                    for i in range(len(cols)):
-                        if i < len(headers):
-                            key = headers[i]
-                            
-                            # LOGICA CLAVE: Mantener HTML en descripción
-                            if key == 'descripcion':
-                                item[key] = cols[i].decode_contents().strip()
-                            elif key in ['cantidad', 'precio_unitario', 'precio_total']:
-                                item[key] = parse_float(cols[i].get_text(strip=True))
-                            else:
-                                item[key] = clean_text(cols[i].get_text(strip=True))
-                    
-                    items_data.append(item)
+            header_tr = items_section.find_parent("tr")
+            records = extract_records(
+                header_tr.find_parent("table"), ITEMS_HEADERS,
+                header_row=header_tr, same_width=True
+            )
+            # Cantidades y precios se parsean por columna
+            items_data = coerce_items(records.as_dicts())
 
         # ==========================================
         # 4. GUARDADO
         # ==========================================
-        insert_convocatoria(
-            db,
+        result.add_convocatoria(
             cuce=convocatoria_data.get('cuce'),
-            cod_entidad=entidad_data.get('cod'),
+            entidad_cod=entidad_data.get('cod'),
             entidad_nombre=entidad_data.get('nombre'),
             entidad_departamento=entidad_data.get('departamento'), 
             fecha_publicacion=convocatoria_data.get('fecha_publicacion'),
@@ -206,17 +171,17 @@ def process_400(html_content, file_name, db):
             tipo_contratacion=convocatoria_data.get('tipo_contratacion'),
             moneda=convocatoria_data.get('moneda'),
             recurrente_sgte_gestion=convocatoria_data.get('recurrente_sgte_gestion'),
-            total=convocatoria_data.get('total'),
+            total_referencial=convocatoria_data.get('total'),
             fecha_formalizacion=convocatoria_data.get('fecha_formalizacion'),
             fecha_entrega=convocatoria_data.get('fecha_entrega'),
             estado="Publicado",
-            forms="FORM400"
+            forms="FORM300"
         )
 
-        # Set para controlar duplicados de slugs
-        used_slugs = set()
+        # IDs deterministas: catálogo + descripción + ocurrencia
+        slugs = item_ids(items_data)
 
-        for i, item in enumerate(items_data):
+        for item, slug_final in zip(items_data, slugs):
             # A. Inyección de datos
             item['entidad_cod'] = entidad_data.get('cod')
             item['entidad_nombre'] = entidad_data.get('nombre')
@@ -225,23 +190,16 @@ def process_400(html_content, file_name, db):
             item['tipo_convocatoria'] = convocatoria_data.get('tipo_convocatoria')
             item['estado'] = "Publicado"
 
-            # B. Generación de Slug
-            raw_desc = it.get('descripcion', f'item_{i}')
-            slug_base = generate_slug(raw_desc)
-            
-            # C. Manejo de duplicados
-            slug_final = slug_base
-            counter = 1
-            while slug_final in used_slugs:
-                slug_final = f"{slug_base}_{counter}"
-                counter += 1
-            
-            used_slugs.add(slug_final)
-
-            # D. Insertar con slug
-            insert_item(db, it, convocatoria_data.get('cuce'), slug_final)
+            # B. Insertar con slug
+            result.add_item(convocatoria_data.get('cuce'), slug_final, item)
 
-        print(f"✅ Formulario 400 procesado: {convocatoria_data.get('cuce')}")
+        print(f"✅ Formulario 300 procesado: {convocatoria_data.get('cuce')}")
 
     except Exception as e:
-        print(f"❌ Error fatal procesando {file_name}: {e}")
\ No newline at end of file
+        print(f"❌ Error fatal procesando {file_name}: {e}")
+        result.add_error(e)
+
+    return result
+
+def process_300(html_content, file_name, db):
+    return load_form(db, extract_300(html_content, file_name))
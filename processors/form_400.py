@@ -1,26 +1,47 @@
-from bs4 import BeautifulSoup
 import re
 from shared.utils import (
   clean_text,
   extract_cronograma,
   extract_modalidad,
-  generate_slug,
   parse_float
 )
-from shared.firestore import (
-  insert_convocatoria,
-  insert_entidad,
-  insert_item
-)
-
-def process_400(html_content, file_name, db):
+from shared.tables import compile_header_map, extract_records
+from shared.firestore import coerce_items
+from shared.prune import parse_form
+from shared.ids import item_ids
+from shared.records import FormRecords, ENTIDAD_LOOKUP
+from shared.loader import load_form
+
+ITEMS_TITLE = re.compile(r'Código del? (Catálogo|Catalogo)', re.IGNORECASE)
+
+# Mapeo directo a nombres estándar de la BD
+ITEMS_HEADERS = compile_header_map({
+  "Código del Catálogo": "catalogo_cod",
+  "Código del Catálogo (UNSPSC)": "catalogo_cod",
+  "Descripción del bien o servicio": "descripcion",
+  "Descripción del bien, obra, servicio general o de consultoría": "descripcion",
+  "Unidad de Medida": "unidad",
+  "Cantidad": "cantidad",
+  "Cantidad / Cantidad estimada si es variable": "cantidad",
+  "La cantidad es:": "cantidad",
+  "Precio unitario": "precio_referencial",
+  "Precio referencial unitario": "precio_referencial",
+  "Precio referencial total": "precio_referencial_total",
+  "Monto total (p.unit. x cantidad) / Total estimado cuando la cantidad es variable": "precio_referencial_total",
+  "Origen del item": "origen"
+})
+
+def extract_400(html_content, file_name):
   print(f"--- Procesando Formulario 400: {file_name} ---")
   
+  result = FormRecords("FORM400", file_name)
+
   try:
-    soup = BeautifulSoup(html_content, 'html.parser')
+    soup = parse_form(html_content, "FORM400")
   except Exception as e:
     print(f"Error parseando HTML en {file_name}: {e}")
-    return
+    result.add_error(e)
+    return result
 
   entidad_data = {}
   convocatoria_data = {}
@@ -42,23 +63,18 @@ def process_400(html_content, file_name, db):
         "departamento": None
       }
 
+      # Solo se consulta el departamento (el loader no inserta la entidad)
       if entidad_data.get("cod"):
-        entidad_ref = db.collection("entidades").document(entidad_data["cod"])
-        entidad_snap = entidad_ref.get()
-        
-        if entidad_snap.exists:
-          existing_data = entidad_snap.to_dict()
-          entidad_data["departamento"] = existing_data.get("departamento")
-        #else:
-          #insert_entidad(
-          #  db, 
-          #  entidad_data["cod"], 
-          #  entidad_data["nombre"], 
-          #  entidad_data["fax"]
-          #)
+        result.add_entidad(
+          entidad_data["cod"],
+          entidad_data["nombre"],
+          fax=entidad_data["fax"],
+          mode=ENTIDAD_LOOKUP
+        )
 
   except Exception as e:
     print(f"Error extrayendo entidad en {file_name}: {e}")
+    result.add_error(e)
 
   # ==========================================
   # 2. CONVOCATORIA
@@ -69,7 +85,7 @@ def process_400(html_content, file_name, db):
       convocatoria_data['cuce'] = clean_text(convocatoria_cuce.find_next_sibling('td').get_text())
     else:
       print(f"Advertencia: No se encontró CUCE en {file_name}")
-      return
+      return result
 
     # Modalidad y Objeto
     try:
@@ -78,6 +94,7 @@ def process_400(html_content, file_name, db):
       convocatoria_data['objeto'] = clean_text(convocatoria_rows[4].find_all('td')[0].get_text(strip=True))
     except Exception as e:
       print(f"Error extrayendo filas fijas (modalidad/objeto): {e}")
+      result.add_error(e)
 
     # Normativa
     try:
@@ -88,6 +105,7 @@ def process_400(html_content, file_name, db):
         )
     except Exception as e:
       print(f"Error extrayendo normativa: {e}")
+      result.add_error(e)
 
     # Fecha formalizacion (presentacion), fecha entrega, total referencial
     try:
@@ -101,6 +119,7 @@ def process_400(html_content, file_name, db):
           convocatoria_data['fecha_entrega'] = clean_text(cols[6].get_text(strip=True))
     except Exception as e:
       print(f"Error extrayendo cronograma fijo: {e}")
+      result.add_error(e)
 
     # Fecha publicacion
     try:
@@ -110,6 +129,7 @@ def process_400(html_content, file_name, db):
         convocatoria_data['fecha_publicacion'] = raw_fecha.split(' ')[0]
     except Exception as e:
       print(f"Error extrayendo fecha de publicación: {e}")
+      result.add_error(e)
 
     # Moneda
     try:
@@ -118,6 +138,7 @@ def process_400(html_content, file_name, db):
         convocatoria_data['moneda'] = clean_text(moneda_b.find_parent('td').find_next_sibling('td').get_text(strip=True))
     except Exception as e:
       print(f"Error extrayendo moneda: {e}")
+      result.add_error(e)
     
     # TIpo contratacion
     try:
@@ -128,68 +149,31 @@ def process_400(html_content, file_name, db):
         )
     except Exception as e:
       print(f"Error extrayendo tipo de contratación: {e}")
+      result.add_error(e)
 
     # ==========================================
     # 3. ITEMS (Con decode_contents para HTML)
     # ==========================================
-    items_section = soup.find("td", string=re.compile(r'Código del? (Catálogo|Catalogo)', re.IGNORECASE))
+    items_section = soup.find("td", string=ITEMS_TITLE)
     
     if items_section:
-      items_table = items_section.find_parent("tr").find_parent("table")
-      
-      # Limpieza específica del Form 400 (tablas anidadas)
-      items_cols_size = len(items_section.find_parent("tr").find_all('td'))
-      [table.decompose() for table in items_table.find_all('table')]
-      [row.decompose() for row in items_table.find_all("tr") if len(row.find_all('td')) != items_cols_size]
-      
-      rows = items_table.find_all("tr")
-      
-      if len(rows) > 0:
-        headers = [h.get_text(strip=True) for h in rows[0].find_all("td")]
-        
-        # Mapeo directo a nombres estándar de la BD
-        map_headers = {
-          "Código del Catálogo": "catalogo_cod",
-          "Código del Catálogo (UNSPSC)": "catalogo_cod",
-          "Descripción del bien o servicio": "descripcion",
-          "Descripción del bien, obra, servicio general o de consultoría": "descripcion",
-          "Unidad de Medida": "unidad",      
-          "Unidad de medida": "unidad",      
-          "Cantidad": "cantidad",        
-          "Cantidad / Cantidad estimada si es variable": "cantidad",
-          "La cantidad es:": "cantidad",
-          "Precio unitario": "precio_referencial",     
-          "Precio referencial unitario": "precio_referencial", 
-          "Precio referencial total": "precio_referencial_total",
-          "Monto total (p.unit. x cantidad) / Total estimado cuando la cantidad es variable": "precio_referencial_total",
-          "Origen del item": "origen"
-        }
-        headers = [map_headers.get(h, h.lower().replace(" ", "_")) for h in headers]
-
-        for row in rows[1:]:
-          cols = row.find_all("td")
-          if not cols or len(cols) < 2 or cols[0].get_text().startswith("#"): continue
-          
-          item = {}
-          
-          for i in range(len(cols)):
-            if i < len(headers):
-              key = headers[i]
-              # Mantenemos HTML en descripción
-              if key == 'descripcion':
-                item[key] = cols[i].decode_contents().strip()
-              else:
-                item[key] = clean_text(cols[i].get_text().strip())
-          items_data.append(item)
+      header_tr = items_section.find_parent("tr")
+      records = extract_records(
+        header_tr.find_parent("table"), ITEMS_HEADERS,
+        header_row=header_tr, same_width=True, skip_prefix="#"
+      )
+      items_data = records.as_dicts()
 
     # ==========================================
     # 4. GUARDADO
     # ==========================================
+    # Cantidades, precios y fechas se parsean por columna (una pasada por tabla)
+    items_data = coerce_items(items_data)
+
     print(entidad_data)
     print(convocatoria_data)
     print(f"Items encontrados: {items_data}")
-    insert_convocatoria(
-      db,
+    result.add_convocatoria(
       cuce=convocatoria_data.get('cuce'),
 
       entidad_cod=entidad_data.get('cod'),
@@ -221,22 +205,11 @@ def process_400(html_content, file_name, db):
       forms=file_name.split("FORM")[-1].replace(".html", "")
     )
 
-    # Set para controlar duplicados de slugs
-    used_slugs = set()
+    # IDs deterministas: catálogo + descripción + ocurrencia
+    slugs = item_ids(items_data)
 
-    for i, item in enumerate(items_data):
-      raw_desc = item.get('descripcion', f'item_{i}')
-      slug_base = generate_slug(raw_desc)
-      slug_final = slug_base
-      counter = 1
-      while slug_final in used_slugs:
-        slug_final = f"{slug_base}_{counter}"
-        counter += 1
-      
-      used_slugs.add(slug_final)
-      
-      insert_item(
-        db,
+    for item, slug_final in zip(items_data, slugs):
+      result.add_item(
         cuce=convocatoria_data.get('cuce'),
         item_identifier=slug_final,
 
@@ -262,4 +235,10 @@ def process_400(html_content, file_name, db):
     print(f"✅ Formulario 400 procesado: {convocatoria_data.get('cuce')}")
 
   except Exception as e:
-    print(f"❌ Error fatal procesando {file_name}: {e}")
\ No newline at end of file
+    print(f"❌ Error fatal procesando {file_name}: {e}")
+    result.add_error(e)
+
+  return result
+
+def process_400(html_content, file_name, db):
+  return load_form(db, extract_400(html_content, file_name))
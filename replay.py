@@ -0,0 +1,88 @@
+import argparse
+import concurrent.futures
+
+from google.cloud import firestore
+from tqdm import tqdm
+
+from reprocess import reprocesar_un_archivo
+from shared.deadletter import LOCAL_PATH, DeadLetterStore
+from shared.loader import add_error_listener, add_listener
+from shared.sinks import SqliteSink
+
+# ==========================================
+# Replay de dead letters
+# ==========================================
+# Uso:
+#   python replay.py --listar                      # fallas pendientes agrupadas por firma
+#   python replay.py --firma 3fa2c1e09b7d          # reprocesa solo ese grupo
+#   python replay.py                               # reprocesa todos los pendientes
+# --dead-letters firestore lee las fallas de la Cloud Function (colección
+# dead_letters); por defecto se usan las locales del backfill. Lo que termina
+# OK queda resuelto; lo que vuelve a fallar suma un intento.
+
+NUM_HILOS = 20
+
+def imprimir_grupos(groups):
+  for firma, letters in sorted(groups.items(), key=lambda g: -len(g[1])):
+    ejemplo = letters[0]
+    etapas = sorted({l.get("etapa") for l in letters if l.get("etapa")})
+    print(f"🔖 {firma} | {len(letters)} archivos | {ejemplo.get('error')} | etapas: {', '.join(etapas)}")
+    if ejemplo.get("mensaje"):
+      print(f"   {ejemplo['mensaje'][:200]}")
+    print(f"   ej: {ejemplo.get('archivo')}")
+
+def replay_letters(db, store, letters, hilos=NUM_HILOS):
+  """Reprocesa un grupo de dead letters y marca resueltos los que terminan OK."""
+  def replay(letter):
+    result = reprocesar_un_archivo(db, letter["archivo"], store)
+    if result == "OK":
+      store.resolve(letter["archivo"])
+    return result
+
+  with concurrent.futures.ThreadPoolExecutor(max_workers=hilos) as executor:
+    return list(tqdm(executor.map(replay, letters), total=len(letters), unit="form"))
+
+def main():
+  parser = argparse.ArgumentParser(description="Reprocesa los archivos fallidos agrupados por firma de error")
+  parser.add_argument("--dead-letters", default=LOCAL_PATH, help="SQLite local o 'firestore'")
+  parser.add_argument("--sqlite", default=None, help="Destino SqliteSink en vez de Firestore")
+  parser.add_argument("--firma", default=None, help="Solo este grupo")
+  parser.add_argument("--listar", action="store_true", help="Solo mostrar los grupos pendientes")
+  parser.add_argument("--hilos", type=int, default=NUM_HILOS)
+  args = parser.parse_args()
+
+  fs_client = None
+  if args.dead_letters == "firestore" or not args.sqlite:
+    fs_client = firestore.Client()
+  store = DeadLetterStore(fs_client if args.dead_letters == "firestore" else SqliteSink(args.dead_letters))
+  db = SqliteSink(args.sqlite) if args.sqlite else fs_client
+
+  groups = store.pending(args.firma)
+  if not groups:
+    print("✅ No hay dead letters pendientes")
+    return
+  imprimir_grupos(groups)
+  if args.listar:
+    return
+
+  # Las fallas que se repitan actualizan el mismo dead letter (intentos + 1)
+  add_listener(store.on_loaded)
+  add_error_listener(store.on_load_error)
+
+  resumen = {}
+  for firma, letters in sorted(groups.items(), key=lambda g: -len(g[1])):
+    print(f"\n▶️ Firma {firma}: {len(letters)} archivos")
+    results = replay_letters(db, store, letters, args.hilos)
+    resumen[firma] = (results.count("OK"), len(results))
+
+  print("\n📊 Resultado por firma:")
+  for firma, (ok, total) in resumen.items():
+    print(f"   {firma}: {ok}/{total} resueltos")
+
+  if args.dead_letters != "firestore":
+    store.db.close()
+  if args.sqlite:
+    db.close()
+
+if __name__ == "__main__":
+  main()
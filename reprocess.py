@@ -0,0 +1,107 @@
+import argparse
+import concurrent.futures
+
+import requests
+from google.cloud import firestore
+from tqdm import tqdm
+
+from processors import get_extractor
+from shared.deadletter import DESCARGA, EXTRACCION, LOCAL_PATH, DeadLetterStore
+from shared.loader import add_error_listener, add_listener, load_form
+from shared.reprocess import ChangedFieldsClient, plan_reprocess
+from shared.sinks import SqliteSink
+from shared.versions import PARSER_VERSIONS
+
+# ==========================================
+# Reproceso selectivo tras corregir un processor
+# ==========================================
+# 1. Subir la versión del formulario en shared/versions.py.
+# 2. python reprocess.py --forms FORM190,FORM300
+#    Busca los archivos cuyos documentos salieron de versiones anteriores,
+#    guarda la lista en ARCHIVO_PLAN y los vuelve a procesar escribiendo solo
+#    los campos que cambiaron.
+# Con --plan-only solo se genera la lista (mismo formato que guias/*.txt).
+
+BASE_URL = "https://storage.googleapis.com/sicoescan/forms/"
+ARCHIVO_PLAN = "guias/reprocesar.txt"
+NUM_HILOS = 20
+
+def reprocesar_un_archivo(db, file_name, dead_letters=None):
+  """Descarga, extrae y carga un archivo. Con `dead_letters` las fallas quedan registradas."""
+  form = file_name.split("_")[-2].upper()
+  if form not in PARSER_VERSIONS:
+    return "SKIP_UNKNOWN"
+  try:
+    response = requests.get(f"{BASE_URL}{file_name}", timeout=10)
+    if response.status_code != 200:
+      resultado = f"ERROR_DOWNLOAD_{response.status_code}"
+      if dead_letters:
+        dead_letters.record(file_name, DESCARGA, resultado, form=form)
+      return resultado
+    response.encoding = "utf-8"
+  except Exception as e:
+    if dead_letters:
+      dead_letters.record(file_name, DESCARGA, e, form=form)
+    return "ERROR_DOWNLOAD"
+
+  try:
+    records = get_extractor(form)(response.text, file_name)
+  except Exception as e:
+    if dead_letters:
+      dead_letters.record(file_name, EXTRACCION, e, form=form)
+    return "ERROR_EXCEPTION"
+
+  # Las fallas de carga y los errores de extracción los registran los listeners del loader
+  if not load_form(db, records):
+    return "ERROR_LOAD"
+  return "ERROR_EXTRACCION" if records.errores else "OK"
+
+def parse_versions(value, forms):
+  if not value:
+    return None
+  versions = [int(v) for v in value.split(",")]
+  return {form: versions for form in forms}
+
+def main():
+  parser = argparse.ArgumentParser(description="Reprocesa solo los archivos escritos por versiones afectadas")
+  parser.add_argument("--forms", default=",".join(PARSER_VERSIONS), help="Formularios a revisar (ej. FORM190,FORM300)")
+  parser.add_argument("--versions", default=None, help="Versiones afectadas (por defecto, todas las anteriores a la actual)")
+  parser.add_argument("--sqlite", default=None, help="Usar un SqliteSink en vez de Firestore")
+  parser.add_argument("--out", default=ARCHIVO_PLAN, help="Archivo con la lista a reprocesar")
+  parser.add_argument("--plan-only", action="store_true", help="Solo generar la lista")
+  args = parser.parse_args()
+
+  forms = [f.strip().upper() for f in args.forms.split(",") if f.strip()]
+  db = SqliteSink(args.sqlite) if args.sqlite else firestore.Client()
+
+  plan = plan_reprocess(db, forms=forms, versions=parse_versions(args.versions, forms))
+  files = [name for form in forms for name in plan.get(form, [])]
+  with open(args.out, "w", encoding="utf-8") as f:
+    for name in files:
+      f.write(f"{name}\n")
+
+  for form in forms:
+    if plan.get(form):
+      print(f"📋 {form}: {len(plan[form])} archivos")
+  print(f"📝 {len(files)} archivos en {args.out}")
+
+  if args.plan_only or not files:
+    return
+
+  dead_letters = DeadLetterStore(SqliteSink(LOCAL_PATH))
+  add_listener(dead_letters.on_loaded)
+  add_error_listener(dead_letters.on_load_error)
+
+  client = ChangedFieldsClient(db)
+  with concurrent.futures.ThreadPoolExecutor(max_workers=NUM_HILOS) as executor:
+    results = list(tqdm(executor.map(lambda name: reprocesar_un_archivo(client, name, dead_letters), files), total=len(files), unit="form"))
+
+  dead_letters.db.close()
+  if args.sqlite:
+    db.close()
+
+  print(f"\n✅ Reprocesados con éxito: {results.count('OK')} / {len(files)}")
+  print(f"✍️ Escrituras: {client.written} | sin cambios (omitidas): {client.skipped}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,130 @@
+from array import array
+from datetime import datetime, date
+import re
+
+from shared.utils import parse_date, parse_float
+
+# ==========================================
+# Parsing por columnas (cantidades, precios, fechas)
+# ==========================================
+# En vez de decidir el formato celda por celda, se une la columna completa en
+# un solo string, se limpia con una sola pasada de regex y se detecta el
+# formato (US 1,234.56 vs europeo 1.234,56) una vez por columna.
+# Devuelven (valores, nulos): `nulos` es un bytearray con 1 donde no hubo valor.
+
+_SEP = "\x1f"
+_NON_NUMERIC_RE = re.compile(r'[^\d.,\-\x1f]')
+
+# Evidencia fuerte dentro de una misma celda (\d* no cruza el separador)
+_US_STRONG_RE = re.compile(r',\d*\.|,\d*,')   # 1,234.56 / 1,000,000
+_EU_STRONG_RE = re.compile(r'\.\d*,|\.\d*\.')  # 1.234,56 / 1.000.000
+
+# Celdas que parse_float leería al revés que la columna (\d* y [^...] no cruzan el separador):
+#   US: una sola coma sin punto (decimal), coma después del punto, dos puntos
+#   EU: un solo punto sin coma (decimal), punto después de la coma, dos comas
+_US_CONFLICT_RE = re.compile(r'(?:^|\x1f)[^,.\x1f]*,[^,.\x1f]*(?=\x1f|$)|\.[\d\-]*,|\.[\d\-]*\.')
+_EU_CONFLICT_RE = re.compile(r'(?:^|\x1f)[^,.\x1f]*\.[^,.\x1f]*(?=\x1f|$)|,[\d\-]*\.|,[\d\-]*,')
+
+_EU_TABLE = str.maketrans({'.': None, ',': '.'})
+
+_DMY_RE = re.compile(r'(\d{1,2})/(\d{1,2})/(\d{4})')
+
+def _conflicts(cleaned, locale):
+  regex = _US_CONFLICT_RE if locale == "us" else _EU_CONFLICT_RE
+  return regex.search(cleaned) is not None
+
+def detect_number_locale(cleaned):
+  """
+  Recibe la columna ya limpia y unida con _SEP. Retorna "us", "eu" o None
+  cuando la columna es ambigua o alguna celda no sigue el formato detectado
+  (en ese caso se usa parse_float celda por celda, con el mismo resultado).
+  """
+  us = _US_STRONG_RE.search(cleaned) is not None
+  eu = _EU_STRONG_RE.search(cleaned) is not None
+  if us and eu:
+    return None
+  if us or eu:
+    locale = "us" if us else "eu"
+    # Alguna celda con el patrón del otro formato: se resuelve celda por celda
+    return None if _conflicts(cleaned, locale) else locale
+  has_comma = ',' in cleaned
+  has_dot = '.' in cleaned
+  if has_comma and has_dot:
+    # Celdas con coma decimal y celdas con punto decimal mezcladas
+    return None
+  # Una sola coma por celda = decimal (igual que parse_float)
+  locale = "eu" if has_comma else "us"
+  return None if _conflicts(cleaned, locale) else locale
+
+def parse_float_column(values):
+  n = len(values)
+  result = array('d', bytes(8 * n))
+  nulls = bytearray(n)
+
+  texts, positions = [], []
+  for i, value in enumerate(values):
+    if value is None or value == "":
+      nulls[i] = 1
+    elif isinstance(value, (int, float)):
+      result[i] = float(value)
+    else:
+      texts.append(str(value))
+      positions.append(i)
+
+  if not texts:
+    return result, nulls
+
+  cleaned = _NON_NUMERIC_RE.sub('', _SEP.join(texts))
+  locale = detect_number_locale(cleaned)
+
+  if locale is None:
+    for i in positions:
+      parsed = parse_float(values[i])
+      if parsed is None:
+        nulls[i] = 1
+      else:
+        result[i] = parsed
+    return result, nulls
+
+  if locale == "eu":
+    cleaned = cleaned.translate(_EU_TABLE)
+  else:
+    cleaned = cleaned.replace(',', '')
+
+  for i, cell in zip(positions, cleaned.split(_SEP)):
+    try:
+      result[i] = float(cell)
+    except ValueError:
+      nulls[i] = 1
+  return result, nulls
+
+def parse_date_column(values):
+  n = len(values)
+  result = [None] * n
+  nulls = bytearray(n)
+  for i, value in enumerate(values):
+    if not value:
+      nulls[i] = 1
+      continue
+    if isinstance(value, (datetime, date)):
+      result[i] = value
+      continue
+    # Camino rápido dd/mm/yyyy sin strptime ni excepciones de por medio
+    m = _DMY_RE.fullmatch(value) if isinstance(value, str) else None
+    if m:
+      try:
+        result[i] = datetime(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+      except ValueError:
+        nulls[i] = 1
+      continue
+    parsed = parse_date(value)
+    if parsed is None:
+      nulls[i] = 1
+    else:
+      result[i] = parsed
+  return result, nulls
+
+def float_list(values):
+  """Columna de floats como lista con None en los nulos."""
+  parsed, nulls = parse_float_column(values)
+  return [None if null else v for v, null in zip(parsed, nulls)]
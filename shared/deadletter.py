@@ -0,0 +1,124 @@
+from datetime import datetime
+from hashlib import blake2s
+import os
+import traceback
+
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore
+
+# ==========================================
+# Dead letters: archivos que fallaron
+# ==========================================
+# Cada falla (descarga, extracción, carga) queda como un documento en la
+# colección "dead_letters" del cliente que se use (Firestore en la Cloud
+# Function, un SqliteSink local en el backfill), con id = nombre del archivo.
+# La firma agrupa fallas con la misma causa: clase de excepción + funciones
+# del traceback (sin números de línea, para que no cambie con cada edición).
+# replay.py reprocesa los pendientes por firma. Cuando el archivo vuelve a
+# cargarse sin errores (replay, reprocess o un evento nuevo) on_loaded lo
+# marca resuelto.
+
+COLLECTION = "dead_letters"
+# Dead letters de los scripts locales (backfill, reprocess): un SqliteSink
+LOCAL_PATH = "guias/dead_letters.sqlite"
+
+# Etapas
+DESCARGA = "descarga"
+EXTRACCION = "extraccion"
+CARGA = "carga"
+
+MAX_TRACE = 4000
+
+def error_signature(error):
+  """Firma estable de una excepción (o de un código como 'ERROR_DOWNLOAD_404')."""
+  if not isinstance(error, BaseException):
+    return blake2s(str(error).encode("utf-8"), digest_size=6).hexdigest()
+  frames = traceback.extract_tb(error.__traceback__) if error.__traceback__ else []
+  parts = [type(error).__name__] + [f"{os.path.basename(f.filename)}:{f.name}" for f in frames]
+  return blake2s("|".join(parts).encode("utf-8"), digest_size=6).hexdigest()
+
+def describe_error(error):
+  """{"error", "mensaje", "firma", "traza"} serializable de una excepción o código."""
+  if not isinstance(error, BaseException):
+    return {"error": str(error), "mensaje": None, "firma": error_signature(error), "traza": None}
+  trace = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+  return {
+    "error": type(error).__name__,
+    "mensaje": str(error)[:500],
+    "firma": error_signature(error),
+    "traza": trace[-MAX_TRACE:],
+  }
+
+def letter_id(file_name):
+  return os.path.basename(file_name)
+
+class DeadLetterStore:
+  """Registra y consulta dead letters sobre cualquier cliente con la interfaz de Firestore."""
+  def __init__(self, db, collection=COLLECTION):
+    self.db = db
+    self.collection = collection
+
+  def record(self, file_name, stage, error, form=None, detail=None):
+    """
+    `error`: excepción o código de resultado (o `detail`, ya descrito con
+    describe_error). Incrementa `intentos` si el archivo ya había fallado.
+    """
+    data = dict(detail) if detail else describe_error(error)
+    data.update({
+      "archivo": letter_id(file_name),
+      "form": form or _form_of(file_name),
+      "etapa": stage,
+      "intentos": firestore.Increment(1),
+      "ultima_vez": datetime.now(),
+      "resuelto": False,
+    })
+    try:
+      self.db.collection(self.collection).document(letter_id(file_name)).set(data, merge=True)
+    except Exception as e:
+      # Nunca tapar la falla original por no poder registrarla
+      print(f"⚠️ No se pudo registrar el dead letter de {file_name}: {e}")
+
+  def resolve(self, file_name):
+    """
+    Marca como resuelto el dead letter del archivo. Con update: si el archivo
+    nunca falló no se crea un documento. Retorna si existía.
+    """
+    try:
+      self.db.collection(self.collection).document(letter_id(file_name)).update(
+        {"resuelto": True, "resuelto_en": datetime.now()}
+      )
+    except (NotFound, LookupError):
+      # NotFound de Firestore; SqliteSink lanza su propio NotFound (LookupError)
+      return False
+    return True
+
+  def pending(self, firma=None):
+    """Dead letters sin resolver, agrupados: {firma: [docs]}."""
+    query = self.db.collection(self.collection).where(filter=firestore.FieldFilter("resuelto", "==", False))
+    if firma:
+      query = query.where(filter=firestore.FieldFilter("firma", "==", firma))
+    groups = {}
+    for doc in query.stream():
+      data = doc.to_dict()
+      groups.setdefault(data.get("firma"), []).append(data)
+    return groups
+
+  # --- Listeners del loader (shared.loader.add_listener / add_error_listener) ---
+  def on_loaded(self, records):
+    """
+    Extracción con errores parciales: el formulario se cargó incompleto.
+    Carga limpia: resuelve el dead letter que hubiera dejado una falla anterior.
+    """
+    if not records.source:
+      return
+    if records.errores:
+      self.record(records.source, EXTRACCION, None, form=records.form, detail=records.errores[0])
+    else:
+      self.resolve(records.source)
+
+  def on_load_error(self, records, error):
+    self.record(records.source or records.form, CARGA, error, form=records.form)
+
+def _form_of(file_name):
+  parts = os.path.basename(file_name).split("_")
+  return parts[-2].upper() if len(parts) >= 3 else None
@@ -0,0 +1,218 @@
+from datetime import date, datetime, timezone
+import threading
+import time
+import uuid
+
+from shared.normalize import strip_tags
+from shared.utils import clean_text, parse_date
+
+# ==========================================
+# Exportación columnar (Parquet) de items procesados
+# ==========================================
+# Escribe los items de cada FormRecords en un dataset Parquet particionado
+# por mes de publicación y tipo de formulario:
+#   <raíz>/mes=2024-03/form=FORM100/part-<uuid>.parquet
+# Cada flush agrega archivos nuevos (nunca reescribe), así que sirve tanto
+# para el backfill como para eventos en vivo. La raíz puede ser un directorio
+# local o una URI que entienda pyarrow (ej. gs://bucket/exports/items).
+#
+# Una partición se escribe al llegar a `rows_per_file` filas o, con
+# `max_age`, cuando su fila más vieja lleva ese tiempo en el buffer. En la
+# Cloud Function no se hace flush por evento (un archivo chico por evento y
+# partición): lo que quede en el buffer al apagarse la instancia se pierde,
+# y se recupera exportando en lote (backfill con EXPORT_DIR).
+#
+# Reprocesar un archivo vuelve a agregar sus filas. Quien lee deduplica por
+# (archivo, form, item_id) quedándose con el mayor (parser_version, exportado).
+#
+# pyarrow es opcional: solo se importa al crear un ParquetExporter.
+
+SIN_FECHA = "sin_fecha"
+
+# (columna, tipo): "dict" = string con dictionary encoding (baja cardinalidad)
+COLUMNS = (
+  ("cuce", "string"),
+  ("item_id", "string"),
+  ("form", "dict"),
+  ("descripcion", "string"),
+  ("catalogo_cod", "dict"),
+  ("medida", "dict"),
+  ("cantidad_solicitada", "float"),
+  ("cantidad_adjudicada", "float"),
+  ("precio_referencial", "float"),
+  ("precio_referencial_total", "float"),
+  ("precio_adjudicado", "float"),
+  ("precio_adjudicado_total", "float"),
+  ("estado", "dict"),
+  ("modalidad", "dict"),
+  ("tipo_contratacion", "dict"),
+  ("entidad_cod", "dict"),
+  ("entidad_nombre", "dict"),
+  ("entidad_departamento", "dict"),
+  ("proponente_nombre", "dict"),
+  ("fecha_publicacion", "timestamp"),
+  ("archivo", "string"),
+  ("parser_version", "int"),
+  ("exportado", "timestamp"),
+)
+# Columnas de los datos del item (el resto las arma records_to_rows)
+_ITEM_COLUMNS = COLUMNS[3:-3]
+
+def _import_pyarrow():
+  try:
+    import pyarrow
+    import pyarrow.parquet
+    import pyarrow.fs
+  except ImportError as e:
+    raise ImportError("La exportación a Parquet requiere pyarrow (pip install pyarrow)") from e
+  return pyarrow
+
+def _float(value):
+  if value is None or value == "":
+    return None
+  try:
+    return float(value)
+  except (TypeError, ValueError):
+    return None
+
+def _timestamp(value):
+  if isinstance(value, datetime):
+    return value
+  if isinstance(value, date):
+    return datetime(value.year, value.month, value.day)
+  if isinstance(value, str) and value:
+    # En los registros las fechas de la convocatoria siguen como texto (dd/mm/yyyy)
+    return parse_date(value)
+  return None
+
+def _month(value):
+  value = _timestamp(value)
+  return value.strftime("%Y-%m") if value else SIN_FECHA
+
+def _text(value):
+  return clean_text(strip_tags(value)) if isinstance(value, str) else value
+
+def _row(form, cuce, item_id, data, fecha_default):
+  row = {"cuce": cuce, "item_id": item_id, "form": form}
+  for column, kind in _ITEM_COLUMNS:
+    if column == "catalogo_cod":
+      value = data.get("catalogo_cod") or data.get("cod_catalogo")
+    else:
+      value = data.get(column)
+    if kind == "float":
+      value = _float(value)
+    elif kind == "timestamp":
+      value = _timestamp(value) or fecha_default
+    elif column == "descripcion":
+      value = _text(value)
+    elif value is not None:
+      value = str(value)
+    row[column] = value
+  return row
+
+def records_to_rows(records):
+  """Filas planas (una por item) de un FormRecords, con su partición (mes, form)."""
+  fecha_default = None
+  for convocatoria in records.convocatorias:
+    fecha_default = _timestamp(convocatoria.get("fecha_publicacion"))
+    if fecha_default:
+      break
+  origin = {
+    "archivo": records.source,
+    "parser_version": records.parser_version,
+    "exportado": datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0),
+  }
+
+  for item in records.items:
+    row = _row(records.form, item["cuce"], item["id"], item["data"], fecha_default)
+    row.update(origin)
+    yield (_month(row["fecha_publicacion"]), records.form), row
+
+  # 500/600: se exporta lo recibido; el item lo resuelve el matching del loader (item_id)
+  for recepcion in records.recepciones:
+    for entry in recepcion["items"]:
+      data = dict(entry["update"])
+      data.update(entry["create"])
+      row = _row(records.form, recepcion["cuce"], entry.get("item_id"), data, fecha_default)
+      row.update(origin)
+      yield (_month(row["fecha_publicacion"]), records.form), row
+
+class ParquetExporter:
+  """
+  Acumula filas por partición y las escribe como archivos Parquet nuevos
+  cuando una partición llega a `rows_per_file` o en flush()/close().
+  Thread-safe: se puede usar como listener del loader desde varios hilos.
+  """
+  def __init__(self, root, rows_per_file=50000, compression="snappy", max_age=None):
+    pa = _import_pyarrow()
+    self._pa = pa
+    self.rows_per_file = rows_per_file
+    self.compression = compression
+    self.max_age = max_age
+    self.files_written = 0
+    self._buffers = {}
+    self._since = {}
+    self._lock = threading.Lock()
+    self._fs, self._root = pa.fs.FileSystem.from_uri(root) if "://" in root else (pa.fs.LocalFileSystem(), root)
+    self._schema = pa.schema([(name, self._arrow_type(kind)) for name, kind in COLUMNS])
+
+  def _arrow_type(self, kind):
+    pa = self._pa
+    if kind == "dict":
+      return pa.dictionary(pa.int32(), pa.string())
+    if kind == "float":
+      return pa.float64()
+    if kind == "timestamp":
+      return pa.timestamp("s")
+    if kind == "int":
+      return pa.int32()
+    return pa.string()
+
+  def add(self, records):
+    """Agrega los items de un FormRecords (se puede registrar con shared.loader.add_listener)."""
+    if records is None:
+      return
+    full = []
+    now = time.monotonic()
+    with self._lock:
+      for partition, row in records_to_rows(records):
+        rows = self._buffers.setdefault(partition, [])
+        self._since.setdefault(partition, now)
+        rows.append(row)
+        if len(rows) >= self.rows_per_file:
+          full.append((partition, self._pop(partition)))
+      if self.max_age is not None:
+        for partition in [p for p, since in self._since.items() if now - since >= self.max_age]:
+          full.append((partition, self._pop(partition)))
+    for partition, rows in full:
+      self._write(partition, rows)
+
+  def _pop(self, partition):
+    self._since.pop(partition, None)
+    return self._buffers.pop(partition)
+
+  def _write(self, partition, rows):
+    pa = self._pa
+    month, form = partition
+    columns = {name: [row[name] for row in rows] for name, _ in COLUMNS}
+    table = pa.Table.from_pydict(columns, schema=self._schema)
+
+    directory = f"{self._root.rstrip('/')}/mes={month}/form={form}"
+    self._fs.create_dir(directory, recursive=True)
+    path = f"{directory}/part-{uuid.uuid4().hex}.parquet"
+    pa.parquet.write_table(
+      table, path, filesystem=self._fs,
+      compression=self.compression, use_dictionary=True
+    )
+    with self._lock:
+      self.files_written += 1
+
+  def flush(self):
+    with self._lock:
+      pending, self._buffers, self._since = self._buffers, {}, {}
+    for partition, rows in pending.items():
+      if rows:
+        self._write(partition, rows)
+
+  def close(self):
+    self.flush()
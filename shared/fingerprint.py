@@ -0,0 +1,180 @@
+from collections import OrderedDict
+from hashlib import blake2s
+import json
+import sqlite3
+import threading
+
+from google.cloud import firestore
+
+from shared.records import json_default
+
+# ==========================================
+# Supresión de escrituras sin cambios (huellas)
+# ==========================================
+# insert_convocatoria / insert_item siempre mandan un set(merge=True) completo,
+# aunque el reproceso produzca exactamente lo mismo. FingerprintClient envuelve
+# al cliente y guarda una huella (hash) del último payload escrito por
+# documento; si el siguiente payload tiene la misma huella, no se escribe.
+#
+# La huella se calcula por (colección, documento, conjunto de campos): un item
+# lo escriben 100, 170 y 500 con payloads distintos y cada uno tiene la suya.
+# Se compara contra lo que escribió ese mismo payload, no contra el estado
+# actual del documento. Las huellas se guardan en:
+#   - MemoryFingerprints: LRU en memoria (eventos reenviados en la misma instancia)
+#   - SqliteFingerprints: archivo local (re-ejecuciones del backfill)
+#   - opcionalmente en el propio documento (`doc_field`): un campo
+#     `_huella_<campos>` que se lee cuando la huella no está en el cache.
+#     Costo: con el cache frío cada escritura de esas colecciones hace antes
+#     un get() (una lectura es más barata que una escritura). Solo en las
+#     colecciones de datos (DOC_FIELD_COLLECTIONS u otras que se pasen): los
+#     documentos internos que otros módulos leen como mapa completo
+#     (item_claves, resumenes, dead_letters) no llevan huellas.
+# Los Increment nunca se omiten (no son idempotentes).
+
+FIELD_PREFIX = "_huella_"
+DOC_FIELD_COLLECTIONS = frozenset(["convocatorias", "items", "entidades", "proponentes"])
+
+def _default(value):
+  if isinstance(value, firestore.ArrayUnion):
+    return {"$union": list(value.values)}
+  return json_default(value)
+
+def fingerprint(data):
+  raw = json.dumps(data, default=_default, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+  return blake2s(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+def fields_signature(data, merge):
+  """Identifica el tipo de payload (qué campos escribe) con 8 hex."""
+  keys = "|".join(sorted(k for k in data if not k.startswith(FIELD_PREFIX)))
+  return blake2s(f"{int(merge)}|{keys}".encode("utf-8"), digest_size=4).hexdigest()
+
+def _has_increment(data):
+  return any(isinstance(v, firestore.Increment) for v in data.values())
+
+class MemoryFingerprints:
+  def __init__(self, maxsize=100000):
+    self.maxsize = maxsize
+    self._data = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      value = self._data.get(key)
+      if value is not None:
+        self._data.move_to_end(key)
+      return value
+
+  def put(self, key, value):
+    with self._lock:
+      self._data[key] = value
+      self._data.move_to_end(key)
+      while len(self._data) > self.maxsize:
+        self._data.popitem(last=False)
+
+class SqliteFingerprints:
+  def __init__(self, path, commit_every=1000):
+    self.commit_every = commit_every
+    self._pending = 0
+    self._lock = threading.Lock()
+    self._conn = sqlite3.connect(path, check_same_thread=False)
+    self._conn.execute("PRAGMA journal_mode=WAL")
+    self._conn.execute("CREATE TABLE IF NOT EXISTS huellas (key TEXT PRIMARY KEY, fp TEXT NOT NULL)")
+    self._conn.commit()
+
+  def get(self, key):
+    with self._lock:
+      row = self._conn.execute("SELECT fp FROM huellas WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+  def put(self, key, value):
+    with self._lock:
+      self._conn.execute("INSERT OR REPLACE INTO huellas (key, fp) VALUES (?, ?)", (key, value))
+      self._pending += 1
+      if self._pending >= self.commit_every:
+        self._conn.commit()
+        self._pending = 0
+
+  def close(self):
+    with self._lock:
+      self._conn.commit()
+      self._conn.close()
+
+class _FingerprintDocument:
+  def __init__(self, client, collection, ref):
+    self._client = client
+    self._collection = collection
+    self._ref = ref
+    self.id = ref.id
+
+  def get(self, *args, **kwargs):
+    return self._ref.get(*args, **kwargs)
+
+  def _write(self, data, merge, send):
+    client = self._client
+    if _has_increment(data):
+      client.written += 1
+      return send(data)
+
+    signature = fields_signature(data, merge)
+    key = f"{self._collection}/{self.id}/{signature}"
+    fp = fingerprint(data)
+    field = f"{FIELD_PREFIX}{signature}"
+
+    doc_field = self._collection in client.doc_field_collections
+    known = client.store.get(key)
+    if known is None and doc_field:
+      # snapshot.get(campo) de Firestore lanza KeyError si el documento no tiene el campo
+      snapshot = self._ref.get()
+      known = (snapshot.to_dict() or {}).get(field) if snapshot.exists else None
+    if known == fp:
+      client.skipped += 1
+      client.store.put(key, fp)
+      return
+
+    if doc_field:
+      data = dict(data, **{field: fp})
+    client.written += 1
+    result = send(data)
+    client.store.put(key, fp)
+    return result
+
+  def set(self, data, merge=False):
+    return self._write(data, merge, lambda payload: self._ref.set(payload, merge=merge))
+
+  def update(self, data):
+    return self._write(data, True, self._ref.update)
+
+class _FingerprintCollection:
+  def __init__(self, client, name, collection):
+    self._client = client
+    self._name = name
+    self._collection = collection
+
+  def document(self, doc_id):
+    return _FingerprintDocument(self._client, self._name, self._collection.document(doc_id))
+
+  def where(self, *args, **kwargs):
+    return self._collection.where(*args, **kwargs)
+
+  def stream(self):
+    return self._collection.stream()
+
+class FingerprintClient:
+  """
+  Envuelve un cliente (Firestore, SqliteSink...) y omite los set/update cuyo
+  payload tiene la misma huella que la última escritura de ese tipo.
+  `store`: MemoryFingerprints (por defecto) o SqliteFingerprints.
+  `doc_field`: True (DOC_FIELD_COLLECTIONS) o las colecciones cuya huella se
+  guarda también en el documento.
+  """
+  def __init__(self, db, store=None, doc_field=False):
+    self._db = db
+    self.store = store if store is not None else MemoryFingerprints()
+    if doc_field is True:
+      doc_field = DOC_FIELD_COLLECTIONS
+    self.doc_field_collections = frozenset(doc_field or ())
+    self.written = 0
+    self.skipped = 0
+
+  def collection(self, name):
+    return _FingerprintCollection(self, name, self._db.collection(name))
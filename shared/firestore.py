@@ -1,5 +1,10 @@
+from functools import lru_cache
+from itertools import groupby
+
 from google.cloud import firestore
-from shared.utils import parse_bool, parse_float, slugify, clean_text, parse_date
+from shared.utils import parse_bool, parse_float, slugify, parse_date
+from shared.columns import float_list, parse_date_column
+from shared.search import TOKENS_FIELD, tokenize
 
 # ✅ Insertar o Actualizar una entidad
 def insert_entidad(db, cod, nombre, fax=None, telefono=None,
@@ -39,7 +44,7 @@ def insert_convocatoria(db, cuce, entidad_cod=None,
     recurrente_sgte_gestion=None, total_referencial=None,
     fecha_presentacion=None, fecha_adjudicacion=None,
     fecha_formalizacion=None, fecha_entrega=None,
-    estado=None, forms=None):
+    estado=None, forms=None, extra=None):
   
   convocatoria_ref = db.collection("convocatorias").document(cuce)
   
@@ -73,6 +78,11 @@ def insert_convocatoria(db, cuce, entidad_cod=None,
   }
 
   data = {k: v for k, v in data.items() if v is not None}
+  if objeto:
+    data[TOKENS_FIELD] = tokenize(objeto)
+  if extra:
+    # Campos de control (ej. origen del processor, ver shared/versions.py)
+    data.update(extra)
 
   if forms:
     if isinstance(forms, list):
@@ -82,72 +92,117 @@ def insert_convocatoria(db, cuce, entidad_cod=None,
 
   convocatoria_ref.set(data, merge=True)
 
-# shared/database.py
+# ==========================================
+# ITEMS
+# ==========================================
+# Campos aceptados como keyword (forms 100/110/400). Los items que vienen como
+# dict (forms 150-600) pueden traer columnas extra derivadas de la cabecera.
+ITEM_FIELDS = frozenset([
+  "descripcion", "catalogo_cod", "medida",
+  "cantidad_solicitada", "cantidad_adjudicada", "cantidad_recepcionada",
+  "precio_referencial", "precio_referencial_total",
+  "precio_adjudicado", "precio_adjudicado_total",
+  "fecha_publicacion", "fecha_presentacion",
+  "estado", "modalidad", "tipo_convocatoria", "tipo_contratacion",
+  "entidad_cod", "entidad_nombre", "entidad_departamento",
+  "proponente_nit", "proponente_nombre"
+])
 
-# Ejemplo de cómo debería verse insert_item ahora:
-def insert_item(db, data, cuce, item_identifier):
-  doc_id = f"{cuce}_{item_identifier}"
-  for key in data:
-    if key.startswith("fecha"):
-      data[key] = parse_date(data[key])
-    elif key.startswith(("precio", "cantidad")):
-      data[key] = parse_float(data[key])
-    elif key == "recurrente_sgte_gestion":
-      data[key] = parse_bool(data[key])
-  db.collection("items").document(doc_id).set(data, merge=True)
+def _item_parser(key):
+  if key.startswith("fecha"):
+    return parse_date
+  if key.startswith(("precio", "cantidad")):
+    return parse_float
+  if key == "recurrente_sgte_gestion":
+    return parse_bool
+  return None
 
-def insert_item(db, cuce, item_identifier,
-    descripcion=None, catalogo_cod=None, medida=None,
-    cantidad_solicitada=None, cantidad_adjudicada=None, cantidad_recepcionada=None,
-    precio_referencial=None, precio_referencial_total=None,
-    precio_adjudicado=None, precio_adjudicado_total=None,
-    fecha_publicacion=None, fecha_presentacion=None,
-    estado=None, modalidad=None, tipo_convocatoria=None, tipo_contratacion=None,
-    entidad_cod=None, entidad_nombre=None, entidad_departamento=None,
-    proponente_nit=None, proponente_nombre=None):
-  
-  doc_id = f"{cuce}_{item_identifier}"
-  data = {
-    "cuce": cuce,
-    "catalogo_cod": catalogo_cod,
-    "descripcion": descripcion,
-    "medida": medida,
+@lru_cache(maxsize=512)
+def compile_item_plan(keys):
+  """
+  Compila el plan de conversión (campo -> parser) para un conjunto de columnas.
+  Las filas de una misma tabla comparten columnas, así que se calcula una vez por cabecera.
+  """
+  return tuple((key, _item_parser(key)) for key in keys)
 
-    "cantidad_solicitada": parse_float(cantidad_solicitada),
-    "cantidad_adjudicada": parse_float(cantidad_adjudicada),
-    "cantidad_recepcionada": parse_float(cantidad_recepcionada),
+def apply_item_plan(plan, row):
+  """Aplica un plan compilado a una fila y descarta los None."""
+  data = {}
+  for key, parser in plan:
+    value = row.get(key)
+    if parser is not None and value is not None:
+      value = parser(value)
+    if value is not None:
+      data[key] = value
+  return data
 
-    "precio_referencial": parse_float(precio_referencial),
-    "precio_referencial_total": parse_float(precio_referencial_total),
-    "precio_adjudicado": parse_float(precio_adjudicado),
-    "precio_adjudicado_total": parse_float(precio_adjudicado_total),
+def coerce_item(row):
+  return apply_item_plan(compile_item_plan(tuple(row)), row)
 
-    "fecha_publicacion": parse_date(fecha_publicacion),
-    "fecha_presentacion": parse_date(fecha_presentacion),
-    
-    "estado": estado,
-    "modalidad": modalidad,
-    "tipo_convocatoria": tipo_convocatoria,
-    "tipo_contratacion": tipo_contratacion,
+def coerce_items(rows):
+  """
+  Convierte filas completas. Agrupa filas consecutivas con las mismas columnas
+  y parsea cantidades/precios/fechas por columna (ver shared/columns.py).
+  """
+  result = []
+  for keys, run in groupby(rows, key=tuple):
+    run = list(run)
+    columns = []
+    for key, parser in compile_item_plan(keys):
+      cells = [row.get(key) for row in run]
+      if parser is parse_float:
+        cells = float_list(cells)
+      elif parser is parse_date:
+        cells = parse_date_column(cells)[0]
+      elif parser is not None:
+        cells = [parser(v) if v is not None else None for v in cells]
+      columns.append((key, cells))
+    for i in range(len(run)):
+      result.append({key: cells[i] for key, cells in columns if cells[i] is not None})
+  return result
 
-    "entidad_cod": entidad_cod,
-    "entidad_nombre": entidad_nombre,
-    "entidad_departamento": entidad_departamento,
+# ✅ Insertar o Actualizar un item
+def insert_item(db, cuce, item_identifier, data=None, **fields):
+  """
+  Única API de escritura de items:
+    insert_item(db, cuce, slug, item_dict)         # forms con cabecera dinámica
+    insert_item(db, cuce=..., item_identifier=..., descripcion=..., ...)
+  Falla con TypeError ante firmas desconocidas (ej. el viejo insert_item(db, item, cuce, slug)).
+  Retorna los campos escritos (ya convertidos).
+  """
+  if not isinstance(cuce, str) or not isinstance(item_identifier, str):
+    raise TypeError(
+      "insert_item(db, cuce, item_identifier, data=None, **fields): "
+      f"cuce e item_identifier deben ser str, se recibió {type(cuce).__name__}/{type(item_identifier).__name__}"
+    )
+  if data is not None and not isinstance(data, dict):
+    raise TypeError(f"insert_item: data debe ser dict, se recibió {type(data).__name__}")
+  unknown = fields.keys() - ITEM_FIELDS
+  if unknown:
+    raise TypeError(f"insert_item: campos desconocidos {sorted(unknown)}")
 
-    "proponente_nit": proponente_nit,
-    "proponente_nombre": proponente_nombre
-  }
-  data = {k: v for k, v in data.items() if v is not None}
+  row = {**data, **fields} if data else dict(fields)
+  row["cuce"] = cuce
+
+  data = coerce_item(row)
+  if data.get("descripcion"):
+    data[TOKENS_FIELD] = tokenize(data["descripcion"])
+
+  doc_id = f"{cuce}_{item_identifier}"
   db.collection("items").document(doc_id).set(data, merge=True)
+  return data
 
 # ✅ NUEVO: Actualizar estado de convocatoria (Form 500)
-def update_convocatoria_status(db, cuce, nuevo_estado, form_tag):
+def update_convocatoria_status(db, cuce, nuevo_estado, form_tag, extra=None):
   ref = db.collection("convocatorias").document(cuce)
+  data = {
+    "estado": nuevo_estado,
+    "forms": firestore.ArrayUnion([form_tag])
+  }
+  if extra:
+    data.update(extra)
   try:
-    ref.update({
-      "estado": nuevo_estado,
-      "forms": firestore.ArrayUnion([form_tag])
-    })
+    ref.update(data)
   except Exception as e:
     print(f"⚠️ No se pudo actualizar convocatoria {cuce} (quizás no existe): {e}")
 
@@ -168,8 +223,10 @@ def update_item_adjudicacion(db, doc_id, data):
     ref.update(data)
   except Exception as e:
     print(f"⚠️ Error actualizando item {doc_id}: {e}")
+    return None
+  return data
 
-# ✅ Reutilizamos tu insert_proponente (asegúrate de que esté en este archfparseivo)
+# ✅ Insertar un proponente (solo si no existe)
 def insert_proponente(db, nombre):
   if not nombre: return
   doc_id = slugify(nombre)
@@ -179,8 +236,6 @@ def insert_proponente(db, nombre):
       "nombre": nombre
     })
 
-# ... (imports y funciones anteriores) ...
-
 # ✅ NUEVO: Lógica especial de actualización de estado para Form 170
 def check_and_update_convocatoria_170(db, cuce):
   ref = db.collection("convocatorias").document(cuce)
@@ -0,0 +1,64 @@
+from hashlib import blake2s
+
+from shared.normalize import generate_slug, normalize_for_match
+
+# ==========================================
+# IDs deterministas de items
+# ==========================================
+# El id de un item es "{cuce}_{slug}". Sale solo de la identidad de la fila,
+# igual en todos los formularios, sin mirar las demás filas:
+#   slug[-<catalogo>][-<n>]
+#   - slug        descripción (generate_slug; "item" si queda vacía)
+#   - catalogo    hash corto del código de catálogo, si la fila lo trae
+#   - n           ocurrencia de esa misma identidad en el formulario (la
+#                 primera no lleva número)
+# generate_slug nunca produce "-", así que las partes no chocan con otra
+# descripción ("item 1" -> item_1, el segundo "item" -> item-1).
+
+CATALOG_FIELDS = ("catalogo_cod", "cod_catalogo")
+
+def item_catalog(item):
+  for field in CATALOG_FIELDS:
+    value = item.get(field)
+    if value:
+      return normalize_for_match(str(value))
+  return ""
+
+def catalog_digest(catalog):
+  return blake2s(catalog.encode("utf-8"), digest_size=3).hexdigest()
+
+def item_base_id(item, default_desc="item"):
+  """Id de la primera fila con esta identidad (descripción + catálogo)."""
+  slug = generate_slug(item.get("descripcion") or default_desc) or default_desc
+  catalog = item_catalog(item)
+  return f"{slug}-{catalog_digest(catalog)}" if catalog else slug
+
+def is_current_id(ident, item, default_desc="item"):
+  """
+  Si `ident` (sin el cuce) es un id que ItemIds le asigna a `item` (sus
+  campos guardados). Los del esquema anterior (slug_1, sin catálogo) no.
+  """
+  base = item_base_id(item, default_desc)
+  suffix = ident[len(base) + 1:]
+  return ident == base or (ident.startswith(f"{base}-") and suffix.isdigit())
+
+class ItemIds:
+  """
+  Asigna ids a los items de un formulario. Una instancia por formulario:
+  las ocurrencias de una misma identidad se cuentan entre todas las llamadas.
+  """
+  def __init__(self):
+    self._occurrences = {}   # id base -> filas vistas
+
+  def assign(self, items, default_desc="item"):
+    """Retorna la lista de ids (sin el cuce) en el mismo orden que `items`. O(n)."""
+    ids = []
+    for item in items:
+      base = item_base_id(item, default_desc)
+      n = self._occurrences.get(base, 0)
+      self._occurrences[base] = n + 1
+      ids.append(f"{base}-{n}" if n else base)
+    return ids
+
+def item_ids(items, default_desc="item"):
+  return ItemIds().assign(items, default_desc)
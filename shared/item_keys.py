@@ -0,0 +1,127 @@
+from hashlib import blake2s
+
+from shared.firestore import get_items_by_cuce
+from shared.normalize import normalize_for_match
+
+# ==========================================
+# Índice de claves de items por convocatoria
+# ==========================================
+# El matching de 500/600 necesitaba consultar items where cuce == X (índice
+# compuesto, costo proporcional a los items). En su lugar la carga mantiene
+# un documento item_claves/{cuce} con un campo por item:
+#   {identificador: [clave, estado, monto]}
+# clave = hash corto de la descripción normalizada, monto =
+# precio_adjudicado_total. Con eso el matching se resuelve con una sola
+# lectura, y el total adjudicado de los resúmenes (shared/rollups.py) también.
+#
+# Invariante: si el documento existe está completo. Si no existe (CUCEs
+# cargados antes del índice, o entradas viejas sin monto) se arma una vez
+# desde la consulta de items.
+# Cada carga escribe solo sus entradas (set merge, un campo por item), así
+# dos formularios del mismo CUCE no se pisan. Pasado MAX_ENTRIES (límite de
+# campos por documento) se marca LLENO y se vuelve a consultar.
+
+COLLECTION = "item_claves"
+MAX_ENTRIES = 5000
+LLENO = "_lleno"
+# Firestore no acepta un campo "": el item con identificador vacío va en este
+_VACIO = "_vacio"
+
+def key_hash(key):
+  """Hash de una clave ya normalizada (entry["key"] de los 500/600)."""
+  return blake2s((key or "").encode("utf-8"), digest_size=6).hexdigest()
+
+def match_key(descripcion):
+  return key_hash(normalize_for_match(descripcion or ""))
+
+class ItemKeys:
+  def __init__(self, cuce, entries, dirty=()):
+    self.cuce = cuce
+    self.entries = entries
+    self._dirty = set(dirty)
+
+  @classmethod
+  def load(cls, db, cuce):
+    """Índice del CUCE: se lee item_claves/{cuce} y solo si falta se consultan los items."""
+    snapshot = db.collection(COLLECTION).document(cuce).get()
+    keys = cls.from_index(cuce, snapshot.to_dict() if snapshot.exists else None)
+    if keys is None:
+      keys = cls.from_docs(cuce, get_items_by_cuce(db, cuce))
+    return keys
+
+  @classmethod
+  def from_index(cls, cuce, data):
+    """Desde el documento item_claves/{cuce}; None si no existe o está LLENO."""
+    if not data or data.get(LLENO):
+      return None
+    entries = {}
+    for field, value in data.items():
+      # Los campos "_" son del documento (LLENO, huellas de FingerprintClient), no items
+      if (field.startswith("_") and field != _VACIO) or not isinstance(value, list):
+        continue
+      if len(value) < 3:
+        # Formato anterior [clave, estado]: sin el monto hay que rearmarlo
+        return None
+      entries[_ident_of(field)] = list(value)
+    return cls(cuce, entries)
+
+  @classmethod
+  def from_docs(cls, cuce, docs):
+    """Desde los items (consulta o prefetch); todas las entradas quedan para escribir."""
+    entries = {}
+    for doc in docs:
+      data = doc.to_dict() or {}
+      entries[cls._ident(cuce, doc.id)] = [
+        match_key(data.get("descripcion")), data.get("estado"), data.get("precio_adjudicado_total")
+      ]
+    return cls(cuce, entries, dirty=entries)
+
+  @staticmethod
+  def _ident(cuce, doc_id):
+    return doc_id[len(cuce) + 1:] if doc_id.startswith(f"{cuce}_") else doc_id
+
+  def doc_id(self, ident):
+    return f"{self.cuce}_{ident}"
+
+  def rows(self):
+    """[(doc_id, clave, estado)] en orden de id (el mismo que devuelve la consulta)."""
+    return [(self.doc_id(ident), v[0], v[1]) for ident, v in sorted(self.entries.items())]
+
+  def put(self, doc_id, data):
+    """Refleja una escritura del item (insert_item/update_item_adjudicacion) con merge."""
+    ident = self._ident(self.cuce, doc_id)
+    entry = self.entries.get(ident)
+    if entry is None:
+      entry = self.entries[ident] = [
+        match_key(data.get("descripcion")), data.get("estado"), data.get("precio_adjudicado_total")
+      ]
+    else:
+      if "descripcion" in data:
+        entry[0] = match_key(data["descripcion"])
+      if "estado" in data:
+        entry[1] = data["estado"]
+      if "precio_adjudicado_total" in data:
+        entry[2] = data["precio_adjudicado_total"]
+    self._dirty.add(ident)
+
+  def total_adjudicado(self):
+    return sum(v[2] for v in self.entries.values() if isinstance(v[2], (int, float)))
+
+  def save(self, db, replace=False):
+    """`replace`: reescribe el documento completo (quita las entradas de items borrados)."""
+    if not self._dirty and not replace:
+      return
+    ref = db.collection(COLLECTION).document(self.cuce)
+    if len(self.entries) > MAX_ENTRIES:
+      ref.set({LLENO: True}, merge=not replace)
+    elif replace:
+      ref.set({_field(ident): entry for ident, entry in self.entries.items()})
+    else:
+      ref.set({_field(ident): self.entries[ident] for ident in self._dirty}, merge=True)
+    self._dirty.clear()
+
+def _field(ident):
+  return ident or _VACIO
+
+def _ident_of(field):
+  return "" if field == _VACIO else field
@@ -0,0 +1,77 @@
+from collections import Counter
+from datetime import datetime
+import json
+import threading
+
+# ==========================================
+# Registro de avance (ledger) del backfill
+# ==========================================
+# Una línea JSON por archivo procesado: {"archivo", "resultado", "ts"}.
+# Cada shard escribe el suyo (guias/ledger_0de4.jsonl, ...), así que una
+# re-ejecución retoma donde quedó y al final se pueden combinar en un reporte.
+
+OK = "OK"
+
+def ledger_path(index=None, total=None, prefix="guias/ledger"):
+  if total is None:
+    return f"{prefix}.jsonl"
+  return f"{prefix}_{index}de{total}.jsonl"
+
+def read_ledger(path):
+  """{archivo: último resultado}. Un ledger que no existe está vacío."""
+  results = {}
+  try:
+    with open(path, "r", encoding="utf-8") as f:
+      for line in f:
+        line = line.strip()
+        if not line:
+          continue
+        try:
+          row = json.loads(line)
+        except ValueError:
+          # Línea cortada por una interrupción
+          continue
+        results[row["archivo"]] = row["resultado"]
+  except FileNotFoundError:
+    pass
+  return results
+
+class Ledger:
+  """Append-only y thread-safe. `done` = archivos que ya terminaron OK."""
+  def __init__(self, path):
+    self.path = path
+    self.done = {name for name, result in read_ledger(path).items() if result == OK}
+    self._lock = threading.Lock()
+    self._fp = open(path, "a", encoding="utf-8")
+
+  def record(self, file_name, result):
+    line = json.dumps({"archivo": file_name, "resultado": result, "ts": datetime.now().isoformat(timespec="seconds")}, ensure_ascii=False)
+    with self._lock:
+      self._fp.write(line + "\n")
+      self._fp.flush()
+      # Igual que read_ledger: vale el último resultado del archivo
+      if result == OK:
+        self.done.add(file_name)
+      else:
+        self.done.discard(file_name)
+
+  def close(self):
+    with self._lock:
+      self._fp.close()
+
+def merge_report(paths):
+  """Combina ledgers de varios shards: totales por resultado y archivos que aparecen en más de uno."""
+  owners = {}
+  results = {}
+  for path in paths:
+    for name, result in read_ledger(path).items():
+      owners.setdefault(name, []).append(path)
+      # Si un archivo quedó OK en algún shard, cuenta como OK
+      if results.get(name) != OK:
+        results[name] = result
+  return {
+    "archivos": len(results),
+    "resultados": dict(Counter(results.values()).most_common()),
+    "duplicados": sorted(name for name, where in owners.items() if len(where) > 1),
+    "pendientes": sorted(name for name, result in results.items() if result != OK),
+  }
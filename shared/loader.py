@@ -0,0 +1,262 @@
+from collections import OrderedDict
+import concurrent.futures
+from functools import partial
+
+from shared.firestore import (
+  insert_convocatoria,
+  insert_entidad,
+  insert_item,
+  insert_proponente,
+  update_convocatoria_status,
+  update_item_adjudicacion
+)
+from shared.ids import ItemIds
+from shared.item_keys import ItemKeys, key_hash
+from shared.records import ENTIDAD_INSERT_MISSING, ENTIDAD_UPSERT
+from shared.versions import make_stamp
+
+# ==========================================
+# Carga de FormRecords
+# ==========================================
+# Todo lo que necesita leer la base (departamento de la entidad, matching de
+# items en 500/600) se resuelve acá, no en la extracción. El matching lee el
+# índice item_claves/{cuce} (shared/item_keys.py), que se actualiza acá. Cada convocatoria e
+# item escrito lleva el origen (formulario, versión del processor, archivo).
+
+# Funciones que reciben cada FormRecords cargado con éxito (ej. ParquetExporter.add)
+_listeners = []
+# Funciones que reciben (FormRecords, excepción) cuando la carga falla (ej. dead letters)
+_error_listeners = []
+
+# Cache de índices (ItemKeys) por CUCE para el matching de 500/600 (ver shared/prefetch.py)
+_item_prefetcher = None
+# Escrituras de items en paralelo dentro de un formulario (None = en serie, como siempre)
+_item_executor = None
+
+class ItemWriteError(Exception):
+  """Fallaron varias escrituras de items de un mismo formulario (en paralelo)."""
+  def __init__(self, errors):
+    self.errors = errors
+    super().__init__(f"{len(errors)} escrituras de items fallaron; la primera: {errors[0]!r}")
+
+def add_listener(fn):
+  _listeners.append(fn)
+
+def set_item_prefetcher(prefetcher):
+  global _item_prefetcher
+  _item_prefetcher = prefetcher
+
+def set_item_workers(workers):
+  """
+  Hilos para escribir los items de un formulario (compartidos por todas las
+  cargas y con el mismo cliente). 1 = en serie. En el backfill, que ya
+  paraleliza por archivo, conviene dejarlo en 1.
+  """
+  global _item_executor
+  if _item_executor:
+    _item_executor.shutdown(wait=True)
+  _item_executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+
+def add_error_listener(fn):
+  _error_listeners.append(fn)
+
+def _notify(records):
+  for fn in _listeners:
+    try:
+      fn(records)
+    except Exception as e:
+      print(f"⚠️ Error en listener {getattr(fn, '__qualname__', fn)} para {records.source}: {e}")
+
+def _write_group(group):
+  """Escrituras de un mismo documento, en orden; se corta en la primera falla."""
+  results = []
+  for pos, fn in group:
+    try:
+      results.append((pos, fn()))
+    except Exception as e:
+      return results, e
+  return results, None
+
+def _run_writes(writes):
+  """
+  Ejecuta [(doc_id, fn)] y retorna (resultados alineados con `writes`, errores).
+  En paralelo solo entre documentos distintos: las escrituras de un mismo
+  documento respetan el orden. Una escritura fallida o no ejecutada da None.
+  """
+  results = [None] * len(writes)
+  groups = OrderedDict()
+  for pos, (doc_id, fn) in enumerate(writes):
+    groups.setdefault(doc_id, []).append((pos, fn))
+
+  if _item_executor is None or len(groups) < 2:
+    # En serie: la primera falla corta el resto (comportamiento original)
+    for pos, (doc_id, fn) in enumerate(writes):
+      try:
+        results[pos] = fn()
+      except Exception as e:
+        return results, [e]
+    return results, []
+
+  errors = []
+  for done, error in _item_executor.map(_write_group, groups.values()):
+    for pos, result in done:
+      results[pos] = result
+    if error is not None:
+      errors.append(error)
+  return results, errors
+
+def _raise_errors(errors):
+  if len(errors) == 1:
+    raise errors[0]
+  if errors:
+    raise ItemWriteError(errors) from errors[0]
+
+def _load_entidades(db, records):
+  """Guarda las entidades según su modo y retorna {cod: departamento} de las que ya existían."""
+  departamentos = {}
+  for entidad in records.entidades:
+    cod = entidad.get("cod")
+    if not cod:
+      continue
+    snapshot = db.collection("entidades").document(cod).get()
+    if snapshot.exists:
+      departamentos[cod] = (snapshot.to_dict() or {}).get("departamento")
+
+    mode = entidad.get("mode")
+    if mode == ENTIDAD_UPSERT or (mode == ENTIDAD_INSERT_MISSING and not snapshot.exists):
+      insert_entidad(db, cod, entidad.get("nombre"), fax=entidad.get("fax"), telefono=entidad.get("telefono"))
+  return departamentos
+
+def _fill_departamento(data, departamentos):
+  cod = data.get("entidad_cod")
+  if cod in departamentos and "entidad_departamento" in data and data["entidad_departamento"] is None:
+    data["entidad_departamento"] = departamentos[cod]
+
+def _load_recepcion(db, recepcion, stamp):
+  """Matching por descripción contra los items ya guardados (Form 500/600)."""
+  cuce = recepcion["cuce"]
+  keys = _item_prefetcher.take(cuce) if _item_prefetcher else None
+  if keys is None:
+    keys = ItemKeys.load(db, cuce)
+  existing_rows = keys.rows()
+  print(f"Items en BD para {cuce}: {len(existing_rows)}")
+
+  # Mapa: { hash de la descripción normalizada: doc_id }
+  existing_map = {clave: doc_id for doc_id, clave, _ in existing_rows}
+  matched_ids = set()
+  ids = ItemIds()
+  # Se arma la lista de escrituras y se ejecutan al final (en paralelo si está habilitado)
+  writes = []
+
+  def update(doc_id, data):
+    writes.append((doc_id, partial(update_item_adjudicacion, db, doc_id, data)))
+
+  for entry in recepcion["items"]:
+    match_id = existing_map.get(key_hash(entry["key"]))
+    if match_id:
+      update(match_id, {**entry["update"], **stamp})
+      matched_ids.add(match_id)
+      # Item resuelto por el matching (lo usa la exportación)
+      entry["item_id"] = match_id[len(cuce) + 1:]
+    else:
+      # CREAR NUEVO (Si no existía en Form 100/110/400)
+      slug_final = ids.assign([entry["identity"]])[0]
+      entry["item_id"] = slug_final
+      payload = dict(entry["update"])
+      payload.update(entry["create"])
+      payload.update(stamp)
+      writes.append((f"{cuce}_{slug_final}", partial(insert_item, db, cuce, slug_final, payload)))
+      print(f"   ✨ Item creado en {recepcion['form']} (No existía): {slug_final}")
+
+  count_implicit = 0
+  if recepcion["desiertos"] is not None:
+    for key in recepcion["desiertos"]:
+      match_id = existing_map.get(key_hash(key))
+      if match_id and match_id not in matched_ids:
+        update(match_id, {
+          'estado': 'Desierto',
+          'monto_adjudicado': 0,
+          'adjudicado_a': None,
+          **stamp
+        })
+        matched_ids.add(match_id)
+  else:
+    # Sin tabla de desiertos: todo lo que no se tocó es desierto
+    for doc_id, _, current_status in existing_rows:
+      if doc_id not in matched_ids:
+        # No pisamos items ya 'Recibido' o 'Entregado' por otro proceso
+        if (current_status or '') not in ['Recibido', 'Entregado']:
+          update(doc_id, {
+            'estado': 'Desierto',
+            'observacion': recepcion["observacion"],
+            **stamp
+          })
+          count_implicit += 1
+          matched_ids.add(doc_id)
+
+  results, errors = _run_writes(writes)
+  for (doc_id, _), written in zip(writes, results):
+    if written is not None:
+      keys.put(doc_id, written)
+  keys.save(db)
+
+  if count_implicit > 0:
+    print(f"   📉 {count_implicit} items marcados como Desiertos (Implícitos).")
+  _raise_errors(errors)
+
+def load_records(db, records):
+  """Carga un FormRecords. Las excepciones se propagan."""
+  departamentos = _load_entidades(db, records)
+  stamp = make_stamp(records.form, records.parser_version, records.source)
+
+  for convocatoria in records.convocatorias:
+    data = dict(convocatoria)
+    _fill_departamento(data, departamentos)
+    insert_convocatoria(db, **data, extra=stamp)
+
+  for estado in records.estados:
+    update_convocatoria_status(db, estado["cuce"], estado["estado"], estado["form"], extra=stamp)
+
+  item_keys = {}
+  for cuce in dict.fromkeys(item["cuce"] for item in records.items):
+    if _item_prefetcher:
+      _item_prefetcher.invalidate(cuce)
+    item_keys[cuce] = ItemKeys.load(db, cuce)
+
+  writes = []
+  for item in records.items:
+    data = dict(item["data"], **stamp)
+    _fill_departamento(data, departamentos)
+    writes.append((f"{item['cuce']}_{item['id']}", partial(insert_item, db, item["cuce"], item["id"], data)))
+
+  # Lo que sí se escribió queda en el índice aunque otra escritura falle
+  results, errors = _run_writes(writes)
+  for item, (doc_id, _), written in zip(records.items, writes, results):
+    if written is not None:
+      item_keys[item["cuce"]].put(doc_id, written)
+  for keys in item_keys.values():
+    keys.save(db)
+  _raise_errors(errors)
+
+  for nombre in records.proponentes:
+    insert_proponente(db, nombre)
+
+  for recepcion in records.recepciones:
+    _load_recepcion(db, recepcion, stamp)
+
+def load_form(db, records):
+  """Como load_records pero registra el error en vez de propagarlo (igual que los processors)."""
+  if records is None:
+    return False
+  try:
+    load_records(db, records)
+  except Exception as e:
+    print(f"❌ Error guardando {records.source or records.form}: {e}")
+    for fn in _error_listeners:
+      try:
+        fn(records, e)
+      except Exception as listener_error:
+        print(f"⚠️ Error en listener {getattr(fn, '__qualname__', fn)} para {records.source}: {listener_error}")
+    return False
+  _notify(records)
+  return True
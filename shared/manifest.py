@@ -0,0 +1,141 @@
+from collections import namedtuple
+from hashlib import blake2s
+from itertools import groupby
+import os
+import re
+
+# ==========================================
+# Manifiestos de archivos a procesar
+# ==========================================
+# Los nombres tienen la forma <CUCE>_<FORM>_<revisión>.html, ej.
+#   20-0006-00-1064736-1-1_FORM100_1.html
+# Una revisión nueva reemplaza por completo a la anterior del mismo
+# formulario, así que procesar las viejas es parsear y escribir de más.
+
+ManifestEntry = namedtuple("ManifestEntry", ["name", "cuce", "form", "revision"])
+
+_NAME_RE = re.compile(r'^(?:.*/)?(?P<cuce>[^/_]+)_(?P<form>FORM\d+)_(?P<revision>\d+)\.html?$', re.I)
+
+def parse_file_name(name):
+  """ManifestEntry de un nombre de archivo (con o sin prefijo forms/), o None si no tiene el formato."""
+  match = _NAME_RE.match(name.strip())
+  if not match:
+    return None
+  return ManifestEntry(name.strip(), match["cuce"], match["form"].upper(), int(match["revision"]))
+
+def iter_list_file(path, encoding="utf-8"):
+  """Lee una lista (guias/*.txt) línea por línea, sin cargarla entera."""
+  with open(path, "r", encoding=encoding) as f:
+    for line in f:
+      line = line.strip()
+      if line:
+        yield line
+
+def iter_entries(names, skipped=None):
+  """Nombres -> ManifestEntry. Los que no tienen el formato se agregan a `skipped` (si se pasa)."""
+  for name in names:
+    entry = parse_file_name(name)
+    if entry is None:
+      if skipped is not None:
+        skipped.append(name)
+      continue
+    yield entry
+
+def latest_revisions(entries):
+  """
+  Deja solo la última revisión de cada (CUCE, formulario), en el orden en que
+  apareció el par por primera vez. Mantiene un dict por par (~100 bytes c/u).
+  """
+  latest = {}
+  for entry in entries:
+    key = (entry.cuce, entry.form)
+    current = latest.get(key)
+    if current is None or entry.revision > current.revision:
+      latest[key] = entry
+  return list(latest.values())
+
+def iter_cuce_groups(entries):
+  """
+  Agrupa entries consecutivas del mismo CUCE (con la última revisión de cada
+  formulario) sin leer todo el origen: sirve para listados ordenados por
+  nombre (GCS, directorios), donde los archivos de un CUCE van juntos.
+  """
+  for _, group in groupby(entries, key=lambda e: e.cuce):
+    yield latest_revisions(group)
+
+# ==========================================
+# Orígenes: listado del bucket o directorio local
+# ==========================================
+
+def iter_gcs_names(bucket_name, prefix="forms/", page_size=1000, client=None):
+  """
+  Nombres (relativos a `prefix`) de los objetos del bucket, página por página.
+  GCS lista en orden lexicográfico, así que los formularios de un CUCE salen juntos.
+  """
+  if client is None:
+    from google.cloud import storage
+    client = storage.Client()
+  for blob in client.list_blobs(bucket_name, prefix=prefix, page_size=page_size):
+    if not blob.name.endswith("/"):
+      yield blob.name[len(prefix):]
+
+def iter_dir_names(path):
+  """Archivos .html de un directorio local, ordenados por nombre."""
+  return (name for name in sorted(os.listdir(path)) if name.lower().endswith((".html", ".htm")))
+
+def parse_source(source):
+  """'gs://bucket/forms/' -> ("gcs", bucket, prefix); directorio -> ("dir", path, None); si no, lista."""
+  if source.startswith("gs://"):
+    bucket, _, prefix = source[len("gs://"):].partition("/")
+    return "gcs", bucket, prefix
+  if os.path.isdir(source):
+    return "dir", source, None
+  return "lista", source, None
+
+def cuce_year(cuce):
+  """Año de la convocatoria según el prefijo del CUCE (20-... -> 2020)."""
+  try:
+    return 2000 + int(cuce.split("-", 1)[0])
+  except ValueError:
+    return None
+
+def filter_entries(entries, forms=None, desde=None, hasta=None, revisions=None):
+  """Filtra por tipo de formulario, rango de años (prefijo del CUCE) y número de revisión."""
+  forms = {f.upper() for f in forms} if forms else None
+  for entry in entries:
+    if forms and entry.form not in forms:
+      continue
+    if desde or hasta:
+      year = cuce_year(entry.cuce)
+      if year is None or (desde and year < desde) or (hasta and year > hasta):
+        continue
+    if revisions and entry.revision not in revisions:
+      continue
+    yield entry
+
+def newer_revision_exists(bucket, entry, prefix="forms/"):
+  """Para eventos: True si ya existe en el bucket la revisión siguiente del mismo formulario."""
+  return bucket.blob(f"{prefix}{entry.cuce}_{entry.form}_{entry.revision + 1}.html").exists()
+
+# ==========================================
+# Shards (backfill en varias máquinas)
+# ==========================================
+# El shard se decide por hash del CUCE: todos los formularios de un CUCE caen
+# en el mismo worker (se mantiene el orden de ciclo de vida y los caches).
+
+def parse_shard(value):
+  """'i/N' -> (i, N), con 0 <= i < N."""
+  try:
+    index, total = (int(part) for part in value.split("/"))
+  except ValueError:
+    raise ValueError(f"Shard inválido '{value}': se espera i/N (ej. 0/4)")
+  if total < 1 or not 0 <= index < total:
+    raise ValueError(f"Shard inválido '{value}': i tiene que estar entre 0 y N-1")
+  return index, total
+
+def shard_of(key, total):
+  # blake2s y no hash(): tiene que dar lo mismo en todas las máquinas
+  return int.from_bytes(blake2s(key.encode("utf-8"), digest_size=8).digest(), "big") % total
+
+def in_shard(entry, index, total):
+  return shard_of(entry.cuce, total) == index
@@ -0,0 +1,72 @@
+from functools import lru_cache
+from html import unescape
+import unicodedata, re
+
+# ==========================================
+# Normalización de texto (slugs y claves de matching)
+# ==========================================
+# Se ejecutan una vez por item por formulario, así que evitamos construir
+# un árbol de BeautifulSoup solo para quitar tags.
+
+CACHE_SIZE = 8192
+
+_COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+_TAG_RE = re.compile(r'</?[a-zA-Z][^>]*>|<![^>]*>')
+_SPACES_RE = re.compile(r'\s+')
+_SLUG_INVALID_RE = re.compile(r'[^\w\s-]')
+_SLUG_SEPARATORS_RE = re.compile(r'[-\s]+')
+_SLUGIFY_INVALID_RE = re.compile(r'[^a-zA-Z0-9_]')
+
+def strip_tags(text):
+  """Quita tags y comentarios HTML sin construir un árbol (equivale a get_text(separator=" "))."""
+  if not text:
+    return ""
+  if "<" in text:
+    if "<!--" in text:
+      text = _COMMENT_RE.sub(" ", text)
+    text = _TAG_RE.sub(" ", text)
+  if "&" in text:
+    text = unescape(text)
+  return text
+
+def to_ascii(text):
+  """Quita acentos (canción -> cancion). Si ya es ASCII no pasa por NFKD."""
+  if text.isascii():
+    return text
+  return unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('utf-8')
+
+@lru_cache(maxsize=CACHE_SIZE)
+def generate_slug(text):
+  if not text: return "item"
+  # 1. Quitar HTML tags (si quedaron)
+  text = strip_tags(text)
+  # 2. Normalizar unicode (quitar acentos: canción -> cancion)
+  text = to_ascii(text)
+  # 3. Quitar caracteres que no sean alfanuméricos o espacios
+  text = _SLUG_INVALID_RE.sub('', text).lower()
+  # 4. Reemplazar espacios por guiones bajos
+  text = _SLUG_SEPARATORS_RE.sub('_', text).strip('-_')
+  # 5. Cortar si es extremadamente largo (Firestore soporta ids largos, pero mejor prevenir)
+  return text[:60]
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_for_match(text):
+  if not text: return ""
+  # Quitar HTML, acentos, mayúsculas y espacios extra
+  text = to_ascii(strip_tags(text))
+  return _SPACES_RE.sub(' ', text).strip().lower()
+
+@lru_cache(maxsize=CACHE_SIZE)
+def slugify(value: str) -> str:
+  if value:
+    value = value.strip()  # remove whitespace/newlines
+    if value.isascii():
+      return _SLUGIFY_INVALID_RE.sub('', value.replace(" ", "_")).lower()
+    normalized = unicodedata.normalize('NFD', value)
+    without_accents = ''.join(
+      c for c in normalized if unicodedata.category(c) != 'Mn'
+    )
+    underscored = without_accents.replace(" ", "_")
+    clean = _SLUGIFY_INVALID_RE.sub('', underscored)
+    return clean.lower()
+  return None
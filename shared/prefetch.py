@@ -0,0 +1,152 @@
+from collections import OrderedDict
+import concurrent.futures
+import threading
+
+from google.cloud import firestore
+
+from shared.item_keys import COLLECTION, ItemKeys
+
+# ==========================================
+# Prefetch de items por lotes de CUCEs (Form 500/600)
+# ==========================================
+# En el backfill cada 500/600 hacía su propia consulta items where cuce == X:
+# 40k formularios = 40k consultas en serie. ItemPrefetcher junta los CUCEs
+# que vienen y los consulta de a `chunk_size` con un filtro "in" en un pool
+# aparte, así las consultas se superponen con el procesamiento. El matcher
+# (shared/loader.py) toma los items del cache; si el prefetch de ese CUCE
+# sigue en curso lo espera, y si no está consulta como antes.
+#
+# Primero se leen los índices item_claves/{cuce} del lote (una lectura por
+# lotes con get_all si el cliente la tiene): los CUCEs con índice ya no
+# consultan items. Solo los que no lo tienen (cargados antes del índice, o
+# LLENO) van al filtro "in", trayendo solo lo que usa el matching
+# (proyección), y de paso el índice queda armado para escribirse.
+#
+# El cache guarda ItemKeys listos y está acotado (LRU). Cada entrada se
+# consume una sola vez: después del matching los items cambian.
+
+# Firestore admite hasta 30 valores en un filtro "in"
+CHUNK_SIZE = 30
+PROJECTION = ("descripcion", "estado", "precio_adjudicado_total")
+# Formularios que usan el matching y los que no escriben items. Los que sí
+# escriben (100..400) invalidan el prefetch de su CUCE y dejan el índice al
+# día, así que solo conviene prefetchear los CUCEs que en esta pasada traen
+# 500/600 sin esas etapas (las anteriores se cargaron en otra pasada).
+RECEPCION_FORMS = frozenset(["FORM500", "FORM600"])
+SIN_ITEMS_FORMS = RECEPCION_FORMS | {"FORM120"}
+
+def prefetch_cuces(groups):
+  """CUCEs de los grupos (entries de un mismo CUCE) que vale la pena prefetchear."""
+  return [
+    group[0].cuce for group in groups
+    if any(e.form in RECEPCION_FORMS for e in group) and all(e.form in SIN_ITEMS_FORMS for e in group)
+  ]
+
+class ItemPrefetcher:
+  def __init__(self, db, maxsize=5000, chunk_size=CHUNK_SIZE, workers=4, wait_timeout=60):
+    self.db = db
+    self.maxsize = maxsize
+    self.chunk_size = chunk_size
+    self.wait_timeout = wait_timeout
+    self.hits = 0
+    self.misses = 0
+    self.queries = 0
+    self.indexed = 0
+    self._cache = OrderedDict()
+    self._pending = {}
+    self._invalidated = set()
+    self._lock = threading.Lock()
+    self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+  def schedule(self, cuces):
+    """Encola la consulta de los CUCEs que no están en cache ni en curso."""
+    with self._lock:
+      todo = []
+      for cuce in dict.fromkeys(cuces):
+        if cuce and cuce not in self._cache and cuce not in self._pending:
+          todo.append(cuce)
+          self._invalidated.discard(cuce)
+      for i in range(0, len(todo), self.chunk_size):
+        chunk = todo[i:i + self.chunk_size]
+        future = self._executor.submit(self._fetch, chunk)
+        for cuce in chunk:
+          self._pending[cuce] = future
+
+  def _read_indices(self, chunk):
+    refs = [self.db.collection(COLLECTION).document(cuce) for cuce in chunk]
+    if hasattr(self.db, "get_all"):
+      snapshots = self.db.get_all(refs)
+    else:
+      snapshots = [ref.get() for ref in refs]
+    return {snapshot.id: snapshot.to_dict() for snapshot in snapshots if snapshot.exists}
+
+  def _query_items(self, cuces):
+    groups = {cuce: [] for cuce in cuces}
+    query = self.db.collection("items").where(filter=firestore.FieldFilter("cuce", "in", cuces))
+    if hasattr(query, "select"):
+      # Firestore: traer solo los campos proyectados
+      query = query.select(("cuce",) + PROJECTION)
+    for doc in query.stream():
+      cuce = (doc.to_dict() or {}).get("cuce")
+      if cuce in groups:
+        groups[cuce].append(doc)
+    return {cuce: ItemKeys.from_docs(cuce, docs) for cuce, docs in groups.items()}
+
+  def _fetch(self, chunk):
+    found, indexed, queried = {}, 0, False
+    try:
+      indices = self._read_indices(chunk)
+      for cuce in chunk:
+        keys = ItemKeys.from_index(cuce, indices.get(cuce))
+        if keys is not None:
+          found[cuce] = keys
+      indexed = len(found)
+      missing = [cuce for cuce in chunk if cuce not in found]
+      if missing:
+        found.update(self._query_items(missing))
+        queried = True
+    except Exception as e:
+      # Sin prefetch cada CUCE consulta por su cuenta
+      print(f"⚠️ Prefetch de items falló ({len(chunk)} CUCEs): {e}")
+      found, indexed = {}, 0
+    with self._lock:
+      self.queries += queried
+      self.indexed += indexed
+      for cuce in chunk:
+        self._pending.pop(cuce, None)
+        if cuce in found and cuce not in self._invalidated:
+          self._cache[cuce] = found[cuce]
+          self._cache.move_to_end(cuce)
+        self._invalidated.discard(cuce)
+      while len(self._cache) > self.maxsize:
+        self._cache.popitem(last=False)
+
+  def take(self, cuce):
+    """ItemKeys del CUCE (y lo saca del cache), o None si hay que leerlo aparte."""
+    with self._lock:
+      future = self._pending.get(cuce)
+    if future is not None:
+      try:
+        future.result(timeout=self.wait_timeout)
+      except concurrent.futures.TimeoutError:
+        pass
+    with self._lock:
+      keys = self._cache.pop(cuce, None)
+      if keys is None:
+        self.misses += 1
+      else:
+        self.hits += 1
+      return keys
+
+  def invalidate(self, cuce):
+    """Se escribieron items de este CUCE: lo prefetcheado ya no sirve."""
+    with self._lock:
+      self._cache.pop(cuce, None)
+      if cuce in self._pending:
+        self._invalidated.add(cuce)
+
+  def stats(self):
+    return f"prefetch items: {self.indexed} índices | {self.queries} consultas | aciertos {self.hits} | fallos {self.misses}"
+
+  def close(self):
+    self._executor.shutdown(wait=True)
@@ -0,0 +1,68 @@
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from shared.stream import drop_sections
+
+# ==========================================
+# Poda del HTML antes de armar el árbol
+# ==========================================
+# Las páginas de SICOES traen scripts, estilos, comentarios, inputs ocultos y
+# maquetación que ningún processor lee. Se quitan a nivel de texto y el árbol
+# se arma solo con la región del formulario (las tablas). Si en la región no
+# está la marca que ese formulario siempre lee (FORM_MARKERS) se vuelve al
+# árbol completo; sin marca conocida no hay fallback (un solo parseo).
+
+_HIDDEN_INPUT_RE = re.compile(r'<input\b[^>]*\btype\s*=\s*["\']?hidden\b[^>]*>', re.I)
+
+# Región a parsear por tipo de formulario (todos leen solo dentro de tablas)
+DEFAULT_REGION = "table"
+FORM_REGIONS = {}
+
+_ENTIDAD_RE = re.compile('ENTIDAD', re.IGNORECASE)
+
+def _formulario_cuce(soup):
+  return soup.find('td', class_='FormularioCUCE') is not None
+
+def _etiqueta_cuce(soup):
+  return soup.find('strong', class_='FormularioEtiquetaCUCE') is not None or soup.find('td', string='CUCE:') is not None
+
+def _entidad(soup):
+  return soup.find('font', string=_ENTIDAD_RE) is not None
+
+def _celda_cuce(soup):
+  return soup.find('td', string=lambda text: text and "CUCE" in text) is not None
+
+# Lo primero que busca cada processor: si falta en la región, la forma no es la esperada
+FORM_MARKERS = {
+  "FORM100": _formulario_cuce,
+  "FORM110": _formulario_cuce,
+  "FORM120": _formulario_cuce,
+  "FORM150": _formulario_cuce,
+  "FORM170": _etiqueta_cuce,
+  "FORM180": _etiqueta_cuce,
+  "FORM200": _etiqueta_cuce,
+  "FORM220": _etiqueta_cuce,
+  "FORM190": _entidad,
+  "FORM300": _entidad,
+  "FORM400": _entidad,
+  "FORM500": _celda_cuce,
+  "FORM600": _celda_cuce,
+}
+
+def prune_html(html):
+  """Quita scripts, estilos, comentarios e inputs ocultos."""
+  html = "".join(drop_sections([html]))
+  if "<input" in html or "<INPUT" in html:
+    html = _HIDDEN_INPUT_RE.sub("", html)
+  return html
+
+def parse_form(html, form_type=None):
+  pruned = prune_html(html)
+  region = FORM_REGIONS.get(form_type, DEFAULT_REGION)
+  soup = BeautifulSoup(pruned, 'html.parser', parse_only=SoupStrainer(region))
+  marker = FORM_MARKERS.get(form_type)
+  if marker is not None and not marker(soup):
+    # Forma inesperada: árbol completo (ya sin scripts ni comentarios)
+    soup = BeautifulSoup(pruned, 'html.parser')
+  return soup
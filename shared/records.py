@@ -0,0 +1,135 @@
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, date
+import json
+
+from shared.deadletter import describe_error
+from shared.versions import parser_version
+
+# ==========================================
+# Registros intermedios (extracción -> carga)
+# ==========================================
+# Cada processor tiene un extract_X(html, file_name) puro que devuelve un
+# FormRecords y un process_X que lo carga con shared/loader.py. Así se puede
+# parsear offline a toda velocidad, guardar el resultado en JSON lines y
+# reproducirlo después contra cualquier destino.
+
+RECORDS_VERSION = 1
+
+# Qué hacer con la entidad al cargar (los processors no coinciden entre sí)
+ENTIDAD_INSERT_MISSING = "insert_missing"   # solo si no existe (100, 110)
+ENTIDAD_UPSERT = "upsert"                   # siempre, con merge (150, 190, 300)
+ENTIDAD_LOOKUP = "lookup"                   # solo leer el departamento (400)
+
+@dataclass
+class FormRecords:
+  """Resultado de extraer un formulario. Todos los campos son serializables."""
+  form: str
+  source: str = None
+  version: int = RECORDS_VERSION
+  entidades: list = field(default_factory=list)       # kwargs de insert_entidad + "mode"
+  convocatorias: list = field(default_factory=list)   # kwargs de insert_convocatoria
+  estados: list = field(default_factory=list)         # {"cuce", "estado", "form"}
+  items: list = field(default_factory=list)           # {"cuce", "id", "data"}
+  proponentes: list = field(default_factory=list)     # nombres
+  recepciones: list = field(default_factory=list)     # matching contra items existentes (500/600)
+  parser_version: int = None                          # versión del processor (shared/versions.py)
+  errores: list = field(default_factory=list)         # excepciones capturadas al extraer (describe_error)
+
+  def __post_init__(self):
+    if self.parser_version is None:
+      self.parser_version = parser_version(self.form)
+
+  def add_entidad(self, cod, nombre, fax=None, telefono=None, mode=ENTIDAD_INSERT_MISSING):
+    self.entidades.append({"cod": cod, "nombre": nombre, "fax": fax, "telefono": telefono, "mode": mode})
+
+  def add_convocatoria(self, cuce, **fields):
+    self.convocatorias.append(dict(fields, cuce=cuce))
+
+  def add_estado(self, cuce, estado, form):
+    self.estados.append({"cuce": cuce, "estado": estado, "form": form})
+
+  def add_item(self, cuce, item_identifier, data=None, **fields):
+    row = dict(data) if data else {}
+    row.update(fields)
+    self.items.append({"cuce": cuce, "id": item_identifier, "data": row})
+
+  def add_proponente(self, nombre):
+    if nombre and nombre not in self.proponentes:
+      self.proponentes.append(nombre)
+
+  def add_recepcion(self, cuce, form, items, desiertos=None, observacion=None):
+    """
+    items: [{"key": descripción normalizada, "update": {...}, "create": {...}}]
+    (al cargar, el loader agrega "item_id" con el item que resolvió el matching)
+    desiertos: claves de la tabla de desiertos; None si el formulario no la trae
+    (entonces lo que no se tocó se marca Desierto con `observacion`).
+    """
+    self.recepciones.append({
+      "cuce": cuce, "form": form, "items": items,
+      "desiertos": desiertos, "observacion": observacion
+    })
+
+  def add_error(self, error):
+    """Registra una excepción que el processor capturó (el formulario queda incompleto)."""
+    self.errores.append(describe_error(error))
+
+  @property
+  def cuce(self):
+    for group in (self.convocatorias, self.estados, self.recepciones, self.items):
+      for record in group:
+        if record.get("cuce"):
+          return record["cuce"]
+    return None
+
+  def to_dict(self):
+    return asdict(self)
+
+  @classmethod
+  def from_dict(cls, data):
+    version = data.get("version", 1)
+    if version > RECORDS_VERSION:
+      raise ValueError(f"Versión de registros no soportada: {version} (máx. {RECORDS_VERSION})")
+    # Registros guardados antes de estampar la versión del processor
+    data.setdefault("parser_version", 0)
+    return cls(**data)
+
+# ==========================================
+# Serialización (JSON lines)
+# ==========================================
+
+def json_default(value):
+  if isinstance(value, datetime):
+    return {"$dt": value.isoformat()}
+  if isinstance(value, date):
+    return {"$d": value.isoformat()}
+  raise TypeError(f"No serializable: {type(value).__name__}")
+
+def json_object_hook(obj):
+  if len(obj) == 1:
+    if "$dt" in obj:
+      return datetime.fromisoformat(obj["$dt"])
+    if "$d" in obj:
+      return date.fromisoformat(obj["$d"])
+  return obj
+
+def dumps(records):
+  return json.dumps(records.to_dict(), default=json_default, ensure_ascii=False, separators=(",", ":"))
+
+def loads(line):
+  return FormRecords.from_dict(json.loads(line, object_hook=json_object_hook))
+
+def write_jsonl(fp, records_iter):
+  """Escribe un FormRecords por línea. Retorna la cantidad escrita."""
+  n = 0
+  for records in records_iter:
+    fp.write(dumps(records))
+    fp.write("\n")
+    n += 1
+  return n
+
+def read_jsonl(fp):
+  """Generador: un FormRecords por línea no vacía."""
+  for line in fp:
+    line = line.strip()
+    if line:
+      yield loads(line)
@@ -0,0 +1,131 @@
+from datetime import datetime
+
+from google.cloud import firestore
+
+from shared.sinks import apply_value
+from shared.versions import PARSER_VERSIONS, outdated_versions, stamp_field
+
+# ==========================================
+# Reproceso selectivo
+# ==========================================
+# plan_reprocess busca, por el campo de origen que estampa el loader, los
+# archivos cuyas convocatorias/items salieron de versiones viejas de un
+# processor. ChangedFieldsClient envuelve al cliente para que el reproceso
+# escriba solo los campos que realmente cambian.
+#
+# Los documentos escritos antes del estampado no tienen origen y no se pueden
+# consultar: para esos hace falta un backfill completo (una sola vez).
+
+PLAN_COLLECTIONS = ("convocatorias", "items")
+
+# Firestore admite hasta 30 valores en un filtro "in"
+IN_LIMIT = 30
+
+def plan_reprocess(db, forms=None, versions=None, collections=PLAN_COLLECTIONS):
+  """
+  Archivos a reprocesar: los que escribieron documentos con una versión
+  afectada. `versions` = {form: [versiones]}; por defecto todas las
+  anteriores a la actual de cada formulario. Retorna {form: [archivos]}.
+  """
+  forms = forms or list(PARSER_VERSIONS)
+  plan = {}
+  for form in forms:
+    affected = (versions or {}).get(form, outdated_versions(form))
+    field = stamp_field(form)
+    files = set()
+    for i in range(0, len(affected), IN_LIMIT):
+      chunk = list(affected[i:i + IN_LIMIT])
+      for collection in collections:
+        query = db.collection(collection).where(filter=firestore.FieldFilter(f"{field}.version", "in", chunk))
+        for doc in query.stream():
+          origen = doc.get(field) or {}
+          if origen.get("archivo"):
+            files.add(origen["archivo"])
+    if files:
+      plan[form] = sorted(files)
+  return plan
+
+# ==========================================
+# Escritura solo de campos cambiados
+# ==========================================
+
+def _same(current, value):
+  if isinstance(value, firestore.ArrayUnion):
+    return apply_value(current, value) == current
+  if isinstance(value, firestore.Increment):
+    return not value.value
+  if isinstance(current, datetime) and isinstance(value, datetime):
+    # Firestore devuelve fechas con zona (UTC); las parseadas no la tienen
+    if current.tzinfo and not value.tzinfo:
+      current = current.replace(tzinfo=None)
+  return current == value
+
+def changed_fields(current, data):
+  """Subconjunto de `data` que cambiaría el documento actual."""
+  current = current or {}
+  return {k: v for k, v in data.items() if k not in current or not _same(current[k], v)}
+
+class _ChangedDocument:
+  def __init__(self, client, ref):
+    self._client = client
+    self._ref = ref
+    self.id = ref.id
+
+  def get(self, *args, **kwargs):
+    return self._ref.get(*args, **kwargs)
+
+  def set(self, data, merge=False):
+    current = self._ref.get().to_dict()
+    if current is None or not merge:
+      # Sin merge el documento se reemplaza: solo se omite si queda igual
+      if current is not None and not changed_fields(current, data) and current.keys() <= data.keys():
+        self._client.skipped += 1
+        return
+      self._client.written += 1
+      return self._ref.set(data, merge=merge)
+    changes = changed_fields(current, data)
+    if not changes:
+      self._client.skipped += 1
+      return
+    self._client.written += 1
+    self._ref.set(changes, merge=True)
+
+  def update(self, data):
+    current = self._ref.get().to_dict()
+    if current is None:
+      # Que falle igual que el cliente real (NotFound)
+      return self._ref.update(data)
+    changes = changed_fields(current, data)
+    if not changes:
+      self._client.skipped += 1
+      return
+    self._client.written += 1
+    self._ref.update(changes)
+
+class _ChangedCollection:
+  def __init__(self, client, collection):
+    self._client = client
+    self._collection = collection
+
+  def document(self, doc_id):
+    return _ChangedDocument(self._client, self._collection.document(doc_id))
+
+  def where(self, *args, **kwargs):
+    return self._collection.where(*args, **kwargs)
+
+  def stream(self):
+    return self._collection.stream()
+
+class ChangedFieldsClient:
+  """
+  Envuelve un cliente (Firestore, SqliteSink...) y antes de cada set/update
+  lee el documento y manda solo los campos distintos; si no cambió nada, no
+  escribe. Cuesta una lectura por escritura: pensado para reprocesos.
+  """
+  def __init__(self, db):
+    self._db = db
+    self.written = 0
+    self.skipped = 0
+
+  def collection(self, name):
+    return _ChangedCollection(self, self._db.collection(name))
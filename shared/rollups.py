@@ -0,0 +1,149 @@
+from datetime import date
+
+from google.cloud import firestore
+
+from shared.item_keys import ItemKeys
+from shared.normalize import slugify
+
+# ==========================================
+# Resúmenes incrementales (rollups)
+# ==========================================
+# Los dashboards suman total_referencial y montos adjudicados por entidad,
+# departamento, modalidad y mes. En vez de leer toda la colección en cada
+# vista, se mantienen documentos resumen en "resumenes" que se actualizan
+# con Increment al cargar cada formulario.
+#
+# Idempotencia: cada convocatoria guarda en `_rollup` lo que aportó la última
+# vez ({doc resumen: {métrica: valor}}). Al reprocesar solo se aplica la
+# diferencia entre el aporte nuevo y el guardado, así que cargar dos veces el
+# mismo formulario no cambia los totales. Con el cliente real de Firestore
+# lectura + incrementos + `_rollup` van en una transacción.
+#
+# El total adjudicado sale del índice item_claves/{cuce} (shared/item_keys.py),
+# que el loader ya dejó al día con el monto de cada item: una lectura en vez
+# de recorrer todos los items del CUCE en cada formulario de adjudicación.
+
+COLLECTION = "resumenes"
+SIN_FECHA = "sin_fecha"
+
+# Formularios que cambian montos adjudicados de los items (hay que recalcular el total)
+ADJUDICACION_FORMS = frozenset(["FORM170", "FORM180", "FORM200", "FORM220", "FORM500", "FORM600"])
+
+def _month(value):
+  if isinstance(value, date):
+    return value.strftime("%Y-%m")
+  return SIN_FECHA
+
+def summary_ids(convocatoria):
+  """Documentos resumen a los que aporta una convocatoria: [(doc_id, dimensión, valor, mes)]."""
+  mes = _month(convocatoria.get("fecha_publicacion"))
+  targets = [(f"mes__{mes}", "mes", None, mes)]
+  for dimension, field in (("entidad", "entidad_cod"), ("departamento", "entidad_departamento"), ("modalidad", "modalidad")):
+    value = convocatoria.get(field)
+    if value:
+      targets.append((f"{dimension}__{slugify(str(value))}__{mes}", dimension, value, mes))
+  return targets
+
+def contribution(convocatoria, total_adjudicado):
+  """Aporte de una convocatoria a cada documento resumen."""
+  metrics = {
+    "convocatorias": 1,
+    "total_referencial": convocatoria.get("total_referencial") or 0.0,
+    "total_adjudicado": total_adjudicado or 0.0,
+  }
+  estado = convocatoria.get("estado")
+  if estado:
+    metrics[f"estado_{slugify(estado)}"] = 1
+  return {doc_id: dict(metrics) for doc_id, _, _, _ in summary_ids(convocatoria)}
+
+def deltas(old, new):
+  """{doc_id: {métrica: delta}} sin los deltas en cero."""
+  result = {}
+  for doc_id in old.keys() | new.keys():
+    before, after = old.get(doc_id, {}), new.get(doc_id, {})
+    changes = {}
+    for metric in before.keys() | after.keys():
+      delta = after.get(metric, 0) - before.get(metric, 0)
+      if delta:
+        changes[metric] = delta
+    if changes:
+      result[doc_id] = changes
+  return result
+
+def _total_adjudicado(db, cuce):
+  # Sin índice (o LLENO) ItemKeys.load vuelve a la consulta de items
+  return ItemKeys.load(db, cuce).total_adjudicado()
+
+def _writes(convocatoria, changes):
+  """Escrituras a aplicar (merge) sobre los resúmenes: [(doc_id, data)]."""
+  meta = {doc_id: (dimension, value, mes) for doc_id, dimension, value, mes in summary_ids(convocatoria)}
+  writes = []
+  for doc_id, metrics in changes.items():
+    data = {metric: firestore.Increment(delta) for metric, delta in metrics.items()}
+    if doc_id in meta:
+      dimension, value, mes = meta[doc_id]
+      data.update({"dimension": dimension, "valor": value, "mes": mes})
+    writes.append((doc_id, data))
+  return writes
+
+def _in_transaction(db, body):
+  """Corre body(transaction) en una transacción de Firestore (con reintentos ante conflictos)."""
+  @firestore.transactional
+  def run(transaction):
+    return body(transaction)
+  return run(db.transaction())
+
+def update_rollup(db, cuce, recompute_adjudicado=True):
+  """Recalcula el aporte de `cuce` y aplica solo la diferencia. Retorna los docs tocados."""
+  conv_ref = db.collection("convocatorias").document(cuce)
+
+  total_adjudicado = _total_adjudicado(db, cuce) if recompute_adjudicado else None
+
+  def apply(snapshot, set_doc, update_conv):
+    if not snapshot.exists:
+      return []
+    convocatoria = snapshot.to_dict()
+    stored = convocatoria.get("_rollup") or {}
+    old_docs = stored.get("docs") or {}
+    adjudicado = total_adjudicado if total_adjudicado is not None else stored.get("total_adjudicado", 0.0)
+
+    new_docs = contribution(convocatoria, adjudicado)
+    changes = deltas(old_docs, new_docs)
+    if not changes:
+      return []
+    for doc_id, data in _writes(convocatoria, changes):
+      set_doc(db.collection(COLLECTION).document(doc_id), data)
+    update_conv({"_rollup": {"docs": new_docs, "total_adjudicado": adjudicado}})
+    return list(changes)
+
+  if hasattr(db, "transaction"):
+    def body(transaction):
+      snapshot = conv_ref.get(transaction=transaction)
+      return apply(
+        snapshot,
+        lambda ref, data: transaction.set(ref, data, merge=True),
+        lambda data: transaction.update(conv_ref, data)
+      )
+    return _in_transaction(db, body)
+
+  # Destinos sin transacciones (SqliteSink, FakeFirestore)
+  return apply(
+    conv_ref.get(),
+    lambda ref, data: ref.set(data, merge=True),
+    conv_ref.update
+  )
+
+class RollupUpdater:
+  """Listener del loader: actualiza los resúmenes de la convocatoria de cada FormRecords cargado."""
+  def __init__(self, db):
+    self.db = db
+
+  def __call__(self, records):
+    cuce = records.cuce
+    if not cuce:
+      return
+    try:
+      update_rollup(self.db, cuce, recompute_adjudicado=records.form in ADJUDICACION_FORMS)
+    except Exception as e:
+      # El resumen queda desactualizado hasta la próxima carga de ese CUCE
+      print(f"⚠️ No se pudo actualizar el resumen de {cuce} ({records.source}): {e}")
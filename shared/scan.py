@@ -0,0 +1,82 @@
+from collections import namedtuple
+from html.parser import HTMLParser
+
+from shared.utils import clean_text
+
+# ==========================================
+# Escaneo por eventos (sin árbol) para formularios chicos
+# ==========================================
+# Para formularios que solo necesitan un par de campos (ej. FORM120 -> CUCE)
+# recorremos el HTML con HTMLParser y cortamos apenas tenemos todo. Si falta
+# algún campo, el processor vuelve al árbol completo de BeautifulSoup.
+
+# Un campo = texto del primer <tag class="cls"> del documento
+ScanField = namedtuple("ScanField", ["tag", "cls"])
+
+ScanResult = namedtuple("ScanResult", ["fields", "complete", "text"])
+
+class _Done(Exception):
+  pass
+
+class _FieldScanner(HTMLParser):
+  def __init__(self, fields):
+    super().__init__(convert_charrefs=True)
+    self._pending = dict(fields)
+    self.found = {}
+    self._current = None   # nombre del campo que estamos leyendo
+    self._depth = 0
+    self._buffer = []
+
+  def handle_starttag(self, tag, attrs):
+    if self._current is not None:
+      if tag == self._pending[self._current].tag:
+        self._depth += 1
+      return
+    for name, field in self._pending.items():
+      if tag != field.tag:
+        continue
+      classes = (dict(attrs).get("class") or "").split()
+      if field.cls in classes:
+        self._current, self._depth, self._buffer = name, 1, []
+        return
+
+  def handle_endtag(self, tag):
+    if self._current is None or tag != self._pending[self._current].tag:
+      return
+    self._depth -= 1
+    if self._depth == 0:
+      name = self._current
+      self.found[name] = clean_text("".join(self._buffer))
+      del self._pending[name]
+      self._current = None
+      if not self._pending:
+        raise _Done()
+
+  def handle_data(self, data):
+    if self._current is not None:
+      self._buffer.append(data)
+
+def scan_fields(source, fields):
+  """
+  Busca `fields` ({nombre: ScanField}) en `source` (str o iterable de chunks str).
+  Deja de leer apenas encuentra todos. `complete` es False si falta alguno o quedó
+  vacío; en ese caso `text` trae el documento completo para el fallback al árbol.
+  """
+  chunks = iter([source] if isinstance(source, str) else source)
+  scanner = _FieldScanner(fields)
+  seen = []
+  done = False
+  try:
+    for chunk in chunks:
+      seen.append(chunk)
+      scanner.feed(chunk)
+    scanner.close()
+  except _Done:
+    done = True
+
+  complete = done and all(scanner.found.get(name) for name in fields)
+  if not complete:
+    # Se cortó con un campo vacío: el fallback necesita el resto del documento
+    seen.extend(chunks)
+  text = None if complete else "".join(seen)
+  return ScanResult(scanner.found, complete, text)
@@ -0,0 +1,79 @@
+from collections import OrderedDict
+import concurrent.futures
+
+# ==========================================
+# Orden por ciclo de vida de la convocatoria
+# ==========================================
+# 170-220 asumen que la convocatoria (100/110) ya existe y 500/600 marcan como
+# Desierto todo item que no encuentran, así que dentro de un mismo CUCE los
+# formularios tienen que cargarse en este orden. CUCEs distintos no dependen
+# entre sí y se procesan en paralelo.
+
+LIFECYCLE = (
+  ("FORM100", "FORM110", "FORM120", "FORM150"),
+  ("FORM170", "FORM180", "FORM190", "FORM200", "FORM220"),
+  ("FORM300", "FORM400"),
+  ("FORM500", "FORM600"),
+)
+_STAGES = {form: stage for stage, forms in enumerate(LIFECYCLE) for form in forms}
+
+def lifecycle_stage(form):
+  """Etapa del formulario (0 = publicación). Los desconocidos van al final."""
+  return _STAGES.get(form, len(LIFECYCLE))
+
+def group_by_cuce(entries):
+  """{cuce: [entries ordenadas por etapa]}, con los CUCEs en orden de aparición."""
+  groups = OrderedDict()
+  for entry in entries:
+    groups.setdefault(entry.cuce, []).append(entry)
+  for cuce, group in groups.items():
+    # sort es estable: dentro de una etapa se respeta el orden de la lista
+    group.sort(key=lambda e: (lifecycle_stage(e.form), e.revision))
+  return groups
+
+def _is_error(result):
+  return isinstance(result, str) and result.startswith("ERROR")
+
+def _run_cuce(group, fn, is_error):
+  results = []
+  failed_stage = None
+  for entry in group:
+    stage = lifecycle_stage(entry.form)
+    if failed_stage is not None and stage > failed_stage:
+      # Sin la etapa anterior el resultado sería incorrecto: se deja para la próxima pasada
+      results.append((entry, "SKIP_DEPENDENCIA"))
+      continue
+    result = fn(entry.name)
+    if is_error(result) and failed_stage is None:
+      failed_stage = stage
+    results.append((entry, result))
+  return results
+
+def run_groups(groups, fn, max_workers=20, is_error=_is_error):
+  """
+  Como run_by_lifecycle pero recibe los grupos ya armados (uno por CUCE) y
+  los consume de a poco: nunca hay más de 2 * max_workers grupos pendientes,
+  así que el origen puede ser un generador (listado del bucket).
+  """
+  pending = set()
+  with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+    for group in groups:
+      if not group:
+        continue
+      group = sorted(group, key=lambda e: (lifecycle_stage(e.form), e.revision))
+      pending.add(executor.submit(_run_cuce, group, fn, is_error))
+      if len(pending) >= 2 * max_workers:
+        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+          yield from future.result()
+    for future in concurrent.futures.as_completed(pending):
+      yield from future.result()
+
+def run_by_lifecycle(entries, fn, max_workers=20, is_error=_is_error):
+  """
+  Ejecuta fn(nombre) para cada entry: secuencial por CUCE en orden de ciclo
+  de vida, paralelo entre CUCEs. Si una etapa falla, las posteriores del mismo
+  CUCE no se ejecutan (resultado "SKIP_DEPENDENCIA").
+  Generador de (entry, resultado) a medida que terminan los CUCEs.
+  """
+  return run_groups(group_by_cuce(entries).values(), fn, max_workers, is_error)
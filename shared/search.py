@@ -0,0 +1,68 @@
+from functools import lru_cache
+import re
+
+from google.cloud import firestore
+
+from shared.normalize import CACHE_SIZE, normalize_for_match
+
+# ==========================================
+# Tokens de búsqueda
+# ==========================================
+# Firestore no busca subcadenas, así que al guardar cada item (descripcion) y
+# cada convocatoria (objeto) calculamos el conjunto de palabras normalizadas
+# (misma normalización que normalize_for_match, sin stop-words) y lo guardamos
+# en el campo `tokens`. Una búsqueda por palabra es entonces una consulta
+# indexada `array_contains`. SqliteSink además indexa los mismos tokens en
+# una tabla FTS5 para búsquedas offline con varias palabras.
+
+TOKENS_FIELD = "tokens"
+
+# Firestore indexa cada elemento del array: acotamos el tamaño del campo
+MAX_TOKENS = 64
+MIN_TOKEN_LENGTH = 2
+
+_TOKEN_SPLIT_RE = re.compile(r'[^a-z0-9]+')
+
+STOP_WORDS = frozenset("""
+  a al ante bajo con contra de del desde e el en entre es hacia hasta la las le lo los
+  mas o para per por que se segun sin so sobre su sus tras u un una unas unos y
+  cada como este esta estos estas otro otra otros otras
+  s n nro no
+""".split())
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _tokens(text):
+  seen = []
+  for token in _TOKEN_SPLIT_RE.split(normalize_for_match(text)):
+    if len(token) < MIN_TOKEN_LENGTH or token in STOP_WORDS or token in seen:
+      continue
+    seen.append(token)
+    if len(seen) >= MAX_TOKENS:
+      break
+  return tuple(seen)
+
+def tokenize(text):
+  """Palabras de búsqueda de un texto (puede traer HTML), en orden de aparición y sin repetir."""
+  if not text or not isinstance(text, str):
+    return []
+  return list(_tokens(text))
+
+def search_items(db, text, limit=50):
+  """
+  Items que contienen todas las palabras de `text`. Firestore admite un solo
+  array_contains por consulta: se filtra por la palabra más larga (la más
+  selectiva en la práctica) y el resto se verifica en memoria.
+  """
+  tokens = tokenize(text)
+  if not tokens:
+    return []
+  anchor = max(tokens, key=len)
+  query = db.collection("items").where(filter=firestore.FieldFilter(TOKENS_FIELD, "array_contains", anchor))
+  results = []
+  for doc in query.stream():
+    doc_tokens = set(doc.get(TOKENS_FIELD) or ())
+    if all(token in doc_tokens for token in tokens):
+      results.append(doc)
+      if len(results) >= limit:
+        break
+  return results
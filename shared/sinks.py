@@ -0,0 +1,312 @@
+from datetime import date, datetime
+import json
+import sqlite3
+import threading
+
+from google.cloud import firestore
+
+from shared.records import json_default, json_object_hook
+from shared.search import TOKENS_FIELD, tokenize
+
+# ==========================================
+# Destinos de carga (sinks)
+# ==========================================
+# El loader y shared/firestore.py solo usan este subconjunto del cliente de
+# Firestore, que es la interfaz que tiene que cumplir cualquier destino:
+#   db.collection(name).document(id).get() / .set(data, merge=) / .update(data)
+#   db.collection(name).where(filter=FieldFilter(campo, "==" | "in" | "array_contains", valor)).stream()
+#   snapshot.id / .exists / .to_dict() / .get(campo)
+# con ArrayUnion e Increment como valores especiales.
+#
+# SqliteSink guarda todo en un archivo local (o ":memory:") con una tabla por
+# colección, columnas indexadas para los campos de consulta y el documento
+# completo en JSON. Sirve para backfills masivos a velocidad de disco, para
+# análisis y como reemplazo offline en benchmarks. Los `tokens` de items y
+# convocatorias (shared/search.py) se indexan además en una tabla FTS5.
+
+def apply_value(current, value):
+  """Aplica un valor de set/update sobre el actual (resuelve ArrayUnion e Increment)."""
+  if isinstance(value, firestore.ArrayUnion):
+    merged = list(current) if isinstance(current, list) else []
+    for v in value.values:
+      if v not in merged:
+        merged.append(v)
+    return merged
+  if isinstance(value, firestore.Increment):
+    return (current or 0) + value.value
+  return value
+
+# Columnas propias (e indexadas) por colección; el resto queda solo en `data`
+COLUMNS = {
+  "entidades": ("nombre", "departamento"),
+  "convocatorias": ("entidad_cod", "estado", "modalidad", "tipo_contratacion", "fecha_publicacion"),
+  "items": ("cuce", "estado", "entidad_cod", "catalogo_cod", "proponente_nombre"),
+  "proponentes": ("nombre",),
+}
+INDEXES = {
+  "convocatorias": ("entidad_cod", "estado", "fecha_publicacion"),
+  "items": ("cuce", "estado", "entidad_cod", "catalogo_cod"),
+}
+
+# Colecciones con índice de texto completo (tabla FTS5 "busqueda")
+SEARCH_COLLECTIONS = ("items", "convocatorias")
+
+class NotFound(LookupError):
+  pass
+
+def _column_value(value):
+  if isinstance(value, (datetime, date)):
+    return value.isoformat()
+  if isinstance(value, (list, dict)):
+    return json.dumps(value, default=json_default, ensure_ascii=False)
+  return value
+
+class SqliteSnapshot:
+  def __init__(self, doc_id, data):
+    self.id = doc_id
+    self._data = data
+
+  @property
+  def exists(self):
+    return self._data is not None
+
+  def to_dict(self):
+    return dict(self._data) if self._data is not None else None
+
+  def get(self, field):
+    return (self._data or {}).get(field)
+
+class SqliteDocument:
+  def __init__(self, sink, collection, doc_id):
+    self._sink = sink
+    self._collection = collection
+    self.id = doc_id
+
+  def get(self):
+    return SqliteSnapshot(self.id, self._sink.read(self._collection, self.id))
+
+  def set(self, data, merge=False):
+    self._sink.write(self._collection, self.id, data, merge=merge)
+
+  def update(self, data):
+    self._sink.write(self._collection, self.id, data, merge=True, must_exist=True)
+
+  def delete(self):
+    self._sink.delete(self._collection, self.id)
+
+class SqliteQuery:
+  def __init__(self, sink, collection, filters):
+    self._sink = sink
+    self._collection = collection
+    self._filters = filters
+
+  def where(self, field_path=None, op_string=None, value=None, filter=None):
+    if filter is not None:
+      field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+    if op_string not in ("==", "in", "array_contains"):
+      raise ValueError(f"Operador no soportado en SqliteSink: {op_string}")
+    return SqliteQuery(self._sink, self._collection, self._filters + [(field_path, op_string, value)])
+
+  def stream(self):
+    for doc_id, data in self._sink.query(self._collection, self._filters):
+      yield SqliteSnapshot(doc_id, data)
+
+class SqliteCollection(SqliteQuery):
+  def __init__(self, sink, name):
+    super().__init__(sink, name, [])
+
+  def document(self, doc_id):
+    return SqliteDocument(self._sink, self._collection, doc_id)
+
+class SqliteSink:
+  """
+  Destino SQLite con la interfaz del cliente de Firestore. Es thread-safe
+  (una conexión con lock) y hace commit cada `commit_every` escrituras.
+  """
+  def __init__(self, path=":memory:", commit_every=500):
+    self.path = path
+    self.commit_every = commit_every
+    self.reads = 0
+    self.writes = 0
+    self._pending = 0
+    self._tables = set()
+    self.fts = False
+    self._lock = threading.RLock()
+    self._conn = sqlite3.connect(path, check_same_thread=False)
+    self._conn.execute("PRAGMA journal_mode=WAL")
+    self._conn.execute("PRAGMA synchronous=NORMAL")
+    for name in COLUMNS:
+      self._ensure_table(name)
+    self._ensure_fts()
+    self._conn.commit()
+
+  # --- API tipo Firestore ---
+  def collection(self, name):
+    return SqliteCollection(self, name)
+
+  # --- Tablas ---
+  def _ensure_table(self, name):
+    if name in self._tables:
+      return
+    if not name.isidentifier():
+      raise ValueError(f"Nombre de colección inválido: {name}")
+    columns = "".join(f", {c}" for c in COLUMNS.get(name, ()))
+    self._conn.execute(f"CREATE TABLE IF NOT EXISTS {name} (id TEXT PRIMARY KEY{columns}, data TEXT NOT NULL)")
+    for column in INDEXES.get(name, ()):
+      self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_{column} ON {name} ({column})")
+    self._tables.add(name)
+
+  def _ensure_fts(self):
+    try:
+      self._conn.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS busqueda USING fts5(tokens, collection UNINDEXED, doc_id UNINDEXED)"
+      )
+      self.fts = True
+    except sqlite3.OperationalError as e:
+      # SQLite compilado sin FTS5: la búsqueda cae en array_contains
+      print(f"⚠️ FTS5 no disponible, búsqueda sin índice de texto: {e}")
+      return
+    # Las columnas UNINDEXED no tienen índice: (colección, doc) -> rowid de busqueda
+    # para reemplazar la entrada de un documento sin recorrer toda la tabla
+    self._conn.execute(
+      "CREATE TABLE IF NOT EXISTS busqueda_docs (collection TEXT, doc_id TEXT, fts_rowid INTEGER, PRIMARY KEY (collection, doc_id))"
+    )
+    if self._conn.execute("SELECT 1 FROM busqueda_docs LIMIT 1").fetchone() is None:
+      # Archivos creados antes de busqueda_docs
+      self._conn.execute(
+        "INSERT OR REPLACE INTO busqueda_docs (collection, doc_id, fts_rowid) "
+        "SELECT collection, doc_id, rowid FROM busqueda ORDER BY rowid"
+      )
+
+  def _index_tokens(self, collection, doc_id, doc):
+    tokens = doc.get(TOKENS_FIELD)
+    row = self._conn.execute(
+      "SELECT fts_rowid FROM busqueda_docs WHERE collection = ? AND doc_id = ?", (collection, doc_id)
+    ).fetchone()
+    if row and tokens:
+      self._conn.execute("UPDATE busqueda SET tokens = ? WHERE rowid = ?", (" ".join(tokens), row[0]))
+    elif row:
+      self._conn.execute("DELETE FROM busqueda WHERE rowid = ?", (row[0],))
+      self._conn.execute("DELETE FROM busqueda_docs WHERE collection = ? AND doc_id = ?", (collection, doc_id))
+    elif tokens:
+      cursor = self._conn.execute(
+        "INSERT INTO busqueda (tokens, collection, doc_id) VALUES (?, ?, ?)",
+        (" ".join(tokens), collection, doc_id)
+      )
+      self._conn.execute(
+        "INSERT INTO busqueda_docs (collection, doc_id, fts_rowid) VALUES (?, ?, ?)",
+        (collection, doc_id, cursor.lastrowid)
+      )
+
+  def _decode(self, raw):
+    return json.loads(raw, object_hook=json_object_hook)
+
+  def read(self, collection, doc_id):
+    with self._lock:
+      self._ensure_table(collection)
+      self.reads += 1
+      row = self._conn.execute(f"SELECT data FROM {collection} WHERE id = ?", (doc_id,)).fetchone()
+    return self._decode(row[0]) if row else None
+
+  def write(self, collection, doc_id, data, merge=False, must_exist=False):
+    with self._lock:
+      self._ensure_table(collection)
+      current = None
+      if merge:
+        row = self._conn.execute(f"SELECT data FROM {collection} WHERE id = ?", (doc_id,)).fetchone()
+        current = self._decode(row[0]) if row else None
+      if must_exist and current is None:
+        raise NotFound(f"No document to update: {collection}/{doc_id}")
+
+      doc = current or {}
+      for key, value in data.items():
+        doc[key] = apply_value(doc.get(key), value)
+
+      columns = COLUMNS.get(collection, ())
+      names = "".join(f", {c}" for c in columns)
+      marks = ", ?" * len(columns)
+      values = [doc_id] + [_column_value(doc.get(c)) for c in columns]
+      values.append(json.dumps(doc, default=json_default, ensure_ascii=False, separators=(",", ":")))
+      self._conn.execute(f"INSERT OR REPLACE INTO {collection} (id{names}, data) VALUES (?{marks}, ?)", values)
+      if self.fts and collection in SEARCH_COLLECTIONS:
+        self._index_tokens(collection, doc_id, doc)
+
+      self.writes += 1
+      self._pending += 1
+      if self._pending >= self.commit_every:
+        self._conn.commit()
+        self._pending = 0
+
+  def delete(self, collection, doc_id):
+    with self._lock:
+      self._ensure_table(collection)
+      self._conn.execute(f"DELETE FROM {collection} WHERE id = ?", (doc_id,))
+      if self.fts and collection in SEARCH_COLLECTIONS:
+        self._index_tokens(collection, doc_id, {})
+      self.writes += 1
+      self._pending += 1
+      if self._pending >= self.commit_every:
+        self._conn.commit()
+        self._pending = 0
+
+  def query(self, collection, filters):
+    clauses, params = [], []
+    columns = COLUMNS.get(collection, ())
+    for field, op, value in filters:
+      target = field if field in columns else f"json_extract(data, '$.{field}')"
+      if op == "==":
+        clauses.append(f"{target} = ?")
+        params.append(_column_value(value))
+      elif op == "array_contains":
+        clauses.append(f"EXISTS (SELECT 1 FROM json_each(data, '$.{field}') WHERE value = ?)")
+        params.append(_column_value(value))
+      else:
+        values = list(value)
+        if not values:
+          return []
+        clauses.append(f"{target} IN ({', '.join('?' * len(values))})")
+        params.extend(_column_value(v) for v in values)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    with self._lock:
+      self._ensure_table(collection)
+      rows = self._conn.execute(f"SELECT id, data FROM {collection}{where}", params).fetchall()
+      self.reads += len(rows)
+    return [(doc_id, self._decode(raw)) for doc_id, raw in rows]
+
+  def search(self, collection, text, limit=50):
+    """Documentos de `collection` con todas las palabras de `text` (FTS5, ordenados por relevancia)."""
+    tokens = tokenize(text)
+    if not tokens:
+      return []
+    if not self.fts:
+      query = self.collection(collection)
+      for token in tokens:
+        query = query.where(TOKENS_FIELD, "array_contains", token)
+      return list(query.stream())[:limit]
+    # Los tokens son [a-z0-9]+: se pueden citar sin escapar
+    match = " ".join(f'"{token}"' for token in tokens)
+    with self._lock:
+      self._ensure_table(collection)
+      rows = self._conn.execute(
+        f"SELECT c.id, c.data FROM busqueda b JOIN {collection} c ON c.id = b.doc_id "
+        "WHERE busqueda MATCH ? AND b.collection = ? ORDER BY b.rank LIMIT ?",
+        (match, collection, limit)
+      ).fetchall()
+      self.reads += len(rows)
+    return [SqliteSnapshot(doc_id, self._decode(raw)) for doc_id, raw in rows]
+
+  def commit(self):
+    with self._lock:
+      self._conn.commit()
+      self._pending = 0
+
+  def close(self):
+    with self._lock:
+      self._conn.commit()
+      self._conn.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
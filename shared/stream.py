@@ -0,0 +1,112 @@
+import codecs
+import re
+
+# ==========================================
+# Descarga por partes desde GCS
+# ==========================================
+# download_as_text guarda el objeto completo en bytes, lo decodifica a un
+# segundo string completo y recién ahí BeautifulSoup arma el árbol. Acá se lee
+# el blob por chunks, se decodifica cada chunk con un decoder incremental
+# (sin copia intermedia de todo el documento) y se descartan al vuelo las
+# secciones que ningún processor lee.
+
+CHUNK_SIZE = 256 * 1024
+
+# (apertura, cierre) de secciones que se descartan mientras pasan
+DROP_SECTIONS = (
+  (re.compile(r'<script\b', re.I), re.compile(r'</script\s*>', re.I)),
+  (re.compile(r'<style\b', re.I), re.compile(r'</style\s*>', re.I)),
+  (re.compile(r'<!--'), re.compile(r'-->')),
+)
+
+# Lo máximo que puede quedar cortado entre chunks ("</script  >", "<!-")
+_TAIL = 16
+# Sección sin cierre más larga que se retiene antes de dejar de descartarla
+MAX_SECTION = 1024 * 1024
+
+class DownloadError(Exception):
+  """Falla leyendo el blob. Los chunks se leen de a poco (dentro de la extracción),
+  así que se distingue de un error del processor para registrarla como descarga."""
+
+def iter_blob_chunks(blob, chunk_size=CHUNK_SIZE, encoding="utf-8"):
+  """Lee el blob en chunks de bytes y los entrega ya decodificados (str)."""
+  decoder = codecs.getincrementaldecoder(encoding)()
+  try:
+    with blob.open("rb", chunk_size=chunk_size) as stream:
+      while True:
+        data = stream.read(chunk_size)
+        if not data:
+          break
+        text = decoder.decode(data)
+        if text:
+          yield text
+  except UnicodeDecodeError:
+    raise
+  except Exception as e:
+    raise DownloadError(f"Error leyendo {getattr(blob, 'name', blob)}: {e}") from e
+  text = decoder.decode(b"", final=True)
+  if text:
+    yield text
+
+def _earliest_open(text, pos, sections):
+  best = None
+  for opener, closer in sections:
+    m = opener.search(text, pos)
+    if m and (best is None or m.start() < best[0].start()):
+      best = (m, closer)
+  return best
+
+def drop_sections(chunks, sections=DROP_SECTIONS, max_section=MAX_SECTION):
+  """
+  Filtra un iterable de chunks str quitando las secciones de `sections`
+  (scripts, estilos, comentarios). Aperturas y cierres pueden quedar cortados
+  entre chunks: la cola se guarda hasta el chunk siguiente. Una sección se
+  retiene hasta ver su cierre; si no aparece (fin del documento o más de
+  `max_section` caracteres) se emite tal cual en vez de descartar el resto.
+  """
+  pending = ""
+  closer = None     # != None mientras estamos dentro de una sección
+  opener_end = 0    # fin de la apertura, relativo al inicio de la sección
+  searched = 0      # hasta dónde ya se buscó el cierre, relativo al inicio de la sección
+  chunks = iter(chunks)
+  final = False
+  while not final:
+    chunk = next(chunks, None)
+    final = chunk is None
+    text = pending + (chunk or "")
+    pos, out = 0, []
+    while True:
+      if closer is not None:
+        # text[pos:] es la sección desde su apertura
+        m = closer.search(text, pos + max(opener_end, searched))
+        if m is None:
+          if final or len(text) - pos > max_section:
+            # Sin cierre: se deja la apertura como texto y se sigue normalmente
+            out.append(text[pos:pos + opener_end])
+            pos, closer = pos + opener_end, None
+            continue
+          searched = max(opener_end, len(text) - pos - _TAIL)
+          break
+        pos, closer = m.end(), None
+      found = _earliest_open(text, pos, sections)
+      if found is not None and (final or found[0].end() < len(text)):
+        m, closer = found
+        out.append(text[pos:m.start()])
+        pos, opener_end, searched = m.start(), m.end() - m.start(), 0
+        continue
+      # La cola puede tener una apertura a medias ("<scr", "<!-"); con el último chunk se emite todo
+      end = len(text)
+      if not final:
+        cut = text.rfind("<", max(pos, len(text) - _TAIL))
+        if cut != -1:
+          end = cut
+      out.append(text[pos:end])
+      pos = end
+      break
+    pending = text[pos:]
+    if out and any(out):
+      yield "".join(out)
+
+def read_blob_text(blob, chunk_size=CHUNK_SIZE, encoding="utf-8"):
+  """HTML del blob ya filtrado, como un solo string para los processors."""
+  return "".join(drop_sections(iter_blob_chunks(blob, chunk_size, encoding)))
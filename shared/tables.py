@@ -0,0 +1,132 @@
+from collections import namedtuple
+import copy
+import re
+
+from shared.utils import clean_text
+
+# ==========================================
+# Extracción genérica de tablas -> registros
+# ==========================================
+# Reemplaza el bucle que repetía cada processor (decompose de tablas anidadas,
+# filtrar filas por cantidad de td, leer cabecera, map_headers, decode_contents).
+# No modifica el árbol: las tablas anidadas se ignoran en vez de borrarse.
+
+_SPACES_RE = re.compile(r'\s+')
+
+def header_key(text):
+  return _SPACES_RE.sub(' ', text or '').strip().casefold()
+
+def compile_header_map(map_headers):
+  """Precompila {texto de cabecera: campo} a una búsqueda normalizada (espacios y mayúsculas)."""
+  return {header_key(label): field for label, field in map_headers.items()}
+
+def resolve_header(header_map, text):
+  field = header_map.get(header_key(text))
+  if field is None:
+    field = text.lower().replace(" ", "_")
+  return field
+
+class TableRecords(namedtuple("TableRecords", ["labels", "headers", "rows"])):
+  """labels: texto original de cabecera, headers: campos mapeados, rows: tuplas por fila."""
+  __slots__ = ()
+
+  def as_dicts(self):
+    headers = self.headers
+    return [dict(zip(headers, row)) for row in self.rows]
+
+def table_rows(table):
+  """Filas propias de la tabla (sin las de tablas anidadas)."""
+  return [tr for tr in table.find_all("tr") if tr.find_parent("table") is table]
+
+def row_cells(row):
+  return row.find_all("td", recursive=False)
+
+def _without_nested_tables(cell):
+  if cell.find("table") is None:
+    return cell
+  # Copia para no mutar el árbol original
+  cell = copy.copy(cell)
+  for table in cell.find_all("table"):
+    table.decompose()
+  return cell
+
+def cell_text(cell):
+  return clean_text(_without_nested_tables(cell).get_text().strip())
+
+def cell_html(cell):
+  return _without_nested_tables(cell).decode_contents().strip()
+
+def _span(cell, attr):
+  try:
+    return max(int(cell.get(attr, 1)), 1)
+  except (TypeError, ValueError):
+    return 1
+
+def read_header_labels(rows, index, multirow=None):
+  """
+  Lee la cabecera en rows[index]. Si alguna celda coincide con `multirow`
+  (ej. "Preferencia"), la cabecera ocupa dos filas: las celdas agrupadoras
+  (colspan > 1 o la que coincide con el patrón) se reemplazan por las
+  sub-cabeceras de la fila siguiente. Retorna (labels, índice de la primera fila de datos).
+  """
+  first = [c.get_text(strip=True) for c in row_cells(rows[index])]
+  if multirow is None or index + 1 >= len(rows) or not any(multirow.search(label) for label in first):
+    return first, index + 1
+
+  cells = row_cells(rows[index])
+  subs = [c.get_text(strip=True) for c in row_cells(rows[index + 1])]
+  labels, pos = [], 0
+  for cell, label in zip(cells, first):
+    span = _span(cell, "colspan")
+    if span > 1:
+      labels.extend(subs[pos:pos + span])
+      pos += span
+    elif multirow.search(label) and _span(cell, "rowspan") == 1:
+      labels.extend(subs[pos:])
+      pos = len(subs)
+    else:
+      labels.append(label)
+  labels.extend(subs[pos:])
+  return labels, index + 2
+
+def extract_records(table, header_map, header_row=0, multirow=None, same_width=False,
+    html_fields=("descripcion",), min_cells=2, skip_prefix=None, row_filter=None, stop=None):
+  """
+  Extrae una tabla a tuplas compactas.
+    header_row: índice de la fila de cabecera o el <tr> de cabecera.
+    same_width: descarta filas con distinta cantidad de td que la cabecera (totales, títulos).
+    skip_prefix / row_filter: descartan filas por su primera celda / por sus celdas.
+    stop: cantidad de filas finales a ignorar (ej. la fila de total).
+  """
+  rows = table_rows(table)
+  if not rows:
+    return TableRecords((), (), [])
+
+  if isinstance(header_row, int):
+    index = header_row
+  else:
+    index = next((i for i, tr in enumerate(rows) if tr is header_row), None)
+    if index is None:
+      return TableRecords((), (), [])
+  if index >= len(rows):
+    return TableRecords((), (), [])
+
+  labels, start = read_header_labels(rows, index, multirow)
+  headers = tuple(resolve_header(header_map, label) for label in labels)
+  html_idx = frozenset(i for i, h in enumerate(headers) if h in html_fields)
+  width = len(row_cells(rows[index]))
+  n_headers = len(headers)
+
+  body = rows[start:len(rows) - stop] if stop else rows[start:]
+  records = []
+  for row in body:
+    cells = row_cells(row)
+    if len(cells) < min_cells: continue
+    if same_width and len(cells) != width: continue
+    if skip_prefix and cells[0].get_text().startswith(skip_prefix): continue
+    if row_filter and not row_filter(cells): continue
+    records.append(tuple(
+      cell_html(cell) if i in html_idx else cell_text(cell)
+      for i, cell in enumerate(cells[:n_headers])
+    ))
+  return TableRecords(tuple(labels), headers, records)
@@ -0,0 +1,216 @@
+import random
+import threading
+import time
+
+from google.api_core import exceptions as gexc
+from google.cloud import firestore
+import requests
+
+# ==========================================
+# Concurrencia adaptativa (AIMD) y reintentos
+# ==========================================
+# En vez de un NUM_HILOS fijo, cada etapa (descargas, escrituras) tiene un
+# AdaptiveLimiter: el límite de operaciones simultáneas sube de a 1 mientras
+# todo va bien y la latencia se mantiene bajo el objetivo, y se reduce a la
+# mitad ante señales de saturación (timeouts, 429, RESOURCE_EXHAUSTED).
+# call_with_retries reintenta con backoff exponencial con jitter según el
+# tipo de error.
+
+# Tipos de error
+THROTTLED = "throttled"     # el backend pide bajar el ritmo: reintentar y reducir el límite
+TRANSIENT = "transient"     # falla pasajera: reintentar sin tocar el límite
+FATAL = "fatal"             # no tiene sentido reintentar (404, datos inválidos...)
+
+RETRY_STATUS = {
+  429: THROTTLED, 503: THROTTLED,
+  500: TRANSIENT, 502: TRANSIENT, 504: TRANSIENT,
+}
+
+class RetryableStatus(Exception):
+  """Respuesta HTTP que se puede reintentar (ver RETRY_STATUS)."""
+  def __init__(self, status_code, url=None):
+    super().__init__(f"HTTP {status_code} {url or ''}".strip())
+    self.status_code = status_code
+
+def classify_error(error):
+  if isinstance(error, RetryableStatus):
+    return RETRY_STATUS.get(error.status_code, FATAL)
+  if isinstance(error, (gexc.TooManyRequests, gexc.ResourceExhausted, gexc.ServiceUnavailable,
+                        gexc.DeadlineExceeded, requests.Timeout)):
+    return THROTTLED
+  if isinstance(error, (gexc.InternalServerError, gexc.Aborted, gexc.BadGateway, gexc.GatewayTimeout,
+                        requests.ConnectionError, ConnectionError)):
+    return TRANSIENT
+  return FATAL
+
+class AdaptiveLimiter:
+  """
+  Semáforo con límite variable (AIMD). Suma `increase` al límite cada vez que
+  se completa una "ventana" de `limit` operaciones exitosas y con latencia
+  menor a `latency_target` (si se define); ante THROTTLED multiplica por
+  `decrease`, a lo sumo una vez por `cooldown` segundos (una ráfaga de errores
+  de la misma saturación cuenta como una sola señal).
+  """
+  def __init__(self, name, initial=8, minimum=1, maximum=64, increase=1, decrease=0.5,
+               latency_target=None, cooldown=2.0):
+    self.name = name
+    self.limit = float(initial)
+    self.minimum = minimum
+    self.maximum = maximum
+    self.increase = increase
+    self.decrease = decrease
+    self.latency_target = latency_target
+    self.cooldown = cooldown
+    self.in_flight = 0
+    self.successes = 0
+    self.throttles = 0
+    self.retries = 0
+    self._window = 0
+    self._last_decrease = 0.0
+    self._cond = threading.Condition()
+
+  def acquire(self):
+    with self._cond:
+      while self.in_flight >= int(self.limit):
+        self._cond.wait()
+      self.in_flight += 1
+
+  def release(self, kind=None, latency=None):
+    """kind: None si salió bien, o el tipo de error (THROTTLED, TRANSIENT, FATAL)."""
+    with self._cond:
+      self.in_flight -= 1
+      if kind is None:
+        self.successes += 1
+        if self.latency_target is None or latency is None or latency <= self.latency_target:
+          self._window += 1
+          if self._window >= int(self.limit):
+            self._window = 0
+            self.limit = min(self.maximum, self.limit + self.increase)
+        else:
+          # Latencia alta: no crecer
+          self._window = 0
+      elif kind == THROTTLED:
+        self.throttles += 1
+        now = time.monotonic()
+        if now - self._last_decrease >= self.cooldown:
+          self._last_decrease = now
+          self.limit = max(self.minimum, self.limit * self.decrease)
+          self._window = 0
+      self._cond.notify_all()
+
+  def note_retry(self):
+    with self._cond:
+      self.retries += 1
+
+  def __enter__(self):
+    self.acquire()
+    return self
+
+  def __exit__(self, exc_type, exc, tb):
+    # Con el bloque `with` solo se sabe si hubo excepción; call_with_retries usa release directamente
+    self.release(classify_error(exc) if exc else None)
+
+  def stats(self):
+    return (f"{self.name}: límite {int(self.limit)} | ok {self.successes} | "
+            f"saturación {self.throttles} | reintentos {self.retries}")
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+  """Backoff exponencial con "full jitter": uniforme en [0, min(cap, base * 2^intento)]."""
+  return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+def call_with_retries(fn, limiter=None, retries=4, base=0.5, cap=30.0, retry_if=None):
+  """
+  Ejecuta fn() dentro del limiter y la reintenta ante THROTTLED/TRANSIENT.
+  `retry_if(error, kind)` permite vetar reintentos (ej. escrituras no idempotentes).
+  """
+  for attempt in range(retries + 1):
+    if limiter:
+      limiter.acquire()
+    start = time.monotonic()
+    try:
+      result = fn()
+    except Exception as e:
+      kind = classify_error(e)
+      if limiter:
+        limiter.release(kind)
+      retryable = kind != FATAL and attempt < retries and (retry_if is None or retry_if(e, kind))
+      if not retryable:
+        raise
+      if limiter:
+        limiter.note_retry()
+      time.sleep(backoff_delay(attempt, base, cap))
+      continue
+    if limiter:
+      limiter.release(None, time.monotonic() - start)
+    return result
+
+# ==========================================
+# Cliente con escrituras limitadas y reintentos
+# ==========================================
+
+def _idempotent(data):
+  return not any(isinstance(v, firestore.Increment) for v in data.values())
+
+def _write_retry_if(data):
+  # Un Increment que dio timeout pudo haberse aplicado: solo se reintenta si el backend lo rechazó
+  if _idempotent(data):
+    return None
+  return lambda error, kind: isinstance(error, (gexc.TooManyRequests, gexc.ResourceExhausted))
+
+class _ThrottledDocument:
+  def __init__(self, client, ref):
+    self._client = client
+    self._ref = ref
+    self.id = ref.id
+
+  def get(self, *args, **kwargs):
+    return self._client.call(lambda: self._ref.get(*args, **kwargs))
+
+  def set(self, data, merge=False):
+    return self._client.call(lambda: self._ref.set(data, merge=merge), _write_retry_if(data))
+
+  def update(self, data):
+    return self._client.call(lambda: self._ref.update(data), _write_retry_if(data))
+
+class _ThrottledQuery:
+  def __init__(self, client, query):
+    self._client = client
+    self._query = query
+
+  def where(self, *args, **kwargs):
+    return _ThrottledQuery(self._client, self._query.where(*args, **kwargs))
+
+  def stream(self):
+    # Se materializa dentro del reintento (las consultas del loader son por CUCE)
+    return iter(self._client.call(lambda: list(self._query.stream())))
+
+  def __getattr__(self, name):
+    # Proyección (Firestore): solo si el cliente envuelto la tiene, así hasattr(query, "select") sigue valiendo
+    if name == "select":
+      select = self._query.select
+      return lambda *args, **kwargs: _ThrottledQuery(self._client, select(*args, **kwargs))
+    raise AttributeError(name)
+
+class _ThrottledCollection(_ThrottledQuery):
+  def document(self, doc_id):
+    return _ThrottledDocument(self._client, self._query.document(doc_id))
+
+class ThrottledClient:
+  """Envuelve un cliente (Firestore, SqliteSink...) pasando cada operación por un AdaptiveLimiter."""
+  def __init__(self, db, limiter, retries=4):
+    self._db = db
+    self.limiter = limiter
+    self.retries = retries
+
+  def call(self, fn, retry_if=None):
+    return call_with_retries(fn, self.limiter, retries=self.retries, retry_if=retry_if)
+
+  def collection(self, name):
+    return _ThrottledCollection(self, self._db.collection(name))
+
+  def __getattr__(self, name):
+    # Lectura por lotes (Firestore): solo si el cliente envuelto la tiene
+    if name == "get_all":
+      get_all = self._db.get_all
+      return lambda refs, *args, **kwargs: self.call(lambda: list(get_all([ref._ref for ref in refs], *args, **kwargs)))
+    raise AttributeError(name)
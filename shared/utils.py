@@ -1,39 +1,16 @@
 from datetime import datetime, date
-import unicodedata, re
+import re
 
-from bs4 import BeautifulSoup
+# Re-exportados para no romper los imports existentes (from shared.utils import generate_slug)
+from shared.normalize import generate_slug, normalize_for_match, slugify
+
+_SPACES_RE = re.compile(r'\s+')
 
 def clean_text(text):
   if text:
-    return re.sub(r'\s+', ' ', text).strip()
-  return None
-
-def slugify(value: str) -> str:
-  if value:
-    value = value.strip()  # remove whitespace/newlines
-    normalized = unicodedata.normalize('NFD', value)
-    without_accents = ''.join(
-      c for c in normalized if unicodedata.category(c) != 'Mn'
-    )
-    underscored = without_accents.replace(" ", "_")
-    clean = re.sub(r'[^a-zA-Z0-9_]', '', underscored)
-    return clean.lower()
+    return _SPACES_RE.sub(' ', text).strip()
   return None
 
-# --- Función Helper para crear IDs limpios ---
-def generate_slug(text):
-  if not text: return "item"
-  # 1. Quitar HTML tags (si quedaron)
-  text = BeautifulSoup(text, "html.parser").get_text(separator=" ")
-  # 2. Normalizar unicode (quitar acentos: canción -> cancion)
-  text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('utf-8')
-  # 3. Quitar caracteres que no sean alfanuméricos o espacios
-  text = re.sub(r'[^\w\s-]', '', text).lower()
-  # 4. Reemplazar espacios por guiones bajos
-  text = re.sub(r'[-\s]+', '_', text).strip('-_')
-  # 5. Cortar si es extremadamente largo (Firestore soporta ids largos, pero mejor prevenir)
-  return text[:60]
-
 def parse_date(value):
   """Accepts datetime, date, ISO strings, or DD/MM/YYYY strings."""
   if not value:
@@ -119,13 +96,6 @@ def parse_bool(value):
     return None
   return str(value).strip().lower() == "si"
 
-def normalize_for_match(text):
-  if not text: return ""
-  # Quitar HTML, acentos, mayúsculas y espacios extra
-  text = BeautifulSoup(text, "html.parser").get_text(separator=" ")
-  text = unicodedata.normalize('NFKD', text).encode('ASCII', 'ignore').decode('utf-8')
-  return re.sub(r'\s+', ' ', text).strip().lower()
-
 def extract_cronograma(soup):
   """
   Busca y extrae las fechas clave del cronograma en el objeto BeautifulSoup dado.
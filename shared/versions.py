@@ -0,0 +1,39 @@
+# ==========================================
+# Versiones de los processors
+# ==========================================
+# Al corregir un bug de extracción se sube la versión del formulario acá.
+# El loader estampa en cada convocatoria/item qué formulario, versión y
+# archivo lo escribió (campo `_origen_form100`, etc.), así que después se
+# puede reprocesar solo lo que salió de versiones afectadas (ver reprocess.py).
+#
+# Versión 0 = registros sin versión (JSON lines anteriores al estampado).
+
+PARSER_VERSIONS = {
+  "FORM100": 1,
+  "FORM110": 1,
+  "FORM120": 1,
+  "FORM150": 1,
+  "FORM170": 1,
+  "FORM180": 1,
+  "FORM190": 1,
+  "FORM200": 1,
+  "FORM220": 1,
+  "FORM300": 1,
+  "FORM400": 1,
+  "FORM500": 1,
+  "FORM600": 1,
+}
+
+def parser_version(form):
+  return PARSER_VERSIONS.get(form, 0)
+
+def stamp_field(form):
+  """Campo con el origen de un formulario. Uno por formulario: un item lo escriben 100, 170, 500..."""
+  return f"_origen_{form.lower()}"
+
+def make_stamp(form, version, source):
+  return {stamp_field(form): {"version": version, "archivo": source}}
+
+def outdated_versions(form):
+  """Versiones anteriores a la actual (las que hay que reprocesar por defecto)."""
+  return list(range(parser_version(form)))
@@ -0,0 +1,46 @@
+import random
+from datetime import date, datetime
+
+import pytest
+
+from shared.columns import _SEP, detect_number_locale, float_list, parse_date_column, parse_float_column
+from shared.utils import parse_date, parse_float
+
+@pytest.mark.parametrize("column, expected", [
+  (["1,234.56", "3.5", "10"], [1234.56, 3.5, 10.0]),
+  (["1.234,56", "10,5", "Bs 3"], [1234.56, 10.5, 3.0]),
+  # Mezclas: cada celda como la leería parse_float
+  (["1,234.56", "7,5"], [1234.56, 7.5]),
+  (["1.000.000", "2.5"], [1000000.0, 2.5]),
+  (["1,000,000", "2,5"], [1000000.0, 2.5]),
+  # Ambiguas: una sola coma o un solo punto es decimal
+  (["1,000"], [1.0]),
+  (["1.000"], [1.0]),
+])
+def test_float_column_matches_parse_float(column, expected):
+  assert float_list(column) == expected
+  assert float_list(column) == [parse_float(v) for v in column]
+
+def test_locale_detection():
+  assert detect_number_locale(_SEP.join(["1,234.56", "3.5"])) == "us"
+  assert detect_number_locale(_SEP.join(["1.234,56", "3,5"])) == "eu"
+  assert detect_number_locale(_SEP.join(["1,234.56", "7,5"])) is None
+  assert detect_number_locale(_SEP.join(["1.000.000", "2.5"])) is None
+
+def test_nulls_and_numbers():
+  values, nulls = parse_float_column([None, "", 4, "abc", "-2,5"])
+  assert list(nulls) == [1, 1, 0, 1, 0]
+  assert (values[2], values[4]) == (4.0, -2.5)
+
+def test_random_columns_match_parse_float():
+  rnd = random.Random(7)
+  for _ in range(5000):
+    column = ["".join(rnd.choice("0123456789.,- ") for _ in range(rnd.randint(0, 8))) for _ in range(rnd.randint(1, 4))]
+    assert float_list(column) == [parse_float(v) for v in column], column
+
+def test_date_column():
+  column = ["05/03/2024", "5/3/2024", "31/02/2024", "2024-03-05", None, date(2024, 1, 2), "mañana"]
+  values, nulls = parse_date_column(column)
+  assert values[:2] == [datetime(2024, 3, 5), datetime(2024, 3, 5)]
+  assert list(nulls) == [0, 0, 1, 0, 1, 0, 1]
+  assert [None if n else v for v, n in zip(values, nulls)] == [parse_date(v) for v in column]
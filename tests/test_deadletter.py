@@ -0,0 +1,92 @@
+import replay
+from shared.deadletter import CARGA, COLLECTION, DESCARGA, EXTRACCION, DeadLetterStore, describe_error, error_signature
+from shared.records import FormRecords
+from shared.sinks import SqliteSink
+
+FILE = "2024-01_FORM100_1.html"
+
+def fail(value):
+  if value:
+    raise ValueError("tabla vacía")
+  raise ValueError("otra línea, misma causa")
+
+def caught(fn, *args):
+  try:
+    fn(*args)
+  except Exception as e:
+    return e
+
+def letter(store, file_name=FILE):
+  return store.db.collection(COLLECTION).document(file_name).get().to_dict()
+
+def test_signature_ignores_message_and_line():
+  a, b = caught(fail, True), caught(fail, False)
+  assert error_signature(a) == error_signature(b)
+  assert error_signature(a) != error_signature(caught(int, "x"))
+  assert error_signature("ERROR_DOWNLOAD_404") == error_signature("ERROR_DOWNLOAD_404")
+  assert error_signature("ERROR_DOWNLOAD_404") != error_signature("ERROR_DOWNLOAD_500")
+
+  detail = describe_error(a)
+  assert (detail["error"], detail["mensaje"]) == ("ValueError", "tabla vacía")
+  assert "fail" in detail["traza"]
+  assert describe_error("ERROR_DOWNLOAD_404")["traza"] is None
+
+def test_record_counts_attempts_and_pending_groups_by_signature():
+  store = DeadLetterStore(SqliteSink())
+  store.record(f"guias/{FILE}", EXTRACCION, caught(fail, True))
+  store.record(FILE, CARGA, caught(fail, False))
+  store.record("2024-01_FORM500_2.html", DESCARGA, "ERROR_DOWNLOAD_404")
+
+  doc = letter(store)
+  assert (doc["intentos"], doc["etapa"], doc["form"], doc["resuelto"]) == (2, CARGA, "FORM100", False)
+
+  groups = store.pending()
+  assert sorted(len(letters) for letters in groups.values()) == [1, 1]
+  firma = error_signature("ERROR_DOWNLOAD_404")
+  assert [l["archivo"] for l in store.pending(firma)[firma]] == ["2024-01_FORM500_2.html"]
+
+def test_resolve_only_touches_existing_letters():
+  store = DeadLetterStore(SqliteSink())
+  assert store.resolve(FILE) is False
+  assert letter(store) is None
+
+  store.record(FILE, DESCARGA, "ERROR_DOWNLOAD_404")
+  assert store.resolve(FILE) is True
+  assert letter(store)["resuelto"] is True
+  assert store.pending() == {}
+
+def test_clean_load_resolves_previous_failure():
+  store = DeadLetterStore(SqliteSink())
+  records = FormRecords("FORM100", FILE)
+  store.on_load_error(records, caught(fail, True))
+  assert letter(store)["etapa"] == CARGA
+
+  store.on_loaded(records)
+  assert letter(store)["resuelto"] is True
+
+def test_partial_extraction_is_recorded_not_resolved():
+  store = DeadLetterStore(SqliteSink())
+  records = FormRecords("FORM100", FILE, errores=[describe_error(caught(fail, True))])
+  store.on_loaded(records)
+  doc = letter(store)
+  assert (doc["etapa"], doc["error"], doc["resuelto"]) == (EXTRACCION, "ValueError", False)
+
+def test_replay_resolves_ok_and_counts_new_failures(monkeypatch):
+  store = DeadLetterStore(SqliteSink())
+  store.record("a_FORM100_1.html", DESCARGA, "ERROR_DOWNLOAD_404")
+  store.record("b_FORM100_1.html", DESCARGA, "ERROR_DOWNLOAD_404")
+
+  def reprocesar(db, file_name, dead_letters):
+    if file_name.startswith("a"):
+      return "OK"
+    dead_letters.record(file_name, DESCARGA, "ERROR_DOWNLOAD_404")
+    return "ERROR_DOWNLOAD_404"
+
+  monkeypatch.setattr(replay, "reprocesar_un_archivo", reprocesar)
+  (letters,) = store.pending().values()
+  results = replay.replay_letters(None, store, letters, hilos=2)
+
+  assert sorted(results) == ["ERROR_DOWNLOAD_404", "OK"]
+  assert letter(store, "a_FORM100_1.html")["resuelto"] is True
+  pending = letter(store, "b_FORM100_1.html")
+  assert (pending["resuelto"], pending["intentos"]) == (False, 2)
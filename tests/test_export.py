@@ -0,0 +1,74 @@
+import contextlib
+import io
+from datetime import date, datetime
+
+import pytest
+
+from bench.fake_db import FakeFirestore
+from bench.synthetic import generate_case
+from processors import get_extractor
+from shared.export import COLUMNS, SIN_FECHA, records_to_rows
+from shared.loader import load_form
+from shared.records import FormRecords
+
+def quiet(fn, *args):
+  with contextlib.redirect_stdout(io.StringIO()):
+    return fn(*args)
+
+def adjudicacion():
+  records = FormRecords("FORM170", "X_FORM170_2.html")
+  records.add_convocatoria("X", fecha_publicacion=date(2024, 3, 5))
+  records.add_item("X", "arroz", {"descripcion": "<b>Arroz</b>", "precio_adjudicado_total": "1.234,5", "estado": "Adjudicado"})
+  return records
+
+def test_rows_have_every_column_and_partition():
+  [(partition, row)] = list(records_to_rows(adjudicacion()))
+  assert partition == ("2024-03", "FORM170")
+  assert set(row) == {name for name, _ in COLUMNS}
+  assert row["descripcion"] == "Arroz"
+  assert row["fecha_publicacion"] == datetime(2024, 3, 5)
+  # Origen para deduplicar reprocesos
+  assert (row["archivo"], row["parser_version"]) == ("X_FORM170_2.html", 1)
+  assert isinstance(row["exportado"], datetime)
+
+def test_rows_without_date_go_to_sin_fecha():
+  records = FormRecords("FORM100", "a.html")
+  records.add_item("X", "a", {"descripcion": "x", "cantidad_solicitada": "abc"})
+  [(partition, row)] = list(records_to_rows(records))
+  assert partition == (SIN_FECHA, "FORM100")
+  assert row["cantidad_solicitada"] is None
+
+@pytest.mark.parametrize("form", ["FORM500", "FORM600"])
+def test_reception_rows_carry_the_matched_item_id(form):
+  file_name, html, existing = generate_case(form, 8, seed=4)
+  db = FakeFirestore()
+  db.seed("items", existing)
+  records = quiet(get_extractor(form), html, file_name)
+  assert quiet(load_form, db, records)
+
+  rows = [row for _, row in records_to_rows(records)]
+  assert rows and all(row["item_id"] for row in rows)
+  cuce = rows[0]["cuce"]
+  assert all(f"{cuce}_{row['item_id']}" in db.data["items"] for row in rows)
+
+def test_exporter_writes_on_size_and_age(tmp_path, monkeypatch):
+  pytest.importorskip("pyarrow")
+  from shared import export
+  from shared.export import ParquetExporter
+  import pyarrow.parquet as pq
+
+  exporter = ParquetExporter(str(tmp_path), rows_per_file=2, max_age=60)
+  exporter.add(adjudicacion())
+  assert exporter.files_written == 0
+  exporter.add(adjudicacion())
+  assert exporter.files_written == 1
+
+  now = export.time.monotonic()
+  exporter.add(adjudicacion())
+  monkeypatch.setattr(export.time, "monotonic", lambda: now + 61)
+  exporter.add(FormRecords("FORM170"))
+  assert exporter.files_written == 2
+
+  table = pq.read_table(tmp_path / "mes=2024-03" / "form=FORM170")
+  assert table.num_rows == 3
+  assert set(table.column("archivo").to_pylist()) == {"X_FORM170_2.html"}
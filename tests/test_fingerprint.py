@@ -0,0 +1,56 @@
+from bench.fake_db import FakeFirestore
+from shared.fingerprint import FIELD_PREFIX, FingerprintClient, MemoryFingerprints, fields_signature
+
+def test_existing_doc_without_fingerprint_field_is_written():
+  db = FakeFirestore()
+  db.collection("items").document("x").set({"descripcion": "arroz"})
+  client = FingerprintClient(db, doc_field=True)
+
+  client.collection("items").document("x").set({"descripcion": "arroz", "cantidad": 2}, merge=True)
+
+  doc = db.data["items"]["x"]
+  assert doc["cantidad"] == 2
+  assert any(k.startswith(FIELD_PREFIX) for k in doc)
+  assert client.written == 1
+
+def test_fingerprint_in_doc_survives_a_cold_cache():
+  db = FakeFirestore()
+  payload = {"descripcion": "arroz", "cantidad": 2}
+  FingerprintClient(db, doc_field=True).collection("items").document("x").set(payload, merge=True)
+
+  # Otra instancia (cache vacío): la huella se lee del documento
+  client = FingerprintClient(db, store=MemoryFingerprints(), doc_field=True)
+  writes = db.writes
+  client.collection("items").document("x").set(payload, merge=True)
+
+  assert db.writes == writes
+  assert client.skipped == 1
+
+def test_missing_doc_is_written():
+  db = FakeFirestore()
+  client = FingerprintClient(db, doc_field=True)
+  client.collection("items").document("nuevo").set({"descripcion": "arroz"}, merge=True)
+  assert "nuevo" in db.data["items"]
+
+def test_signature_ignores_fingerprint_fields():
+  assert fields_signature({"a": 1, f"{FIELD_PREFIX}x": "y"}, True) == fields_signature({"a": 2}, True)
+
+def test_internal_collections_get_no_fingerprint_field():
+  db = FakeFirestore()
+  client = FingerprintClient(db, doc_field=True)
+  client.collection("item_claves").document("X").set({"arroz": ["k", "Publicado", None]}, merge=True)
+  reads = db.reads
+  client = FingerprintClient(db, doc_field=True)
+  client.collection("item_claves").document("X").set({"arroz": ["k", "Publicado", 1.0]}, merge=True)
+
+  assert db.data["item_claves"]["X"] == {"arroz": ["k", "Publicado", 1.0]}
+  # Sin campo en el documento tampoco hay lectura previa
+  assert db.reads == reads
+
+def test_doc_field_per_collection():
+  db = FakeFirestore()
+  client = FingerprintClient(db, doc_field=["convocatorias"])
+  client.collection("convocatorias").document("X").set({"estado": "Publicado"}, merge=True)
+  client.collection("items").document("X_a").set({"descripcion": "arroz"}, merge=True)
+  assert any(k.startswith(FIELD_PREFIX) for k in db.data["convocatorias"]["X"])
+  assert db.data["items"]["X_a"] == {"descripcion": "arroz"}
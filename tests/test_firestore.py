@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import pytest
+
+from bench.fake_db import FakeFirestore
+from shared.firestore import apply_item_plan, coerce_item, coerce_items, compile_item_plan, insert_item
+from shared.search import TOKENS_FIELD
+from shared.utils import parse_date, parse_float
+
+def test_insert_item_with_dict_and_keywords():
+  db = FakeFirestore()
+  written = insert_item(db, "X", "arroz", {"descripcion": "Arroz", "precio_referencial": "1.234,5"}, estado="Publicado")
+  doc = db.data["items"]["X_arroz"]
+  assert doc == written
+  assert doc["cuce"] == "X"
+  assert doc["precio_referencial"] == 1234.5
+  assert doc["estado"] == "Publicado"
+  assert doc[TOKENS_FIELD]
+
+  insert_item(db, cuce="X", item_identifier="fideo", descripcion="Fideo", cantidad_solicitada="3")
+  assert db.data["items"]["X_fideo"]["cantidad_solicitada"] == 3.0
+
+def test_insert_item_with_only_the_ids():
+  db = FakeFirestore()
+  assert insert_item(db, "X", "vacio") == {"cuce": "X"}
+
+@pytest.mark.parametrize("args, kwargs, message", [
+  # Firma vieja insert_item(db, item, cuce, slug)
+  (({"descripcion": "x"}, "X", "slug"), {}, "deben ser str"),
+  (("X", 1), {}, "deben ser str"),
+  (("X", "slug", ["no", "dict"]), {}, "data debe ser dict"),
+  (("X", "slug"), {"columna_rara": 1}, "campos desconocidos"),
+])
+def test_insert_item_rejects_unknown_signatures(args, kwargs, message):
+  db = FakeFirestore()
+  with pytest.raises(TypeError, match=message):
+    insert_item(db, *args, **kwargs)
+  assert "items" not in db.data
+
+def test_item_plan():
+  plan = compile_item_plan(("descripcion", "precio_adjudicado", "fecha_publicacion", "recurrente_sgte_gestion"))
+  assert [parser for _, parser in plan][:3] == [None, parse_float, parse_date]
+  # El plan se compila una vez por cabecera
+  assert compile_item_plan(("descripcion", "precio_adjudicado", "fecha_publicacion", "recurrente_sgte_gestion")) is plan
+  row = {"descripcion": "Arroz", "precio_adjudicado": "", "fecha_publicacion": "05/03/2024", "recurrente_sgte_gestion": "Si"}
+  assert apply_item_plan(plan, row) == {
+    "descripcion": "Arroz", "fecha_publicacion": datetime(2024, 3, 5), "recurrente_sgte_gestion": True
+  }
+
+def test_coerce_items_matches_coerce_item():
+  rows = [
+    {"descripcion": "a", "precio_adjudicado": "1,234.56", "cantidad_adjudicada": "7,5"},
+    {"descripcion": "b", "precio_adjudicado": None, "cantidad_adjudicada": "2"},
+    {"descripcion": "c", "fecha_publicacion": "05/03/2024"},
+    {"descripcion": "d", "precio_adjudicado": "1.000.000", "cantidad_adjudicada": "x"},
+  ]
+  assert coerce_items(rows) == [coerce_item(row) for row in rows]
+  assert coerce_items(rows)[0] == {"descripcion": "a", "precio_adjudicado": 1234.56, "cantidad_adjudicada": 7.5}
@@ -0,0 +1,57 @@
+from bench.fake_db import FakeFirestore
+from limpiar_items import limpiar_cuce, plan_cleanup
+from shared.ids import ItemIds, catalog_digest, is_current_id, item_ids
+from shared.item_keys import COLLECTION, ItemKeys
+
+def test_id_depends_only_on_the_row():
+  arroz = {"descripcion": "Arroz", "catalogo_cod": "50221101"}
+  alone = item_ids([arroz])[0]
+  # Otra fila con la misma descripción y otro catálogo no cambia el id
+  assert item_ids([arroz, {"descripcion": "Arroz", "catalogo_cod": "1"}])[0] == alone
+  # Mismo item en un formulario que usa cod_catalogo (170-300)
+  assert item_ids([{"descripcion": "ARROZ", "cod_catalogo": "50221101"}]) == [alone]
+  assert alone == f"arroz-{catalog_digest('50221101')}"
+
+def test_repeated_identity_is_numbered_and_order_independent():
+  rows = [{"descripcion": "Item 1"}, {"descripcion": "Item"}, {"descripcion": "Item"}]
+  assert item_ids(rows) == ["item_1", "item", "item-1"]
+  assert sorted(item_ids(list(reversed(rows)))) == sorted(item_ids(rows))
+
+def test_occurrences_count_across_calls():
+  ids = ItemIds()
+  assert ids.assign([{"descripcion": "Arroz"}]) == ["arroz"]
+  assert ids.assign([{"descripcion": "Arroz"}]) == ["arroz-1"]
+
+def test_empty_description_falls_back_to_default():
+  assert item_ids([{"descripcion": "!!!"}, {}]) == ["item", "item-1"]
+
+def test_current_ids_and_previous_scheme():
+  arroz = {"descripcion": "Arroz"}
+  assert is_current_id("arroz", arroz) and is_current_id("arroz-2", arroz)
+  assert is_current_id("item_1", {"descripcion": "Item 1"})
+  # Esquema anterior: repetidos con "_n" y filas con catálogo sin su hash
+  assert not is_current_id("arroz_1", arroz)
+  assert not is_current_id("arroz", {"descripcion": "Arroz", "catalogo_cod": "50221101"})
+  assert not is_current_id("arroz-x", arroz)
+
+def test_cleanup_deletes_only_replaced_items_and_rewrites_the_index():
+  db = FakeFirestore()
+  catalogo = {"descripcion": "Arroz", "catalogo_cod": "50221101", "estado": "Adjudicado", "precio_adjudicado_total": 5.0}
+  db.seed("items", {
+    f"X_{item_ids([catalogo])[0]}": dict(catalogo, cuce="X"),
+    "X_arroz": dict(catalogo, cuce="X"),
+    "X_fideo": {"cuce": "X", "descripcion": "Fideo", "estado": "Publicado"},
+    "X_fideo_1": {"cuce": "X", "descripcion": "Fideo", "estado": "Publicado"},
+    "Y_sal_1": {"cuce": "Y", "descripcion": "Sal"},
+  })
+  keys = ItemKeys.load(db, "X")
+  keys.save(db)
+  assert len(db.data[COLLECTION]["X"]) == 4
+
+  plan = plan_cleanup(db.collection("items").stream())
+  assert plan == {"X": (["X_arroz", "X_fideo_1"], []), "Y": ([], ["Y_sal_1"])}
+
+  limpiar_cuce(db, "X", plan["X"][0])
+  assert sorted(db.data["items"]) == [f"X_{item_ids([catalogo])[0]}", "X_fideo", "Y_sal_1"]
+  assert sorted(db.data[COLLECTION]["X"]) == [item_ids([catalogo])[0], "fideo"]
+  assert ItemKeys.load(db, "X").total_adjudicado() == 5.0
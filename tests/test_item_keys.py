@@ -0,0 +1,128 @@
+from bench.fake_db import FakeFirestore
+from shared.fingerprint import FIELD_PREFIX, FingerprintClient
+from shared.item_keys import COLLECTION, LLENO, MAX_ENTRIES, ItemKeys, match_key
+from shared.prefetch import ItemPrefetcher
+
+def seed_items(db, cuce, descripciones):
+  db.seed("items", {
+    f"{cuce}_{ident}": {"cuce": cuce, "descripcion": desc, "estado": "Publicado"}
+    for ident, desc in descripciones.items()
+  })
+
+class GetAllDb(FakeFirestore):
+  def __init__(self):
+    super().__init__()
+    self.batches = 0
+
+  def get_all(self, refs):
+    self.batches += 1
+    return [ref.get() for ref in refs]
+
+def test_load_builds_index_from_items_once():
+  db = FakeFirestore()
+  seed_items(db, "X", {"arroz": "Arroz", "azucar": "Azúcar"})
+  keys = ItemKeys.load(db, "X")
+  assert keys.rows() == [("X_arroz", match_key("Arroz"), "Publicado"), ("X_azucar", match_key("Azúcar"), "Publicado")]
+  keys.save(db)
+  assert set(db.data[COLLECTION]["X"]) == {"arroz", "azucar"}
+
+  # Con el índice ya no se consultan los items
+  db.data["items"].clear()
+  assert [row[0] for row in ItemKeys.load(db, "X").rows()] == ["X_arroz", "X_azucar"]
+
+def test_put_writes_only_changed_entries():
+  db = FakeFirestore()
+  db.seed(COLLECTION, {"X": {"arroz": [match_key("Arroz"), "Publicado", None]}})
+  keys = ItemKeys.load(db, "X")
+  keys.save(db)
+  assert db.writes == 0
+
+  keys.put("X_arroz", {"estado": "Adjudicado", "precio_adjudicado_total": 10.0})
+  keys.put("X_fideo", {"descripcion": "Fideo", "estado": "Publicado"})
+  keys.save(db)
+  assert db.data[COLLECTION]["X"] == {
+    "arroz": [match_key("Arroz"), "Adjudicado", 10.0],
+    "fideo": [match_key("Fideo"), "Publicado", None],
+  }
+  assert ItemKeys.load(db, "X").total_adjudicado() == 10.0
+
+def test_index_without_amounts_is_rebuilt():
+  db = FakeFirestore()
+  db.seed(COLLECTION, {"X": {"arroz": [match_key("Arroz"), "Adjudicado"]}})
+  db.seed("items", {"X_arroz": {"cuce": "X", "descripcion": "Arroz", "estado": "Adjudicado", "precio_adjudicado_total": 7.5}})
+  keys = ItemKeys.load(db, "X")
+  assert keys.total_adjudicado() == 7.5
+  keys.save(db)
+  assert db.data[COLLECTION]["X"] == {"arroz": [match_key("Arroz"), "Adjudicado", 7.5]}
+
+def test_empty_ident_is_not_a_map_key():
+  db = FakeFirestore()
+  keys = ItemKeys.load(db, "X")
+  keys.put("X_", {"descripcion": "Sin nombre", "estado": "Publicado"})
+  keys.save(db)
+  assert "" not in db.data[COLLECTION]["X"]
+  assert ItemKeys.load(db, "X").rows() == [("X_", match_key("Sin nombre"), "Publicado")]
+
+def test_full_index_falls_back_to_items():
+  db = FakeFirestore()
+  seed_items(db, "X", {"arroz": "Arroz"})
+  keys = ItemKeys("X", {f"i{n}": ["k", None, None] for n in range(MAX_ENTRIES + 1)}, dirty=["i0"])
+  keys.save(db)
+  assert db.data[COLLECTION]["X"] == {LLENO: True}
+  assert [row[0] for row in ItemKeys.load(db, "X").rows()] == ["X_arroz"]
+
+def test_prefetch_reads_indices_and_queries_only_missing():
+  db = GetAllDb()
+  db.seed(COLLECTION, {"A": {"arroz": [match_key("Arroz"), "Publicado", None]}, "L": {LLENO: True}})
+  seed_items(db, "A", {"arroz": "Arroz"})
+  seed_items(db, "B", {"fideo": "Fideo"})
+  seed_items(db, "L", {"sal": "Sal"})
+
+  prefetcher = ItemPrefetcher(db)
+  prefetcher.schedule(["A", "B", "L"])
+  a, b, l = prefetcher.take("A"), prefetcher.take("B"), prefetcher.take("L")
+  prefetcher.close()
+
+  assert db.batches == 1
+  assert (prefetcher.indexed, prefetcher.queries) == (1, 1)
+  assert a.rows() == [("A_arroz", match_key("Arroz"), "Publicado")]
+  assert b.rows() == [("B_fideo", match_key("Fideo"), "Publicado")]
+  assert l.rows() == [("L_sal", match_key("Sal"), "Publicado")]
+
+  # Solo los armados desde los items se escriben
+  a.save(db)
+  b.save(db)
+  assert db.writes == 1
+  assert db.data[COLLECTION]["B"] == {"fideo": [match_key("Fideo"), "Publicado", None]}
+
+def test_prefetch_without_get_all_reads_each_index():
+  db = FakeFirestore()
+  db.seed(COLLECTION, {"A": {"arroz": [match_key("Arroz"), "Publicado", None]}})
+  prefetcher = ItemPrefetcher(db)
+  prefetcher.schedule(["A"])
+  assert prefetcher.take("A").rows() == [("A_arroz", match_key("Arroz"), "Publicado")]
+  assert prefetcher.take("A") is None
+  prefetcher.close()
+  assert prefetcher.queries == 0
+
+def test_invalidated_prefetch_is_dropped():
+  db = FakeFirestore()
+  seed_items(db, "A", {"arroz": "Arroz"})
+  prefetcher = ItemPrefetcher(db)
+  prefetcher.schedule(["A"])
+  prefetcher._executor.shutdown(wait=True)
+  prefetcher.invalidate("A")
+  assert prefetcher.take("A") is None
+
+def test_index_written_with_fingerprints_ignores_their_fields():
+  db = FakeFirestore()
+  client = FingerprintClient(db, doc_field=True)
+  keys = ItemKeys.load(client, "X")
+  keys.put("X_arroz", {"descripcion": "Arroz", "estado": "Adjudicado", "precio_adjudicado_total": 4.0})
+  keys.save(client)
+  # Índices escritos antes de excluir item_claves de las huellas
+  db.data[COLLECTION]["X"][f"{FIELD_PREFIX}0a1b2c3d"] = "f" * 32
+
+  keys = ItemKeys.load(db, "X")
+  assert keys.rows() == [("X_arroz", match_key("Arroz"), "Adjudicado")]
+  assert keys.total_adjudicado() == 4.0
@@ -0,0 +1,113 @@
+import contextlib
+import io
+import threading
+import time
+
+import pytest
+
+from bench.fake_db import FakeFirestore
+from bench.synthetic import FORM_TYPES, generate_case
+from processors import get_extractor
+from shared import loader
+from shared.loader import ItemWriteError, _raise_errors, _run_writes, set_item_workers
+
+@pytest.fixture(params=[1, 4], ids=["serie", "paralelo"])
+def workers(request):
+  set_item_workers(request.param)
+  yield request.param
+  set_item_workers(1)
+
+def quiet(fn, *args):
+  with contextlib.redirect_stdout(io.StringIO()):
+    return fn(*args)
+
+def test_writes_to_the_same_doc_keep_their_order(workers):
+  log = {}
+  lock = threading.Lock()
+
+  def write(doc_id, n):
+    def fn():
+      time.sleep(0.001 * (3 - n))
+      with lock:
+        log.setdefault(doc_id, []).append(n)
+      return n
+    return fn
+
+  writes = [(doc_id, write(doc_id, n)) for n in range(3) for doc_id in ("a", "b", "c")]
+  results, errors = _run_writes(writes)
+  assert errors == []
+  assert results == [n for n in range(3) for _ in range(3)]
+  assert log == {"a": [0, 1, 2], "b": [0, 1, 2], "c": [0, 1, 2]}
+
+def fail(message):
+  def fn():
+    raise RuntimeError(message)
+  return fn
+
+def test_failures_are_reported_and_aggregated():
+  set_item_workers(4)
+  try:
+    ran = []
+    writes = [
+      ("a", fail("a")),
+      ("a", lambda: ran.append("a2")),   # mismo documento después de la falla: no se ejecuta
+      ("b", lambda: "b"),
+      ("c", fail("c")),
+    ]
+    results, errors = _run_writes(writes)
+  finally:
+    set_item_workers(1)
+  assert results == [None, None, "b", None]
+  assert ran == []
+  assert sorted(str(e) for e in errors) == ["a", "c"]
+
+  with pytest.raises(ItemWriteError) as info:
+    _raise_errors(errors)
+  assert info.value.errors == errors
+  with pytest.raises(RuntimeError, match="a"):
+    _raise_errors(errors[:1])
+
+def test_serial_stops_at_the_first_failure():
+  ran = []
+  results, errors = _run_writes([("a", lambda: "a"), ("b", fail("b")), ("c", lambda: ran.append("c"))])
+  assert results == ["a", None, None]
+  assert [str(e) for e in errors] == ["b"]
+  assert ran == []
+
+@pytest.mark.parametrize("form", FORM_TYPES)
+def test_parallel_load_matches_serial(form):
+  file_name, html, existing = generate_case(form, 20, seed=5)
+  records = quiet(get_extractor(form), html, file_name)
+  data = {}
+  for n in (1, 4):
+    set_item_workers(n)
+    try:
+      db = FakeFirestore()
+      db.seed("items", existing)
+      assert quiet(loader.load_form, db, records)
+      data[n] = db.data
+    finally:
+      set_item_workers(1)
+  assert data[4] == data[1]
+
+def test_failed_item_write_is_reported_to_error_listeners(workers, monkeypatch):
+  file_name, html, existing = generate_case("FORM170", 6, seed=6)
+  records = quiet(get_extractor("FORM170"), html, file_name)
+  target = f"{records.items[0]['cuce']}_{records.items[0]['id']}"
+  original = loader.insert_item
+
+  def insert_item(db, cuce, item_id, data):
+    if f"{cuce}_{item_id}" == target:
+      raise RuntimeError("sin cuota")
+    return original(db, cuce, item_id, data)
+
+  monkeypatch.setattr(loader, "insert_item", insert_item)
+  received = []
+  monkeypatch.setattr(loader, "_error_listeners", [lambda r, e: received.append((r, e))])
+
+  db = FakeFirestore()
+  assert not quiet(loader.load_form, db, records)
+  assert [(r, str(e)) for r, e in received] == [(records, "sin cuota")]
+  # Lo que sí se escribió queda en el índice
+  indexed = db.data.get("item_claves", {}).get(records.items[0]["cuce"], {})
+  assert records.items[0]["id"] not in indexed
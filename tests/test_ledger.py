@@ -0,0 +1,47 @@
+from shared.ledger import Ledger, ledger_path, merge_report, read_ledger
+
+def test_ledger_path_per_shard():
+  assert ledger_path() == "guias/ledger.jsonl"
+  assert ledger_path(1, 4) == "guias/ledger_1de4.jsonl"
+
+def test_only_ok_results_are_done(tmp_path):
+  path = tmp_path / "ledger.jsonl"
+  ledger = Ledger(path)
+  ledger.record("a.html", "OK")
+  ledger.record("b.html", "ERROR_LOAD")
+  ledger.record("c.html", "SKIP_DEPENDENCIA")
+  ledger.close()
+
+  assert Ledger(path).done == {"a.html"}
+
+def test_last_result_wins(tmp_path):
+  path = tmp_path / "ledger.jsonl"
+  ledger = Ledger(path)
+  ledger.record("a.html", "ERROR_LOAD")
+  ledger.record("a.html", "OK")
+  ledger.record("b.html", "OK")
+  ledger.record("b.html", "ERROR_DOWNLOAD")
+  assert ledger.done == {"a.html"}
+  ledger.close()
+
+  assert Ledger(path).done == {"a.html"}
+
+def test_truncated_line_is_ignored(tmp_path):
+  path = tmp_path / "ledger.jsonl"
+  path.write_text('{"archivo": "a.html", "resultado": "OK"}\n{"archivo": "b.ht', encoding="utf-8")
+  assert read_ledger(path) == {"a.html": "OK"}
+  assert read_ledger(tmp_path / "no_existe.jsonl") == {}
+
+def test_merge_report(tmp_path):
+  one, two = tmp_path / "l0.jsonl", tmp_path / "l1.jsonl"
+  for path, rows in ((one, [("a", "OK"), ("b", "ERROR_LOAD")]), (two, [("b", "OK"), ("c", "ERROR_LOAD")])):
+    ledger = Ledger(path)
+    for name, result in rows:
+      ledger.record(name, result)
+    ledger.close()
+
+  report = merge_report([one, two])
+  assert report["archivos"] == 3
+  assert report["resultados"] == {"OK": 2, "ERROR_LOAD": 1}
+  assert report["duplicados"] == ["b"]
+  assert report["pendientes"] == ["c"]
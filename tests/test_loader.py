@@ -0,0 +1,97 @@
+import contextlib
+import io
+
+import pytest
+
+from bench.fake_db import FakeFirestore
+from bench.synthetic import FORM_TYPES, generate_case
+from processors import get_extractor
+import shared.loader
+from shared.loader import add_error_listener, add_listener, load_form, load_records
+from shared.records import FormRecords
+from shared.versions import PARSER_VERSIONS
+
+def extract(form, html, file_name):
+  with contextlib.redirect_stdout(io.StringIO()):
+    return get_extractor(form)(html, file_name)
+
+def load(db, records):
+  with contextlib.redirect_stdout(io.StringIO()):
+    return load_form(db, records)
+
+def test_every_versioned_form_has_an_extractor():
+  # backfill.py y reprocess.py despachan por PARSER_VERSIONS
+  assert sorted(PARSER_VERSIONS) == sorted(FORM_TYPES)
+  for form in PARSER_VERSIONS:
+    assert callable(get_extractor(form))
+
+@pytest.mark.parametrize("form", FORM_TYPES)
+def test_every_form_extracts_and_loads(form):
+  file_name, html, existing = generate_case(form, 12, seed=1)
+  db = FakeFirestore()
+  db.seed("items", existing)
+
+  records = extract(form, html, file_name)
+
+  assert isinstance(records, FormRecords)
+  assert records.form == form
+  assert records.errores == []
+  assert load(db, records)
+
+@pytest.mark.parametrize("form", ["FORM150", "FORM190", "FORM300"])
+def test_convocatoria_uses_loader_field_names(form):
+  file_name, html, _ = generate_case(form, 200, seed=2)
+  db = FakeFirestore()
+
+  assert load(db, extract(form, html, file_name))
+
+  cuce = file_name.split("_")[0]
+  convocatoria = db.data["convocatorias"][cuce]
+  assert form in convocatoria["forms"]
+  assert "cod_entidad" not in convocatoria and "total" not in convocatoria
+  assert sum(1 for doc in db.data["items"].values() if doc["cuce"] == cuce) > 100
+
+def test_recepcion_matches_existing_items_and_marks_rest_desierto():
+  db = FakeFirestore()
+  records = FormRecords("FORM100", "X_FORM100_1.html")
+  records.add_item("X", "arroz", descripcion="Arroz", estado="Publicado")
+  records.add_item("X", "azucar", descripcion="Azúcar", estado="Publicado")
+  load_records(db, records)
+
+  recepcion = FormRecords("FORM500", "X_FORM500_1.html")
+  recepcion.add_recepcion("X", "FORM500", [
+    {"key": "arroz", "identity": {"descripcion": "Arroz"}, "update": {"estado": "Recibido"}, "create": {"descripcion": "Arroz"}},
+  ], observacion="sin recepción")
+  with contextlib.redirect_stdout(io.StringIO()):
+    load_records(db, recepcion)
+
+  assert db.data["items"]["X_arroz"]["estado"] == "Recibido"
+  assert db.data["items"]["X_azucar"]["estado"] == "Desierto"
+
+def test_load_error_returns_false_and_notifies(monkeypatch):
+  class Broken(FakeFirestore):
+    def collection(self, name):
+      if name == "items":
+        raise RuntimeError("sin conexión")
+      return super().collection(name)
+
+  monkeypatch.setattr(shared.loader, "_listeners", [])
+  monkeypatch.setattr(shared.loader, "_error_listeners", [])
+  loaded, failed = [], []
+  add_listener(loaded.append)
+  add_error_listener(lambda records, error: failed.append((records, error)))
+  # Un listener que falla no tapa a los demás
+  add_error_listener(lambda records, error: 1 / 0)
+
+  records = FormRecords("FORM100", "X_FORM100_1.html")
+  records.add_item("X", "arroz", descripcion="Arroz")
+  assert load(Broken(), records) is False
+  assert load(FakeFirestore(), None) is False
+
+  assert loaded == []
+  assert len(failed) == 1
+  assert failed[0][0] is records
+  assert isinstance(failed[0][1], RuntimeError) and str(failed[0][1]) == "sin conexión"
+
+  assert load(FakeFirestore(), records) is True
+  assert loaded == [records] and len(failed) == 1
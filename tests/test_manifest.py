@@ -0,0 +1,120 @@
+import pytest
+
+from shared.manifest import (
+  cuce_year,
+  filter_entries,
+  iter_cuce_groups,
+  iter_dir_names,
+  iter_entries,
+  iter_gcs_names,
+  latest_revisions,
+  newer_revision_exists,
+  parse_file_name,
+  parse_source
+)
+
+CUCE = "20-0006-00-1064736-1-1"
+
+@pytest.mark.parametrize("name, expected", [
+  (f"{CUCE}_FORM100_1.html", (CUCE, "FORM100", 1)),
+  (f"forms/{CUCE}_form500_12.HTML", (CUCE, "FORM500", 12)),
+  (f" {CUCE}_FORM170_3.htm\n", (CUCE, "FORM170", 3)),
+])
+def test_parse_file_name(name, expected):
+  entry = parse_file_name(name)
+  assert (entry.cuce, entry.form, entry.revision) == expected
+  assert entry.name == name.strip()
+
+@pytest.mark.parametrize("name", [
+  f"{CUCE}_FORM100.html",
+  f"{CUCE}_FORM100_1.pdf",
+  f"{CUCE}_FORMX_1.html",
+  f"{CUCE}_FORM100_a.html",
+  f"prefijo_{CUCE}_FORM100_1.html",
+  "forms/",
+  "",
+])
+def test_odd_names_are_not_entries(name):
+  assert parse_file_name(name) is None
+
+def test_iter_entries_reports_skipped():
+  skipped = []
+  names = [f"{CUCE}_FORM100_1.html", "notas.txt"]
+  assert [e.form for e in iter_entries(names, skipped=skipped)] == ["FORM100"]
+  assert skipped == ["notas.txt"]
+
+def test_latest_revision_per_cuce_and_form():
+  names = [
+    f"{CUCE}_FORM100_2.html",
+    f"{CUCE}_FORM170_1.html",
+    f"{CUCE}_FORM100_10.html",
+    f"{CUCE}_FORM100_9.html",
+    f"21-0001-00-1-1-1_FORM100_1.html",
+  ]
+  latest = latest_revisions(iter_entries(names))
+  assert [(e.cuce, e.form, e.revision) for e in latest] == [
+    (CUCE, "FORM100", 10), (CUCE, "FORM170", 1), ("21-0001-00-1-1-1", "FORM100", 1),
+  ]
+
+class Blob:
+  def __init__(self, bucket, name):
+    self.bucket, self.name = bucket, name
+
+  def exists(self):
+    return self.name in self.bucket.names
+
+class Bucket:
+  def __init__(self, names):
+    self.names = set(names)
+
+  def blob(self, name):
+    return Blob(self, name)
+
+def test_newer_revision_exists():
+  bucket = Bucket([f"forms/{CUCE}_FORM100_1.html", f"forms/{CUCE}_FORM100_2.html"])
+  assert newer_revision_exists(bucket, parse_file_name(f"forms/{CUCE}_FORM100_1.html"))
+  assert not newer_revision_exists(bucket, parse_file_name(f"forms/{CUCE}_FORM100_2.html"))
+
+def entries(*names):
+  return list(iter_entries(names))
+
+def test_filter_entries_by_form_year_and_revision():
+  items = entries(
+    "20-0001-00-1-1-1_FORM100_1.html",
+    "21-0001-00-1-1-1_FORM500_2.html",
+    "22-0001-00-1-1-1_FORM100_3.html",
+    "xx-0001-00-1-1-1_FORM100_1.html",
+  )
+  assert [e.cuce[:2] for e in filter_entries(items, forms=["form100"])] == ["20", "22", "xx"]
+  assert [e.cuce[:2] for e in filter_entries(items, desde=2021)] == ["21", "22"]
+  assert [e.cuce[:2] for e in filter_entries(items, desde=2020, hasta=2021)] == ["20", "21"]
+  assert [e.revision for e in filter_entries(items, revisions={1})] == [1, 1]
+  assert cuce_year("xx-0001") is None
+
+def test_iter_cuce_groups_from_a_sorted_listing():
+  items = entries(
+    "20-0001-00-1-1-1_FORM100_1.html",
+    "20-0001-00-1-1-1_FORM100_2.html",
+    "20-0001-00-1-1-1_FORM500_1.html",
+    "20-0002-00-1-1-1_FORM100_1.html",
+  )
+  groups = list(iter_cuce_groups(iter(items)))
+  assert [[(e.form, e.revision) for e in g] for g in groups] == [
+    [("FORM100", 2), ("FORM500", 1)], [("FORM100", 1)],
+  ]
+
+def test_parse_source(tmp_path):
+  assert parse_source("gs://sicoescan/forms/") == ("gcs", "sicoescan", "forms/")
+  assert parse_source("gs://sicoescan") == ("gcs", "sicoescan", "")
+  assert parse_source(str(tmp_path)) == ("dir", str(tmp_path), None)
+  assert parse_source("guias/400_1.txt") == ("lista", "guias/400_1.txt", None)
+
+def test_dir_and_gcs_names(tmp_path):
+  for name in ("b_FORM100_1.html", "a_FORM100_1.HTM", "notas.txt"):
+    (tmp_path / name).write_text("")
+  assert list(iter_dir_names(str(tmp_path))) == ["a_FORM100_1.HTM", "b_FORM100_1.html"]
+
+  class Client:
+    def list_blobs(self, bucket, prefix, page_size):
+      return [type("Blob", (), {"name": n}) for n in (prefix, f"{prefix}a_FORM100_1.html", f"{prefix}sub/")]
+  assert list(iter_gcs_names("b", "forms/", client=Client())) == ["a_FORM100_1.html"]
@@ -0,0 +1,31 @@
+from bs4 import BeautifulSoup
+
+from shared.normalize import generate_slug, normalize_for_match, slugify, strip_tags, to_ascii
+
+def test_strip_tags_matches_get_text():
+  html = 'Tubo <b>PVC</b><!-- nota --> de 2&quot; <br/>x'
+  expected = BeautifulSoup(html, "html.parser").get_text(separator=" ")
+  assert strip_tags(html).split() == expected.split()
+  assert strip_tags("a<br/>b &lt;c&gt;") == "a b <c>"
+  assert strip_tags(None) == ""
+
+def test_to_ascii():
+  assert to_ascii("Canción Ñandú") == "Cancion Nandu"
+  assert to_ascii("ascii") == "ascii"
+
+def test_generate_slug():
+  assert generate_slug('<b>Canción</b> de  PVC-2"') == "cancion_de_pvc_2"
+  assert generate_slug("") == "item"
+  assert generate_slug("x" * 100) == "x" * 60
+  # Sin caracteres válidos queda vacío (ids.item_base_id usa el nombre por defecto)
+  assert generate_slug("***") == ""
+
+def test_normalize_for_match():
+  assert normalize_for_match("  <td>Tubería <!-- x --> PVC</td>&amp; Co ") == "tuberia pvc & co"
+  assert normalize_for_match("TUBERIA  PVC") == normalize_for_match("tubería pvc")
+  assert normalize_for_match(None) == ""
+
+def test_slugify():
+  assert slugify(" La Paz ") == "la_paz"
+  assert slugify("Ñandú Azul") == "nandu_azul"
+  assert slugify("") is None
@@ -0,0 +1,83 @@
+import threading
+
+from bench.fake_db import FakeFirestore
+from shared.item_keys import ItemKeys
+from shared.manifest import parse_file_name
+from shared.prefetch import ItemPrefetcher, prefetch_cuces
+
+def seed_items(db, *cuces):
+  db.seed("items", {f"{cuce}_a": {"cuce": cuce, "descripcion": "Arroz", "estado": "Publicado"} for cuce in cuces})
+
+def test_take_returns_each_prefetch_once():
+  db = FakeFirestore()
+  seed_items(db, "A", "B")
+  prefetcher = ItemPrefetcher(db, chunk_size=1)
+  prefetcher.schedule(["A", "B", "A", None])
+  assert isinstance(prefetcher.take("A"), ItemKeys)
+  assert prefetcher.take("A") is None
+  assert prefetcher.take("C") is None
+  assert prefetcher.take("B").rows()[0][0] == "B_a"
+  prefetcher.close()
+  assert (prefetcher.hits, prefetcher.misses, prefetcher.queries) == (2, 2, 2)
+
+def test_cached_cuces_are_not_fetched_again():
+  db = FakeFirestore()
+  seed_items(db, "A")
+  prefetcher = ItemPrefetcher(db)
+  prefetcher.schedule(["A"])
+  prefetcher._executor.shutdown(wait=True)
+  prefetcher._executor = None   # otro schedule de "A" fallaría
+  prefetcher.schedule(["A"])
+  assert prefetcher.take("A") is not None
+
+def test_lru_keeps_the_newest():
+  db = FakeFirestore()
+  seed_items(db, "A", "B", "C")
+  prefetcher = ItemPrefetcher(db, maxsize=2, chunk_size=1, workers=1)
+  prefetcher.schedule(["A", "B", "C"])
+  prefetcher.close()
+  assert prefetcher.take("A") is None
+  assert prefetcher.take("B") is not None
+  assert prefetcher.take("C") is not None
+
+def test_invalidate_while_pending_drops_the_result():
+  db = FakeFirestore()
+  seed_items(db, "A")
+  gate = threading.Event()
+  original = db.collection
+
+  def collection(name):
+    gate.wait(5)
+    return original(name)
+
+  db.collection = collection
+  prefetcher = ItemPrefetcher(db)
+  prefetcher.schedule(["A"])
+  prefetcher.invalidate("A")
+  gate.set()
+  assert prefetcher.take("A") is None
+  prefetcher.close()
+
+class BrokenDb(FakeFirestore):
+  def collection(self, name):
+    raise RuntimeError("sin conexión")
+
+def test_failed_fetch_falls_back_to_a_normal_read(capsys):
+  prefetcher = ItemPrefetcher(BrokenDb())
+  prefetcher.schedule(["A"])
+  # Sin prefetch el loader lee el índice por su cuenta
+  assert prefetcher.take("A") is None
+  prefetcher.close()
+  assert "Prefetch de items falló" in capsys.readouterr().out
+
+def group(cuce, *forms):
+  return [parse_file_name(f"{cuce}_{form}_1.html") for form in forms]
+
+def test_only_groups_without_item_writing_stages_are_prefetched():
+  groups = [
+    group("24-0001-00-1-1-1", "FORM500"),
+    group("24-0002-00-1-1-1", "FORM120", "FORM600"),
+    group("24-0003-00-1-1-1", "FORM100", "FORM500"),
+    group("24-0004-00-1-1-1", "FORM170"),
+  ]
+  assert prefetch_cuces(groups) == ["24-0001-00-1-1-1", "24-0002-00-1-1-1"]
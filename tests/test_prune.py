@@ -0,0 +1,37 @@
+import pytest
+
+import shared.prune as prune
+from bench.synthetic import FORM_TYPES, generate_case
+from shared.prune import parse_form, prune_html
+
+@pytest.fixture
+def parses(monkeypatch):
+  calls = []
+  original = prune.BeautifulSoup
+
+  def counting(*args, **kwargs):
+    calls.append(kwargs.get("parse_only"))
+    return original(*args, **kwargs)
+
+  monkeypatch.setattr(prune, "BeautifulSoup", counting)
+  return calls
+
+@pytest.mark.parametrize("form", FORM_TYPES)
+def test_expected_shape_is_parsed_once(form, parses):
+  _, html, _ = generate_case(form, 5, seed=1)
+  parse_form(html, form)
+  assert len(parses) == 1
+
+def test_unexpected_shape_falls_back_to_full_tree(parses):
+  html = "<div><td class='FormularioCUCE'>21-0001</td></div><table><tr><td>x</td></tr></table>"
+  soup = parse_form(html, "FORM100")
+  assert len(parses) == 2
+  assert soup.find("td", class_="FormularioCUCE").get_text() == "21-0001"
+
+def test_unknown_form_has_no_fallback(parses):
+  parse_form("<table><tr><td>x</td></tr></table>", "FORM900")
+  assert len(parses) == 1
+
+def test_prune_html_drops_noise():
+  html = "<script>x</script><!-- c --><input type='hidden' name='v' value='1'><style>a{}</style><td>ok</td>"
+  assert prune_html(html) == "<td>ok</td>"
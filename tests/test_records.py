@@ -0,0 +1,41 @@
+import contextlib
+import io
+from datetime import date, datetime
+
+import pytest
+
+from bench.fake_db import FakeFirestore
+from bench.synthetic import FORM_TYPES, generate_case
+from processors import get_extractor
+from shared.loader import load_form
+from shared.records import FormRecords, dumps, loads, read_jsonl, write_jsonl
+
+def quiet(fn, *args):
+  with contextlib.redirect_stdout(io.StringIO()):
+    return fn(*args)
+
+def test_dates_round_trip():
+  records = FormRecords("FORM100", "a.html")
+  records.add_convocatoria("X", fecha_publicacion=date(2024, 1, 2), fecha_presentacion=datetime(2024, 1, 3, 10, 30))
+  records.add_error(ValueError("boom"))
+  again = loads(dumps(records))
+  assert again == records
+  assert again.cuce == "X"
+  assert isinstance(again.convocatorias[0]["fecha_publicacion"], date)
+
+@pytest.mark.parametrize("form", FORM_TYPES)
+def test_replayed_records_load_the_same(form):
+  file_name, html, existing = generate_case(form, 8, seed=3)
+  records = quiet(get_extractor(form), html, file_name)
+
+  fp = io.StringIO()
+  assert write_jsonl(fp, [records, records]) == 2
+  fp.seek(0)
+  replayed = list(read_jsonl(fp))
+  assert replayed == [records, records]
+
+  direct, replay = FakeFirestore(), FakeFirestore()
+  for db, r in ((direct, records), (replay, replayed[0])):
+    db.seed("items", existing)
+    assert quiet(load_form, db, r)
+  assert replay.data == direct.data
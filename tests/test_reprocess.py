@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+
+import pytest
+from google.api_core.exceptions import NotFound
+from google.cloud import firestore
+
+import shared.reprocess
+from bench.fake_db import FakeFirestore
+from reprocess import parse_versions
+from shared.reprocess import ChangedFieldsClient, changed_fields, plan_reprocess
+from shared.versions import PARSER_VERSIONS, make_stamp
+
+def seed_stamped(db):
+  db.seed("convocatorias", {
+    "A": {"estado": "Publicado", **make_stamp("FORM100", 0, "a_FORM100_1.html")},
+    "B": {"estado": "Publicado", **make_stamp("FORM100", 1, "b_FORM100_1.html")},
+    "C": {"estado": "Publicado"},
+  })
+  db.seed("items", {
+    "A_arroz": {"cuce": "A", **make_stamp("FORM100", 0, "a_FORM100_1.html"), **make_stamp("FORM500", 0, "a_FORM500_1.html")},
+    "D_sal": {"cuce": "D", **make_stamp("FORM100", 2, "d_FORM100_1.html")},
+    "E_fideo": {"cuce": "E", **make_stamp("FORM100", 0, None)},
+  })
+
+def test_plan_selects_files_from_outdated_versions(monkeypatch):
+  db = FakeFirestore()
+  seed_stamped(db)
+  monkeypatch.setitem(PARSER_VERSIONS, "FORM100", 2)
+
+  # Por defecto: todas las versiones anteriores a la actual, sin repetir archivos
+  assert plan_reprocess(db, forms=["FORM100"]) == {"FORM100": ["a_FORM100_1.html", "b_FORM100_1.html"]}
+  # El origen es por formulario: un item escrito por 100 y 500 aporta un archivo a cada uno
+  assert plan_reprocess(db, forms=["FORM500"]) == {"FORM500": ["a_FORM500_1.html"]}
+  assert plan_reprocess(db, forms=["FORM190"]) == {}
+
+def test_plan_with_explicit_versions_and_chunks(monkeypatch):
+  db = FakeFirestore()
+  seed_stamped(db)
+  monkeypatch.setattr(shared.reprocess, "IN_LIMIT", 1)
+
+  assert plan_reprocess(db, forms=["FORM100"], versions={"FORM100": [2]}) == {"FORM100": ["d_FORM100_1.html"]}
+  assert plan_reprocess(db, forms=["FORM100"], versions={"FORM100": [1, 2]}) == {
+    "FORM100": ["b_FORM100_1.html", "d_FORM100_1.html"]
+  }
+  assert plan_reprocess(db, forms=["FORM100"], versions={"FORM100": [1]}, collections=("items",)) == {}
+
+def test_parse_versions():
+  assert parse_versions(None, ["FORM100"]) is None
+  assert parse_versions("0,2", ["FORM100", "FORM190"]) == {"FORM100": [0, 2], "FORM190": [0, 2]}
+
+def test_changed_fields():
+  current = {"a": 1, "n": 5, "forms": ["FORM100"], "fecha": datetime(2024, 1, 2, tzinfo=timezone.utc)}
+  assert changed_fields(current, {
+    "a": 1,
+    "forms": firestore.ArrayUnion(["FORM100"]),
+    "fecha": datetime(2024, 1, 2),
+    "n": firestore.Increment(0),
+  }) == {}
+
+  union = firestore.ArrayUnion(["FORM500"])
+  increment = firestore.Increment(1)
+  assert changed_fields(current, {"a": 2, "b": None, "forms": union, "n": increment}) == {
+    "a": 2, "b": None, "forms": union, "n": increment
+  }
+  assert changed_fields(None, {"a": 1}) == {"a": 1}
+
+def test_client_writes_only_changed_fields():
+  db = FakeFirestore()
+  db.seed("items", {"X_a": {"cuce": "X", "estado": "Publicado", "cantidad": 2.0}})
+  client = ChangedFieldsClient(db)
+  ref = client.collection("items").document("X_a")
+
+  ref.set({"cuce": "X", "estado": "Publicado"}, merge=True)
+  ref.update({"cantidad": 2.0})
+  assert (client.written, client.skipped, db.writes) == (0, 2, 0)
+
+  ref.set({"cuce": "X", "estado": "Adjudicado"}, merge=True)
+  ref.update({"cantidad": 3.0, "estado": "Adjudicado"})
+  assert (client.written, client.skipped) == (2, 2)
+  assert db.data["items"]["X_a"] == {"cuce": "X", "estado": "Adjudicado", "cantidad": 3.0}
+
+def test_client_set_without_merge_replaces_unless_identical():
+  db = FakeFirestore()
+  db.seed("proponentes", {"p": {"nombre": "P", "extra": 1}})
+  client = ChangedFieldsClient(db)
+  ref = client.collection("proponentes").document("p")
+
+  ref.set({"nombre": "P", "extra": 1})
+  assert client.skipped == 1
+  # Mismos valores pero sin "extra": el reemplazo cambia el documento
+  ref.set({"nombre": "P"})
+  assert db.data["proponentes"]["p"] == {"nombre": "P"}
+
+  client.collection("proponentes").document("nuevo").set({"nombre": "N"}, merge=True)
+  assert db.data["proponentes"]["nuevo"] == {"nombre": "N"}
+  assert client.written == 2
+
+def test_client_update_of_missing_doc_fails_like_firestore():
+  client = ChangedFieldsClient(FakeFirestore())
+  with pytest.raises(NotFound):
+    client.collection("items").document("nada").update({"estado": "Desierto"})
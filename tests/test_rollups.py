@@ -0,0 +1,136 @@
+import contextlib
+import io
+from datetime import date
+
+import shared.rollups
+from bench.fake_db import FakeFirestore
+from shared.loader import load_form
+from shared.records import FormRecords
+from shared.rollups import COLLECTION, RollupUpdater, contribution, deltas, update_rollup
+
+def load(db, records):
+  with contextlib.redirect_stdout(io.StringIO()):
+    assert load_form(db, records)
+
+def convocatoria(cuce="X"):
+  records = FormRecords("FORM100", "X_FORM100_1.html")
+  records.add_convocatoria(
+    cuce, entidad_cod="E1", entidad_departamento="La Paz", modalidad="ANPE",
+    fecha_publicacion=date(2024, 3, 5), total_referencial=100.0, estado="Publicado"
+  )
+  records.add_item(cuce, "arroz", {"descripcion": "Arroz", "estado": "Publicado"})
+  records.add_item(cuce, "fideo", {"descripcion": "Fideo", "estado": "Publicado"})
+  return records
+
+def adjudicacion(montos, cuce="X"):
+  records = FormRecords("FORM170", "X_FORM170_1.html")
+  for ident, monto in montos.items():
+    records.add_item(cuce, ident, {"descripcion": ident.title(), "estado": "Adjudicado", "precio_adjudicado_total": monto})
+  return records
+
+class FakeTransaction:
+  """Junta las escrituras y las aplica recién en commit(), como una transacción."""
+  def __init__(self):
+    self.ops = []
+
+  def set(self, ref, data, merge=False):
+    self.ops.append(lambda: ref.set(data, merge=merge))
+
+  def update(self, ref, data):
+    self.ops.append(lambda: ref.update(data))
+
+  def commit(self):
+    for op in self.ops:
+      op()
+
+class TransactionalDb(FakeFirestore):
+  def transaction(self):
+    return FakeTransaction()
+
+def run_with_retry(db, body):
+  # Primer intento descartado (conflicto), el segundo se confirma: como los reintentos de firestore.transactional
+  writes = db.writes
+  body(db.transaction())
+  assert db.writes == writes
+  transaction = db.transaction()
+  result = body(transaction)
+  transaction.commit()
+  return result
+
+def test_deltas_skip_zero_changes():
+  old = {"a": {"convocatorias": 1, "total_adjudicado": 5.0}}
+  new = {"a": {"convocatorias": 1, "total_adjudicado": 8.0}, "b": {"convocatorias": 1}}
+  assert deltas(old, new) == {"a": {"total_adjudicado": 3.0}, "b": {"convocatorias": 1}}
+  assert deltas(new, new) == {}
+
+def test_contribution_per_dimension():
+  docs = contribution({"entidad_cod": "E1", "modalidad": "ANPE", "estado": "Publicado"}, 4.0)
+  assert sorted(docs) == ["entidad__e1__sin_fecha", "mes__sin_fecha", "modalidad__anpe__sin_fecha"]
+  assert docs["mes__sin_fecha"] == {"convocatorias": 1, "total_referencial": 0.0, "total_adjudicado": 4.0, "estado_publicado": 1}
+
+def test_adjudicado_follows_item_amounts_without_scanning_items():
+  db = FakeFirestore()
+  load(db, convocatoria())
+  load(db, adjudicacion({"arroz": 30.0}))
+  update_rollup(db, "X")
+  assert db.data[COLLECTION]["mes__2024-03"]["total_adjudicado"] == 30.0
+
+  # Reprocesar con otro monto aplica solo la diferencia
+  load(db, adjudicacion({"arroz": 20.0, "fideo": 5.0}))
+  reads = db.reads
+  update_rollup(db, "X")
+  assert db.reads - reads == 2   # convocatoria + item_claves
+  assert db.data[COLLECTION]["mes__2024-03"]["total_adjudicado"] == 25.0
+  assert db.data[COLLECTION]["entidad__e1__2024-03"]["total_adjudicado"] == 25.0
+
+  # Misma carga otra vez: sin cambios
+  assert update_rollup(db, "X") == []
+  assert db.data[COLLECTION]["mes__2024-03"]["convocatorias"] == 1
+
+def test_adjudicado_without_index_falls_back_to_items():
+  db = FakeFirestore()
+  load(db, convocatoria())
+  db.data["item_claves"].clear()
+  db.data["items"]["X_arroz"]["precio_adjudicado_total"] = 12.0
+  update_rollup(db, "X")
+  assert db.data[COLLECTION]["mes__2024-03"]["total_adjudicado"] == 12.0
+
+def test_transactional_path_applies_the_delta_once(monkeypatch):
+  monkeypatch.setattr(shared.rollups, "_in_transaction", run_with_retry)
+  db = TransactionalDb()
+  load(db, convocatoria())
+  load(db, adjudicacion({"arroz": 30.0}))
+
+  assert sorted(update_rollup(db, "X")) == [
+    "departamento__la_paz__2024-03", "entidad__e1__2024-03", "mes__2024-03", "modalidad__anpe__2024-03"
+  ]
+  resumen = db.data[COLLECTION]["mes__2024-03"]
+  assert (resumen["convocatorias"], resumen["total_referencial"], resumen["total_adjudicado"]) == (1, 100.0, 30.0)
+  assert db.data["convocatorias"]["X"]["_rollup"]["total_adjudicado"] == 30.0
+
+  # Reaplicar el mismo aporte (mismo `_rollup`) no escribe nada
+  writes = db.writes
+  assert update_rollup(db, "X") == []
+  assert db.writes == writes
+
+def test_reloading_the_same_forms_keeps_totals():
+  db = FakeFirestore()
+  updater = RollupUpdater(db)
+  for _ in range(2):
+    for records in (convocatoria(), adjudicacion({"arroz": 30.0, "fideo": 2.5})):
+      load(db, records)
+      with contextlib.redirect_stdout(io.StringIO()):
+        updater(records)
+
+  resumen = db.data[COLLECTION]["entidad__e1__2024-03"]
+  assert (resumen["convocatorias"], resumen["estado_publicado"], resumen["total_adjudicado"]) == (1, 1, 32.5)
+
+def test_updater_logs_failures_with_the_cuce(monkeypatch):
+  def broken(db, cuce, recompute_adjudicado=True):
+    raise RuntimeError("sin conexión")
+  monkeypatch.setattr(shared.rollups, "update_rollup", broken)
+
+  out = io.StringIO()
+  with contextlib.redirect_stdout(out):
+    RollupUpdater(FakeFirestore())(convocatoria("2024-0001-01-1"))
+  assert "2024-0001-01-1" in out.getvalue() and "sin conexión" in out.getvalue()
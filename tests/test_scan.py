@@ -0,0 +1,43 @@
+import contextlib
+import io
+
+from processors.form_120 import find_cuce
+from shared.scan import ScanField, scan_fields
+
+FIELDS = {"cuce": ScanField("td", "FormularioCUCE")}
+
+def chunks(text, size):
+  for i in range(0, len(text), size):
+    yield text[i:i + size]
+
+def test_scan_finds_field_split_across_chunks():
+  html = '<table><tr><td class="x FormularioCUCE"> 24-0001-<b>00</b>-1 </td></tr></table>'
+  result = scan_fields(chunks(html, 7), FIELDS)
+  assert result.complete
+  assert result.fields == {"cuce": "24-0001-00-1"}
+  assert result.text is None
+
+def test_scan_stops_reading_when_done():
+  read = []
+  def source():
+    for chunk in ('<td class="FormularioCUCE">24-1</td>', "<p>resto</p>", "<p>más</p>"):
+      read.append(chunk)
+      yield chunk
+  assert scan_fields(source(), FIELDS).complete
+  assert len(read) == 1
+
+def test_nested_tags_of_the_same_kind():
+  html = '<td class="FormularioCUCE">24-<table><tr><td>x</td></tr></table>1</td><td>y</td>'
+  assert scan_fields(html, FIELDS).fields["cuce"] == "24-x1"
+
+def test_missing_or_empty_field_returns_full_text():
+  html = '<td class="FormularioCUCE">  </td><td>otro</td>'
+  result = scan_fields(chunks(html, 5), FIELDS)
+  assert not result.complete
+  assert result.text == html
+  assert not scan_fields("<p>sin cuce</p>", FIELDS).complete
+
+def test_form_120_find_cuce():
+  with contextlib.redirect_stdout(io.StringIO()):
+    assert find_cuce('<table><tr><td class="FormularioCUCE">24-9</td></tr></table>') == "24-9"
+    assert find_cuce("<p>nada</p>") is None
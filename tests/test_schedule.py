@@ -0,0 +1,57 @@
+import contextlib
+import io
+
+from bench.fake_db import FakeFirestore
+from bench.synthetic import generate_case
+from processors.form_100 import process_100
+from shared.manifest import parse_file_name
+from shared.schedule import group_by_cuce, lifecycle_stage, run_by_lifecycle, run_groups
+
+def entries(*names):
+  return [parse_file_name(name) for name in names]
+
+def test_group_by_cuce_orders_by_lifecycle_then_revision():
+  groups = group_by_cuce(entries("A_FORM500_1.html", "A_FORM100_2.html", "B_FORM170_1.html", "A_FORM100_1.html"))
+  assert list(groups) == ["A", "B"]
+  assert [e.name for e in groups["A"]] == ["A_FORM100_1.html", "A_FORM100_2.html", "A_FORM500_1.html"]
+
+def test_unknown_forms_go_last():
+  assert lifecycle_stage("FORM900") > lifecycle_stage("FORM600")
+
+def test_failed_stage_skips_later_stages_of_same_cuce_only():
+  def fn(name):
+    return "ERROR_LOAD" if name == "A_FORM100_1.html" else "OK"
+
+  results = dict((e.name, r) for e, r in run_by_lifecycle(
+    entries("A_FORM100_1.html", "A_FORM110_1.html", "A_FORM500_1.html", "B_FORM500_1.html"), fn, max_workers=2))
+
+  assert results == {
+    "A_FORM100_1.html": "ERROR_LOAD",
+    # misma etapa que la que falló: se ejecuta
+    "A_FORM110_1.html": "OK",
+    "A_FORM500_1.html": "SKIP_DEPENDENCIA",
+    "B_FORM500_1.html": "OK",
+  }
+
+def test_run_groups_consumes_a_generator_lazily():
+  pulled = []
+
+  def groups():
+    for i in range(50):
+      pulled.append(i)
+      yield entries(f"C{i}_FORM100_1.html")
+
+  results = run_groups(groups(), lambda name: "OK", max_workers=2)
+  next(results)
+  assert len(pulled) < 50
+  assert sum(1 for _ in results) == 49
+
+def test_process_wrapper_returns_load_result():
+  class Broken(FakeFirestore):
+    def collection(self, name):
+      raise RuntimeError("sin conexión")
+
+  file_name, html, _ = generate_case("FORM100", 3, seed=1)
+  with contextlib.redirect_stdout(io.StringIO()):
+    assert process_100(html, file_name, FakeFirestore()) is True
+    assert process_100(html, file_name, Broken()) is False
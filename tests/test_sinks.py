@@ -0,0 +1,86 @@
+import pytest
+from google.cloud import firestore
+
+from bench.fake_db import FakeFirestore
+from shared.search import search_items, tokenize
+from shared.sinks import SqliteSink
+
+def ids(snapshots):
+  return sorted(doc.id for doc in snapshots)
+
+def test_document_api_round_trip():
+  sink = SqliteSink()
+  ref = sink.collection("items").document("a")
+  ref.set({"cuce": "X", "forms": firestore.ArrayUnion(["FORM100"]), "n": 1})
+  ref.set({"forms": firestore.ArrayUnion(["FORM100", "FORM500"]), "n": firestore.Increment(2)}, merge=True)
+
+  assert ref.get().to_dict() == {"cuce": "X", "forms": ["FORM100", "FORM500"], "n": 3}
+  assert not sink.collection("items").document("b").get().exists
+  with pytest.raises(Exception):
+    sink.collection("items").document("b").update({"n": 1})
+
+def test_queries():
+  sink = SqliteSink()
+  for doc_id, cuce in (("a", "X"), ("b", "Y"), ("c", "Z")):
+    sink.collection("items").document(doc_id).set({"cuce": cuce, "tokens": ["arroz", cuce.lower()]})
+
+  items = sink.collection("items")
+  assert ids(items.where(filter=firestore.FieldFilter("cuce", "==", "X")).stream()) == ["a"]
+  assert ids(items.where(filter=firestore.FieldFilter("cuce", "in", ["X", "Z"])).stream()) == ["a", "c"]
+  assert ids(items.where(filter=firestore.FieldFilter("tokens", "array_contains", "y")).stream()) == ["b"]
+
+def test_fts_rewrite_replaces_the_entry():
+  sink = SqliteSink()
+  ref = sink.collection("items").document("a")
+  ref.set({"tokens": tokenize("Arroz grano largo")})
+  ref.set({"tokens": tokenize("Azúcar morena")})
+
+  assert ids(sink.search("items", "arroz")) == []
+  assert ids(sink.search("items", "azucar morena")) == ["a"]
+  ref.set({"cuce": "X"})
+  assert ids(sink.search("items", "azucar")) == []
+  assert sink._conn.execute("SELECT COUNT(*) FROM busqueda").fetchone()[0] == 0
+
+def test_delete_removes_the_document_and_its_search_entry():
+  sink = SqliteSink()
+  sink.collection("items").document("a").set({"cuce": "X", "tokens": tokenize("Arroz")})
+  sink.collection("items").document("a").delete()
+  sink.collection("items").document("nada").delete()
+
+  assert not sink.collection("items").document("a").get().exists
+  assert ids(sink.search("items", "arroz")) == []
+  assert ids(sink.collection("items").where(filter=firestore.FieldFilter("cuce", "==", "X")).stream()) == []
+
+def test_fts_delete_uses_rowid_not_a_scan():
+  sink = SqliteSink()
+  sink.collection("items").document("a").set({"tokens": ["arroz"]})
+  plan = " ".join(str(row) for row in sink._conn.execute(
+    "EXPLAIN QUERY PLAN SELECT fts_rowid FROM busqueda_docs WHERE collection = ? AND doc_id = ?", ("items", "a")))
+  assert "USING PRIMARY KEY" in plan or "USING INDEX" in plan
+
+def test_fts_map_is_rebuilt_for_older_files(tmp_path):
+  path = str(tmp_path / "viejo.sqlite")
+  sink = SqliteSink(path)
+  sink.collection("items").document("a").set({"tokens": ["arroz"]})
+  sink._conn.execute("DROP TABLE busqueda_docs")
+  sink.close()
+
+  sink = SqliteSink(path)
+  sink.collection("items").document("a").set({"tokens": ["azucar"]})
+  assert ids(sink.search("items", "arroz")) == []
+  assert ids(sink.search("items", "azucar")) == ["a"]
+  sink.close()
+
+@pytest.mark.parametrize("make_db", [FakeFirestore, SqliteSink])
+def test_search_items_requires_every_word(make_db):
+  db = make_db()
+  db.collection("items").document("a").set({"tokens": tokenize("Papel bond tamaño carta")})
+  db.collection("items").document("b").set({"tokens": tokenize("Papel higiénico")})
+
+  assert ids(search_items(db, "papel")) == ["a", "b"]
+  assert ids(search_items(db, "papel carta")) == ["a"]
+  assert search_items(db, "de la") == []
+
+def test_tokenize_normalizes_and_drops_stop_words():
+  assert tokenize("Tóner para impresora <b>láser</b> de la oficina") == ["toner", "impresora", "laser", "oficina"]
+  assert tokenize(None) == []
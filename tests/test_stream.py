@@ -0,0 +1,85 @@
+import contextlib
+import io
+
+import pytest
+
+from bench.synthetic import generate_case
+from processors.form_120 import extract_120
+from shared.records import FormRecords
+from shared.stream import DownloadError, drop_sections, iter_blob_chunks
+
+class FakeBlob:
+  """blob.open("rb") de GCS; `fail_after` bytes leídos simula un corte de red."""
+  name = "forms/X_FORM120_1.html"
+
+  def __init__(self, data, fail_after=None):
+    self._data = data
+    self._fail_after = fail_after
+
+  def open(self, mode, chunk_size=None):
+    blob = self
+
+    class Stream(io.BytesIO):
+      def read(self, size=-1):
+        if blob._fail_after is not None and self.tell() >= blob._fail_after:
+          raise ConnectionError("conexión reiniciada")
+        return super().read(size)
+
+    return Stream(self._data)
+
+def quiet(fn, *args):
+  with contextlib.redirect_stdout(io.StringIO()):
+    return fn(*args)
+
+def test_chunks_decode_multibyte_characters_split_across_reads():
+  data = "Año ñandú".encode("utf-8")
+  assert "".join(iter_blob_chunks(FakeBlob(data), chunk_size=3)) == "Año ñandú"
+
+def test_download_error_reaches_the_caller_of_extract_120():
+  file_name, html, _ = generate_case("FORM120", 1, seed=1)
+  blob = FakeBlob(html.encode("utf-8"), fail_after=64)
+  with pytest.raises(DownloadError):
+    quiet(extract_120, iter_blob_chunks(blob, chunk_size=64), file_name)
+
+def test_extract_120_streams_and_returns_records():
+  file_name, html, _ = generate_case("FORM120", 1, seed=1)
+  records = quiet(extract_120, drop_sections(iter_blob_chunks(FakeBlob(html.encode("utf-8")), chunk_size=64)), file_name)
+  assert records.convocatorias[0]["cuce"] == file_name.split("_")[0]
+
+def test_extract_120_parse_error_is_recorded():
+  class Broken:
+    def __iter__(self):
+      raise ValueError("html roto")
+
+  records = quiet(extract_120, Broken(), "X_FORM120_1.html")
+  assert isinstance(records, FormRecords)
+  assert records.errores[0]["error"] == "ValueError"
+
+def split_every(text, size):
+  return [text[i:i + size] for i in range(0, len(text), size)]
+
+DOC = (
+  "<html><head><script type='x'>var a = '<td>';</script><style>td{}</style></head>"
+  "<body><!-- comentario <b> --><table><tr><td class='FormularioCUCE'>21-0001</td></tr>"
+  "<scripting>no es script</scripting></table></body></html>"
+)
+CLEAN = (
+  "<html><head></head><body><table><tr><td class='FormularioCUCE'>21-0001</td></tr>"
+  "<scripting>no es script</scripting></table></body></html>"
+)
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 16, 64, len(DOC)])
+def test_drop_sections_is_independent_of_chunk_boundaries(size):
+  assert "".join(drop_sections(split_every(DOC, size))) == CLEAN
+
+@pytest.mark.parametrize("size", [1, 4, 1000])
+def test_unclosed_section_is_kept_instead_of_dropping_the_rest(size):
+  doc = "<td>a</td><script>var x = 1;<td class='FormularioCUCE'>21-0001</td>"
+  assert "".join(drop_sections(split_every(doc, size))) == doc
+
+def test_long_unclosed_section_stops_being_held():
+  doc = "<td>a</td><!-- " + "x" * 100 + "<td>b</td>"
+  out = list(drop_sections(split_every(doc, 10), max_section=30))
+  assert "".join(out) == doc
+  # Se emitió antes del final del documento (no se retuvo todo)
+  assert len(out) > 2
@@ -0,0 +1,68 @@
+import re
+
+from bs4 import BeautifulSoup
+
+from shared.tables import compile_header_map, extract_records, read_header_labels, resolve_header, table_rows
+
+HEADERS = compile_header_map({
+  "Descripción": "descripcion",
+  "Cantidad": "cantidad",
+  "Precio unitario": "precio",
+  "Total adjudicado": "total",
+})
+
+def table(html):
+  return BeautifulSoup(html, "html.parser").find("table")
+
+def test_header_map_ignores_spaces_and_case():
+  assert resolve_header(HEADERS, "  precio   UNITARIO ") == "precio"
+  # Cabeceras desconocidas: el texto en minúsculas con guiones bajos
+  assert resolve_header(HEADERS, "Unidad de Medida") == "unidad_de_medida"
+
+def test_extract_records_skips_nested_tables_and_short_rows():
+  t = table("""
+    <table>
+      <tr><td>Descripción</td><td>Cantidad</td></tr>
+      <tr><td><b>Arroz</b><table><tr><td>nota</td><td>x</td></tr></table></td><td> 10 </td></tr>
+      <tr><td colspan="2">Total</td></tr>
+      <tr><td>Fideo</td><td>3</td></tr>
+    </table>""")
+  records = extract_records(t, HEADERS)
+  assert records.headers == ("descripcion", "cantidad")
+  assert records.as_dicts() == [
+    {"descripcion": "<b>Arroz</b>", "cantidad": "10"},
+    {"descripcion": "Fideo", "cantidad": "3"},
+  ]
+  # No modifica el árbol
+  assert len(t.find_all("table")) == 1
+  assert len(table_rows(t)) == 4
+
+def test_extract_records_filters():
+  t = table("""
+    <table>
+      <tr><td>Título</td></tr>
+      <tr><td>Descripción</td><td>Cantidad</td><td>Total adjudicado</td></tr>
+      <tr><td>Arroz</td><td>1</td><td>5</td></tr>
+      <tr><td>Nota: revisar</td><td>-</td><td>-</td></tr>
+      <tr><td>Fideo</td><td>2</td></tr>
+      <tr><td>TOTAL</td><td></td><td>5</td></tr>
+    </table>""")
+  records = extract_records(t, HEADERS, header_row=1, same_width=True, skip_prefix="Nota", stop=1)
+  assert records.rows == [("Arroz", "1", "5")]
+  header = table_rows(t)[1]
+  assert extract_records(t, HEADERS, header_row=header, same_width=True, skip_prefix="Nota", stop=1).rows == records.rows
+  assert extract_records(t, HEADERS, header_row=9).rows == []
+
+def test_two_row_header():
+  t = table("""
+    <table>
+      <tr><td rowspan="2">Descripción</td><td colspan="2">Precio</td><td>Preferencia</td></tr>
+      <tr><td>Precio unitario</td><td>Total adjudicado</td><td>MyPE</td></tr>
+      <tr><td>Arroz</td><td>2</td><td>20</td><td>Si</td></tr>
+    </table>""")
+  rows = table_rows(t)
+  labels, start = read_header_labels(rows, 0, multirow=re.compile("Preferencia"))
+  assert labels == ["Descripción", "Precio unitario", "Total adjudicado", "MyPE"]
+  assert start == 2
+  records = extract_records(t, HEADERS, multirow=re.compile("Preferencia"))
+  assert records.as_dicts() == [{"descripcion": "Arroz", "precio": "2", "total": "20", "mype": "Si"}]
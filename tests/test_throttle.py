@@ -0,0 +1,113 @@
+import pytest
+from google.api_core import exceptions as gexc
+from google.cloud import firestore
+
+from bench.fake_db import FakeDocument, FakeFirestore
+from shared.prefetch import PROJECTION, ItemPrefetcher
+from shared.throttle import (
+  FATAL, THROTTLED, TRANSIENT, AdaptiveLimiter, RetryableStatus, ThrottledClient,
+  call_with_retries, classify_error
+)
+
+def test_classify_error():
+  assert classify_error(RetryableStatus(429)) == THROTTLED
+  assert classify_error(RetryableStatus(502)) == TRANSIENT
+  assert classify_error(RetryableStatus(404)) == FATAL
+  assert classify_error(gexc.ResourceExhausted("cuota")) == THROTTLED
+  assert classify_error(ConnectionError()) == TRANSIENT
+  assert classify_error(ValueError()) == FATAL
+
+def test_limiter_grows_per_window_and_halves_on_throttle():
+  limiter = AdaptiveLimiter("t", initial=4, maximum=6, cooldown=0)
+  for _ in range(4):
+    limiter.acquire()
+    limiter.release()
+  assert limiter.limit == 5
+  limiter.acquire()
+  limiter.release(THROTTLED)
+  assert limiter.limit == 2.5
+
+def test_retries_transient_errors_then_succeeds(monkeypatch):
+  monkeypatch.setattr("shared.throttle.time.sleep", lambda s: None)
+  attempts = []
+
+  def flaky():
+    attempts.append(1)
+    if len(attempts) < 3:
+      raise ConnectionError("reset")
+    return "ok"
+
+  limiter = AdaptiveLimiter("t")
+  assert call_with_retries(flaky, limiter) == "ok"
+  assert limiter.retries == 2 and limiter.in_flight == 0
+
+def test_fatal_and_vetoed_errors_are_not_retried(monkeypatch):
+  monkeypatch.setattr("shared.throttle.time.sleep", lambda s: None)
+  calls = []
+
+  def fail(error):
+    def fn():
+      calls.append(1)
+      raise error
+    return fn
+
+  with pytest.raises(ValueError):
+    call_with_retries(fail(ValueError()))
+  with pytest.raises(gexc.DeadlineExceeded):
+    call_with_retries(fail(gexc.DeadlineExceeded("t")), retry_if=lambda e, kind: False)
+  assert len(calls) == 2
+
+class SelectQuery:
+  """Consulta con proyección, como la de Firestore; anota los select en `selected`."""
+  def __init__(self, selected):
+    self.selected = selected
+
+  def where(self, *args, **kwargs):
+    return self
+
+  def select(self, fields):
+    self.selected.append(tuple(fields))
+    return self
+
+  def stream(self):
+    return iter([])
+
+  def document(self, doc_id):
+    # Sin índice item_claves: el prefetch consulta los items
+    return FakeDocument(FakeFirestore(), "item_claves", doc_id)
+
+class SelectDb:
+  def __init__(self):
+    self.selected = []
+
+  def collection(self, name):
+    return SelectQuery(self.selected)
+
+def test_throttled_query_passes_select_through():
+  db = SelectDb()
+  prefetcher = ItemPrefetcher(ThrottledClient(db, AdaptiveLimiter("t")))
+  prefetcher.schedule(["X"])
+  assert prefetcher.take("X").rows() == []
+  prefetcher.close()
+  assert db.selected == [("cuce",) + PROJECTION]
+
+def test_throttled_query_without_select_keeps_working():
+  db = FakeFirestore()
+  db.collection("items").document("X_a").set({"cuce": "X", "descripcion": "Arroz", "estado": "Publicado", "precio": 1})
+  client = ThrottledClient(db, AdaptiveLimiter("t"))
+  query = client.collection("items").where(filter=firestore.FieldFilter("cuce", "==", "X"))
+  assert not hasattr(query, "select")
+  assert [doc.id for doc in query.stream()] == ["X_a"]
+
+class GetAllDb(FakeFirestore):
+  """FakeFirestore con get_all (lectura por lotes) como el cliente de Firestore."""
+  def get_all(self, refs):
+    return [ref.get() for ref in refs]
+
+def test_throttled_client_passes_get_all_through():
+  db = GetAllDb()
+  db.seed("item_claves", {"X": {"a": ["k", "Publicado", None]}})
+  client = ThrottledClient(db, AdaptiveLimiter("t"))
+  snapshots = client.get_all([client.collection("item_claves").document("X")])
+  assert [s.to_dict() for s in snapshots] == [{"a": ["k", "Publicado", None]}]
+  assert not hasattr(ThrottledClient(FakeFirestore(), AdaptiveLimiter("t")), "get_all")